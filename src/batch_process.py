@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""
+Headless Batch Dust Removal
+
+Runs the same detect → remove pipeline as the GUI over a whole folder of
+scans (e.g. a 36-exposure roll) without any clicking. Frames flow through
+a pipelined decode → detect → inpaint → encode chain so that file I/O,
+U-Net inference and CV2 inpainting overlap and every core stays busy.
+
+Usage:
+  python batch_process.py /path/to/roll
+  python batch_process.py /path/to/roll -o /path/to/cleaned --threshold 0.02
+"""
+
+import argparse
+import os
+import queue
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, List, Optional
+
+# Add current directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent))
+
+import numpy as np
+import torch
+from PIL import Image
+
+import image_io
+from image_processing import ImageProcessingService, DETECTION_MODES
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.tiff', '.tif', '.bmp')
+DEFAULT_THRESHOLD = 0.0255  # Same default as ProcessingState.threshold
+OUTPUT_SUFFIX = "_dust_removed"
+
+# Sentinel passed down the queues once a stage has drained
+_STOP = object()
+
+
+@dataclass
+class FrameJob:
+    """A single frame travelling through the pipeline"""
+    path: Path
+    output_path: Path
+    image: Optional[np.ndarray] = None  # native uint8/uint16 pixels
+    dust_mask: Optional[Image.Image] = None
+    result: Optional[np.ndarray] = None
+    timings: dict = field(default_factory=dict)
+
+
+@dataclass
+class BatchStats:
+    """Summary of a batch run"""
+    total: int = 0
+    processed: int = 0
+    failed: List[str] = field(default_factory=list)
+    elapsed: float = 0.0
+
+    @property
+    def frames_per_second(self) -> float:
+        return self.processed / self.elapsed if self.elapsed > 0 else 0.0
+
+
+class BatchPipeline:
+    """Pipelined detect + remove over many frames using bounded stage queues"""
+
+    def __init__(self, model, device: torch.device, threshold: float = DEFAULT_THRESHOLD,
+                 kernel_size: int = 5, decode_workers: Optional[int] = None,
+                 inpaint_workers: Optional[int] = None, encode_workers: Optional[int] = None,
+                 batch_size: Optional[int] = None, mode: str = "fast",
+                 window_size: int = 1024, stride: int = 512, band_height: int = 512,
+                 queue_size: int = 4, jpeg_quality: int = 95):
+        cpu_count = os.cpu_count() or 1
+        self.model = model
+        self.device = device
+        self.mode = mode
+        self.window_size = window_size
+        self.stride = stride
+        self.band_height = band_height
+        self.batch_size = batch_size or ImageProcessingService.estimate_batch_size(device)
+        self.threshold = threshold
+        self.kernel_size = kernel_size
+        self.decode_workers = decode_workers or min(4, cpu_count)
+        self.inpaint_workers = inpaint_workers or cpu_count
+        self.encode_workers = encode_workers or min(4, cpu_count)
+        self.queue_size = queue_size
+        self.jpeg_quality = jpeg_quality
+
+        self._stats_lock = threading.Lock()
+        self.stats = BatchStats()
+
+    # MARK: - Stages
+
+    def decode(self, job: FrameJob) -> FrameJob:
+        """Fully decode the frame at its native bit depth"""
+        t0 = time.time()
+        job.image = image_io.load_image_array(job.path)
+        job.timings['decode'] = time.time() - t0
+        return job
+
+    def detect(self, jobs: List[FrameJob]) -> List[FrameJob]:
+        """Run batched U-Net detection and threshold each prediction"""
+        t0 = time.time()
+        if self.mode == "tiled":
+            # Full-resolution tiles are batched within each frame instead
+            predictions = []
+            for job in jobs:
+                stats = {}
+                predictions.append(ImageProcessingService.predict_dust_mask(
+                    self.model, job.image, window_size=self.window_size, stride=self.stride,
+                    device=self.device, mode="tiled", batch_size=self.batch_size, stats=stats
+                ))
+                job.timings['tiles/s'] = stats.get('tiles_per_second', 0.0)
+        else:
+            predictions = ImageProcessingService.predict_dust_masks_batch(
+                self.model, [job.image for job in jobs], device=self.device,
+                batch_size=len(jobs), lazy=True
+            )
+        elapsed = (time.time() - t0) / len(jobs)
+        for job, prediction in zip(jobs, predictions):
+            job.dust_mask = ImageProcessingService.create_binary_mask(
+                prediction, self.threshold, (job.image.shape[1], job.image.shape[0])
+            )
+            job.timings['detect'] = elapsed
+        return jobs
+
+    def inpaint(self, job: FrameJob) -> FrameJob:
+        """Dilate the mask, inpaint and blend band by band (same as perform_dust_removal)"""
+        t0 = time.time()
+        job.result = ImageProcessingService.remove_dust_array(
+            job.image, np.asarray(job.dust_mask), band_height=self.band_height,
+            kernel_size=self.kernel_size
+        )
+        # Release inputs early so queued frames do not pin full-resolution buffers
+        job.image = None
+        job.dust_mask = None
+        job.timings['inpaint'] = time.time() - t0
+        return job
+
+    def encode(self, job: FrameJob) -> FrameJob:
+        """Write the cleaned frame next to (or into) the output directory"""
+        t0 = time.time()
+        job.output_path.parent.mkdir(parents=True, exist_ok=True)
+        # 16-bit frames stay 16-bit for TIFF/PNG outputs
+        image_io.save_image_array(job.output_path, job.result, jpeg_quality=self.jpeg_quality)
+        job.result = None
+        job.timings['encode'] = time.time() - t0
+        with self._stats_lock:
+            self.stats.processed += 1
+            done = self.stats.processed
+        print(f"✅ [{done}/{self.stats.total}] {job.path.name} → {job.output_path.name} "
+              + " ".join(f"{k}={v:.2f}" + ("" if k == 'tiles/s' else "s") for k, v in job.timings.items()))
+        return job
+
+    # MARK: - Pipeline
+
+    def _stage_worker(self, stage: Callable[[FrameJob], FrameJob], in_q: queue.Queue,
+                      out_q: Optional[queue.Queue]) -> None:
+        """Pull jobs from in_q, run the stage, push to out_q until the stop sentinel arrives"""
+        while True:
+            job = in_q.get()
+            if job is _STOP:
+                # Let sibling workers of the same stage see the sentinel too
+                in_q.put(_STOP)
+                return
+            try:
+                job = stage(job)
+            except Exception as e:
+                print(f"❌ {stage.__name__} failed for {job.path.name}: {e}")
+                with self._stats_lock:
+                    self.stats.failed.append(str(job.path))
+                continue
+            if out_q is not None:
+                out_q.put(job)
+
+    def _batch_stage_worker(self, stage: Callable[[List[FrameJob]], List[FrameJob]],
+                            in_q: queue.Queue, out_q: Optional[queue.Queue]) -> None:
+        """Like _stage_worker, but hands the stage up to batch_size ready jobs at once"""
+        stopping = False
+        while not stopping:
+            batch = [in_q.get()]
+            # Grab whatever else is already decoded without waiting for a full batch
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(in_q.get_nowait())
+                except queue.Empty:
+                    break
+            if _STOP in batch:
+                batch = [job for job in batch if job is not _STOP]
+                in_q.put(_STOP)
+                stopping = True
+            if not batch:
+                continue
+            try:
+                batch = stage(batch)
+            except Exception as e:
+                print(f"❌ {stage.__name__} failed for {', '.join(job.path.name for job in batch)}: {e}")
+                with self._stats_lock:
+                    self.stats.failed.extend(str(job.path) for job in batch)
+                continue
+            if out_q is not None:
+                for job in batch:
+                    out_q.put(job)
+
+    def _start_stage(self, stage, n_workers: int, in_q: queue.Queue,
+                     out_q: Optional[queue.Queue], batched: bool = False) -> List[threading.Thread]:
+        threads = []
+        worker = self._batch_stage_worker if batched else self._stage_worker
+        for i in range(n_workers):
+            thread = threading.Thread(target=worker, args=(stage, in_q, out_q),
+                                      name=f"{stage.__name__}-{i}")
+            thread.daemon = True
+            thread.start()
+            threads.append(thread)
+        return threads
+
+    def run(self, jobs: List[FrameJob]) -> BatchStats:
+        """Process all jobs and block until the last frame is written"""
+        self.stats = BatchStats(total=len(jobs))
+        start_time = time.time()
+
+        # Bounded queues give backpressure so decoded frames never pile up in memory
+        decode_q: queue.Queue = queue.Queue()
+        detect_q: queue.Queue = queue.Queue(maxsize=max(self.queue_size, self.batch_size))
+        inpaint_q: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        encode_q: queue.Queue = queue.Queue(maxsize=self.queue_size)
+
+        # Detection stays on a single worker: the model is shared and torch
+        # already parallelizes each forward pass across cores. It consumes
+        # decoded frames in batches so one forward pass covers several frames.
+        stages = [
+            (self.decode, self.decode_workers, decode_q, detect_q),
+            (self.detect, 1, detect_q, inpaint_q),
+            (self.inpaint, self.inpaint_workers, inpaint_q, encode_q),
+            (self.encode, self.encode_workers, encode_q, None),
+        ]
+        stage_threads = [self._start_stage(*stage, batched=(stage[0] == self.detect))
+                         for stage in stages]
+
+        for job in jobs:
+            decode_q.put(job)
+        decode_q.put(_STOP)
+
+        # Drain stage by stage, forwarding the stop sentinel once a stage is empty
+        for (_, _, _, out_q), threads in zip(stages, stage_threads):
+            for thread in threads:
+                thread.join()
+            if out_q is not None:
+                out_q.put(_STOP)
+
+        self.stats.elapsed = time.time() - start_time
+        return self.stats
+
+
+def collect_jobs(input_dir: Path, output_dir: Optional[Path], recursive: bool = False,
+                 skip_existing: bool = False) -> List[FrameJob]:
+    """Find all scans in input_dir and pair them with their output paths"""
+    pattern = "**/*" if recursive else "*"
+    jobs = []
+    for path in sorted(input_dir.glob(pattern)):
+        if not path.is_file() or path.suffix.lower() not in IMAGE_EXTENSIONS:
+            continue
+        if path.stem.endswith(OUTPUT_SUFFIX):
+            continue
+        target_dir = output_dir / path.parent.relative_to(input_dir) if output_dir else path.parent
+        output_path = target_dir / f"{path.stem}{OUTPUT_SUFFIX}{path.suffix}"
+        if skip_existing and output_path.exists():
+            continue
+        jobs.append(FrameJob(path=path, output_path=output_path))
+    return jobs
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Spotless Film - headless batch dust removal")
+    parser.add_argument("input_dir", help="Directory containing scanned frames")
+    parser.add_argument("-o", "--output", help="Output directory (default: next to each input)")
+    parser.add_argument("-w", "--weights", help="U-Net weights (.pth); searched for if omitted")
+    parser.add_argument("-t", "--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help=f"Detection threshold (default: {DEFAULT_THRESHOLD})")
+    parser.add_argument("-m", "--mode", choices=DETECTION_MODES, default="fast",
+                        help="Detection mode: fast 1024px pass or full-resolution tiles")
+    parser.add_argument("--window-size", type=int, default=1024, help="Tile size for --mode tiled")
+    parser.add_argument("--stride", type=int, default=512, help="Tile stride for --mode tiled")
+    parser.add_argument("--band-height", type=int, default=512,
+                        help="Rows per band for memory-bounded removal")
+    parser.add_argument("--kernel-size", type=int, default=5, help="Mask dilation kernel size")
+    parser.add_argument("--batch-size", type=int,
+                        help="Frames per U-Net forward pass (default: sized from free memory)")
+    parser.add_argument("--decode-workers", type=int, help="Decoder threads")
+    parser.add_argument("--inpaint-workers", type=int, help="Inpainting threads (default: all cores)")
+    parser.add_argument("--encode-workers", type=int, help="Encoder threads")
+    parser.add_argument("-r", "--recursive", action="store_true", help="Descend into subdirectories")
+    parser.add_argument("--skip-existing", action="store_true", help="Skip frames already processed")
+    args = parser.parse_args(argv)
+
+    input_dir = Path(args.input_dir)
+    if not input_dir.is_dir():
+        print(f"❌ Not a directory: {input_dir}")
+        return 2
+
+    weights = args.weights or ImageProcessingService.find_model_weights()
+    if not weights:
+        print("❌ No U-Net model file found! Pass --weights")
+        return 2
+
+    jobs = collect_jobs(input_dir, Path(args.output) if args.output else None,
+                        recursive=args.recursive, skip_existing=args.skip_existing)
+    if not jobs:
+        print("🔵 No images to process")
+        return 0
+
+    device = torch.device(
+        "mps" if torch.backends.mps.is_available() else
+        "cuda" if torch.cuda.is_available() else "cpu"
+    )
+    model = ImageProcessingService.load_model(weights, device)
+
+    pipeline = BatchPipeline(
+        model, device,
+        threshold=args.threshold,
+        kernel_size=args.kernel_size,
+        batch_size=args.batch_size,
+        mode=args.mode,
+        window_size=args.window_size,
+        stride=args.stride,
+        band_height=args.band_height,
+        decode_workers=args.decode_workers,
+        inpaint_workers=args.inpaint_workers,
+        encode_workers=args.encode_workers,
+    )
+    print(f"🚀 Processing {len(jobs)} frames ({pipeline.mode} detection, batch size {pipeline.batch_size}, "
+          f"{pipeline.decode_workers} decode, {pipeline.inpaint_workers} inpaint, "
+          f"{pipeline.encode_workers} encode workers)")
+    stats = pipeline.run(jobs)
+
+    print(f"✨ Done: {stats.processed}/{stats.total} frames in {stats.elapsed:.1f}s "
+          f"({stats.frames_per_second:.2f} frames/s)")
+    if stats.failed:
+        print(f"❌ {len(stats.failed)} frames failed:")
+        for path in stats.failed:
+            print(f"   {path}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,7 +6,7 @@
 echo "🚀 Building SpotlessFilm executable..."
 
 # Check if we're in the right directory
-if [ ! -f "spotless_film_modern.py" ]; then
+if [ ! -f "spotless_film.py" ]; then
     echo "❌ Error: Please run this script from the src/ directory"
     exit 1
 fi
@@ -150,8 +150,8 @@ def main():
     print(f"📍 Working directory: {os.getcwd()}")
     
     # Check if we're in the right directory
-    if not os.path.exists("spotless_film_modern.py"):
-        print("❌ Error: spotless_film_modern.py not found!")
+    if not os.path.exists("spotless_film.py"):
+        print("❌ Error: spotless_film.py not found!")
         print("Please run this script from the src/ directory")
         return
     
@@ -14,10 +14,16 @@ import torch
 import torch.nn as nn
 from typing import Optional, List, Tuple, Callable
 import threading
+import time
+from collections import deque
 from dataclasses import dataclass
 from enum import Enum
 import cv2
 
+from image_processing import BrushEngine, DirtyRect
+from mask_history import MaskHistory
+from threshold_mask import ThresholdMask, nearest_indices, nearest_sample
+
 
 class ProcessingMode(Enum):
     SINGLE = "single"
@@ -25,6 +31,17 @@ class ProcessingMode(Enum):
     SPLIT_SLIDER = "split_slider"
 
 
+class StateSlice(Enum):
+    """Parts of the state observers can subscribe to"""
+    VIEW = "view"              # zoom/pan, tools, compare mode, overlay visibility
+    MASK = "mask"              # dust mask, threshold and brush edits
+    IMAGES = "images"          # selected/processed images
+    PROCESSING = "processing"  # detection/removal progress, errors
+
+
+ALL_SLICES = frozenset(StateSlice)
+
+
 class ToolMode(Enum):
     NONE = "none"
     ERASER = "eraser"
@@ -52,10 +69,12 @@ class ProcessingState:
     """Processing-related state"""
     is_detecting: bool = False
     is_removing: bool = False
+    is_loading: bool = False  # Full-resolution decode still running on a worker
     threshold: float = 0.0255  # Middle value between 0.001 and 0.05
     processing_time: float = 0.0
     patch_size: int = 1024
     stride: int = 512
+    detection_mode: str = "fast"  # "fast" (1024x1024 squeeze) or "tiled" (full resolution)
 
 
 class DustRemovalState:
@@ -67,17 +86,38 @@ class DustRemovalState:
         # Images
         self.selected_image: Optional[Image.Image] = None
         self.processed_image: Optional[Image.Image] = None
+        # Bumped on every mask change; brush edits also record the full-res
+        # rectangle they touched so displays can patch instead of rebuild
+        self.mask_version = 0
+        self._mask_edits = deque(maxlen=256)
         self.dust_mask: Optional[Image.Image] = None
-        self.original_dust_mask: Optional[Image.Image] = None
-        self.raw_prediction_mask: Optional[np.ndarray] = None
+        # ndarray, or a LazyPrediction kept at model resolution (fast mode)
+        self.raw_prediction_mask = None
         
-        # Low-resolution drawing for performance
+        # Incremental re-thresholding for the sensitivity slider: the preview
+        # mask follows the slider immediately, the full-resolution dust_mask
+        # catches up once it settles (threshold_sync_pending until then)
+        self.threshold_mask: Optional[ThresholdMask] = None
+        self.preview_threshold_mask: Optional[ThresholdMask] = None
+        self.preview_mask: Optional[Image.Image] = None
+        self.preview_mask_long_side = 2048
+        self.threshold_sync_pending = False
+        
+        # Native-depth pixels (uint8/uint16) used for removal and export;
+        # the PIL images above are 8-bit views for display and detection
+        self.selected_array: Optional[np.ndarray] = None
+        self.processed_array: Optional[np.ndarray] = None
+        
+        # Low-resolution drawing for performance: the brush engine paints into
+        # its buffer in place and low_res_mask is a PIL view of that buffer
         self.low_res_mask: Optional[Image.Image] = None
+        self.brush_engine: Optional[BrushEngine] = None
         self.low_res_scale: float = 0.25
         self.max_drawing_resolution: float = 1024
         
         # Models
         self.unet_model: Optional[nn.Module] = None
+        self.model_weights_path: Optional[str] = None
         self.lama_inpainter = None
         
         # Device
@@ -91,8 +131,8 @@ class DustRemovalState:
         self.processing_state = ProcessingState()
         
         # Undo system
-        self.mask_history: List[Image.Image] = []
-        self.max_history_size = 20
+        # Compressed snapshots, bounded by memory rather than entry count
+        self.mask_history = MaskHistory()
         self.is_dragging = False
         
         # Stroke tracking for smooth drawing
@@ -103,33 +143,105 @@ class DustRemovalState:
         self.error_message: Optional[str] = None
         self.showing_error = False
         
-        # Observer callbacks
-        self.observers: List[Callable] = []
+        # Observer callbacks with the slices each one listens to. Notifications
+        # are batched: changed slices accumulate and one flush per frame runs
+        # each interested observer once
+        self.observers: List[Tuple[Callable, frozenset]] = []
+        self.min_notify_interval = 1 / 60.0
+        self._dirty_slices = set()
+        self._notify_scheduled = False
+        self._last_flush = 0.0
+        self._notify_lock = threading.Lock()
         
         # Threading locks
         self._lock = threading.Lock()
+        # ThresholdMask updates run on scheduler workers as well as the Tk thread
+        self._threshold_lock = threading.Lock()
+        # One U-Net inference at a time (foreground and roll prefetch): each
+        # run holds its own activations on the device
+        self.inference_lock = threading.Lock()
+    
+    def add_observer(self, callback: Callable, slices=None) -> None:
+        """Add an observer for changes to `slices` (all slices when None)"""
+        self.observers.append((callback, frozenset(slices) if slices else ALL_SLICES))
     
-    def add_observer(self, callback: Callable) -> None:
-        """Add an observer for state changes"""
-        self.observers.append(callback)
+    def notify_observers(self, *slices: StateSlice) -> None:
+        """Mark slices as changed (all when none given) and schedule one coalesced flush"""
+        with self._notify_lock:
+            self._dirty_slices.update(slices or ALL_SLICES)
+            if self._notify_scheduled:
+                return
+            self._notify_scheduled = True
+        try:
+            # Throttle to roughly one flush per frame during brush drags
+            wait = self._last_flush + self.min_notify_interval - time.monotonic()
+            if wait > 0:
+                self.root.after(int(wait * 1000) + 1, self._flush_notifications)
+            else:
+                self.root.after_idle(self._flush_notifications)
+        except Exception as e:
+            print(f"🔔 Error scheduling observers: {e}")
+            with self._notify_lock:
+                self._notify_scheduled = False
     
-    def notify_observers(self) -> None:
-        """Notify all observers of state changes"""
-        print(f"🔔 notify_observers called with {len(self.observers)} observers")
-        for i, callback in enumerate(self.observers):
+    def _flush_notifications(self) -> None:
+        """Run every observer subscribed to a slice that changed since the last flush"""
+        with self._notify_lock:
+            changed, self._dirty_slices = self._dirty_slices, set()
+            self._notify_scheduled = False
+        self._last_flush = time.monotonic()
+        for callback, slices in list(self.observers):
+            if not (slices & changed):
+                continue
             try:
-                print(f"🔔 Scheduling observer {i}: {callback.__name__ if hasattr(callback, '__name__') else str(callback)}")
-                self.root.after_idle(callback)
+                callback()
             except Exception as e:
-                print(f"🔔 Error scheduling observer {i}: {e}")
-                pass  # Handle stale callbacks gracefully
+                name = getattr(callback, '__name__', str(callback))
+                print(f"🔔 Error in observer {name}: {e}")
     
     # MARK: - Computed Properties
     
+    @property
+    def dust_mask(self) -> Optional[Image.Image]:
+        return self._dust_mask
+    
+    @dust_mask.setter
+    def dust_mask(self, mask: Optional[Image.Image]) -> None:
+        # Any other edit (brush, undo, new detection) makes the preview mask stale
+        self._dust_mask = mask
+        self.preview_mask = None
+        self.mark_mask_changed()
+    
+    def mark_mask_changed(self, rect: Optional[DirtyRect] = None) -> None:
+        """Bump mask_version; `rect` (full-res pixels) limits the change, None means everything"""
+        self.mask_version += 1
+        if rect is None:
+            self._mask_edits.clear()
+        else:
+            self._mask_edits.append((self.mask_version, rect))
+    
+    def mask_changes_since(self, version: int) -> Optional[DirtyRect]:
+        """Full-res rectangle changed after `version` (empty if none), or None if a full redraw is needed"""
+        changed = DirtyRect(0, 0, 0, 0)
+        if version == self.mask_version:
+            return changed
+        edits = [rect for edit_version, rect in self._mask_edits if edit_version > version]
+        if len(edits) != self.mask_version - version:
+            return None
+        for rect in edits:
+            changed = changed.union(rect)
+        return changed
+    
+    @property
+    def has_pending_stroke(self) -> bool:
+        """True while brush edits exist only in the low-res mask"""
+        return self.brush_engine is not None and self.brush_engine.stroke_dirty is not None
+    
     @property
     def can_detect_dust(self) -> bool:
         return (self.selected_image is not None and 
                 self.unet_model is not None and 
+                not self.processing_state.is_loading and 
                 not self.processing_state.is_detecting and 
                 not self.processing_state.is_removing)
     
@@ -153,55 +265,59 @@ class DustRemovalState:
         """Reset processing state for new image"""
         with self._lock:
             self.processed_image = None
+            self.processed_array = None
             self.dust_mask = None
-            self.original_dust_mask = None
             self.raw_prediction_mask = None
+            self.threshold_mask = None
+            self.preview_threshold_mask = None
+            self.threshold_sync_pending = False
             self.view_state.hide_detections = False
             self.reset_zoom()
             self.clear_mask_history()
             self.low_res_mask = None
+            self.brush_engine = None
             self.notify_observers()
     
     def reset_zoom(self) -> None:
         """Reset zoom and pan to default"""
         self.view_state.zoom_scale = 1.0
         self.view_state.drag_offset = (0.0, 0.0)
-        self.notify_observers()
+        self.notify_observers(StateSlice.VIEW)
     
     def zoom_in(self) -> None:
         """Zoom in by 1.5x up to 5x max"""
         self.view_state.zoom_scale = min(self.view_state.zoom_scale * 1.5, 5.0)
-        self.notify_observers()
+        self.notify_observers(StateSlice.VIEW)
     
     def zoom_out(self) -> None:
         """Zoom out by 1.5x down to 1x min"""
         self.view_state.zoom_scale = max(self.view_state.zoom_scale / 1.5, 1.0)
         if self.view_state.zoom_scale == 1.0:
             self.view_state.drag_offset = (0.0, 0.0)
-        self.notify_observers()
+        self.notify_observers(StateSlice.VIEW)
     
     def set_tool_mode(self, mode: ToolMode) -> None:
         """Set the current tool mode"""
         self.view_state.tool_mode = mode
-        self.notify_observers()
+        self.notify_observers(StateSlice.VIEW)
     
     def toggle_overlay(self) -> None:
         """Toggle dust overlay visibility"""
         self.view_state.hide_detections = not self.view_state.hide_detections
-        self.notify_observers()
+        self.notify_observers(StateSlice.VIEW)
     
     def set_processing_mode(self, mode: ProcessingMode) -> None:
         """Set the processing/compare mode"""
         self.view_state.processing_mode = mode
         # Do not force-hide detections; let the user control overlay visibility
-        self.notify_observers()
+        self.notify_observers(StateSlice.VIEW)
     
     def show_error(self, message: str) -> None:
         """Show error message"""
         self.error_message = message
         self.showing_error = True
         messagebox.showerror("Error", message)
-        self.notify_observers()
+        self.notify_observers(StateSlice.PROCESSING)
     
     # MARK: - Undo System
     
@@ -210,17 +326,13 @@ class DustRemovalState:
         if self.dust_mask is None:
             return
         
-        # Convert PIL to copy for history
-        mask_copy = self.dust_mask.copy()
-        self.mask_history.append(mask_copy)
-        
-        # Limit history size
-        if len(self.mask_history) > self.max_history_size:
-            self.mask_history.pop(0)
+        # Stored bit-packed and compressed; the oldest entries drop past the budget
+        self.mask_history.push(self.dust_mask)
     
     def start_brush_stroke(self) -> None:
         """Start a new brush stroke"""
         if not self.is_dragging:
+            self.sync_threshold_mask()
             self.save_mask_to_history()
             self.is_dragging = True
     
@@ -232,7 +344,7 @@ class DustRemovalState:
         
         # Sync low-res changes back to full resolution
         self.sync_low_res_to_full_res()
-        self.notify_observers()
+        self.notify_observers(StateSlice.MASK)
     
     def undo_last_mask_change(self) -> None:
         """Undo the last mask change"""
@@ -241,22 +353,87 @@ class DustRemovalState:
         
         # Restore previous mask
         self.dust_mask = self.mask_history.pop()
+        self.threshold_sync_pending = False
         
         # Recreate low-res mask from restored full-res mask
         self.create_low_res_mask()
-        self.notify_observers()
+        self.notify_observers(StateSlice.MASK)
     
     def clear_mask_history(self) -> None:
         """Clear undo history"""
         self.mask_history.clear()
         self.is_dragging = False
     
+    # MARK: - Threshold Methods
+    
+    def build_threshold_masks(self) -> None:
+        """Index the raw prediction once per detection for incremental thresholding"""
+        if self.raw_prediction_mask is None:
+            return
+        threshold = self.processing_state.threshold
+        height, width = self.raw_prediction_mask.shape[:2]
+        long_side = self.preview_mask_long_side
+        # Same sizing as the GUI's 2K preview image so the overlay maps 1:1
+        if max(width, height) <= long_side:
+            preview_size = (width, height)
+        elif width >= height:
+            preview_size = (long_side, max(1, int(height * (long_side / float(width)))))
+        else:
+            preview_size = (max(1, int(width * (long_side / float(height)))), long_side)
+        
+        self.threshold_mask = ThresholdMask(self.raw_prediction_mask, threshold)
+        self.preview_threshold_mask = ThresholdMask(
+            nearest_sample(self.raw_prediction_mask, preview_size), threshold
+        )
+        print(f"🎚️ Threshold index built: {self.threshold_mask.indexed_pixels:,} adjustable pixels, "
+              f"preview {preview_size[0]}x{preview_size[1]}")
+    
+    def apply_threshold(self, full_resolution: bool = True) -> None:
+        """Re-threshold to processing_state.threshold; the preview mask always, full-res optionally"""
+        if self.preview_threshold_mask is None:
+            return
+        preview = self.preview_threshold_mask.set_threshold(self.processing_state.threshold)
+        self.threshold_sync_pending = True
+        if full_resolution:
+            self.sync_threshold_mask()
+        self.preview_mask = Image.fromarray(preview, mode='L')
+        self.mark_mask_changed()
+    
+    def sync_threshold_mask(self) -> None:
+        """Bring the full-resolution dust_mask (and low-res mask) up to the current threshold"""
+        if not self.threshold_sync_pending or self.threshold_mask is None:
+            return
+        threshold = self.processing_state.threshold
+        self.install_threshold_mask(self.compute_threshold_mask(threshold), threshold)
+    
+    def compute_threshold_mask(self, threshold: float) -> Optional[np.ndarray]:
+        """Full-resolution mask at `threshold` as a new array (safe to call off the Tk thread)"""
+        threshold_mask = self.threshold_mask
+        if threshold_mask is None:
+            return None
+        with self._threshold_lock:
+            # Copied: the ThresholdMask keeps updating its own array in place
+            return threshold_mask.set_threshold(threshold).copy()
+    
+    def install_threshold_mask(self, mask: Optional[np.ndarray], threshold: float) -> None:
+        """Make a computed full-resolution mask the dust mask, unless the slider (or an undo) moved on"""
+        if mask is None or not self.threshold_sync_pending or threshold != self.processing_state.threshold:
+            return
+        preview_mask = self.preview_mask
+        self.dust_mask = Image.fromarray(mask, mode='L')
+        # Same threshold, so the preview is still current
+        self.preview_mask = preview_mask
+        self.create_low_res_mask()
+        self.threshold_sync_pending = False
+        print(f"🎚️ Full-resolution mask synced: {np.count_nonzero(mask) / mask.size * 100:.2f}% dust")
+    
     # MARK: - Low-Resolution Drawing Methods
     
     def create_low_res_mask(self) -> None:
         """Create low-resolution mask for performance"""
         if self.dust_mask is None:
             self.low_res_mask = None
+            self.brush_engine = None
             return
         
         original_size = self.dust_mask.size
@@ -270,7 +447,10 @@ class DustRemovalState:
             int(original_size[1] * target_scale)
         )
         
-        self.low_res_mask = self.dust_mask.resize(low_res_size, Image.NEAREST)
+        buffer = np.array(self.dust_mask.resize(low_res_size, Image.NEAREST).convert('L'))
+        self.brush_engine = BrushEngine(buffer)
+        # Shares memory with the buffer, so brush stamps show up without a copy
+        self.low_res_mask = Image.frombuffer('L', low_res_size, buffer, 'raw', 'L', 0, 1)
         print(f"🎨 Created low-res mask: {low_res_size} (scale: {target_scale})")
     
     def get_low_res_mask(self) -> Optional[Image.Image]:
@@ -279,27 +459,54 @@ class DustRemovalState:
             self.create_low_res_mask()
         return self.low_res_mask
     
-    def update_low_res_mask(self, new_low_res_mask: Image.Image) -> None:
-        """Update low-res mask and provide visual feedback"""
-        self.low_res_mask = new_low_res_mask
+    def paint_stroke(self, point: Tuple[float, float], radius: int, is_erasing: bool) -> None:
+        """Paint (or erase) from the stroke's last point to `point`, in low-res coordinates"""
+        if self.get_low_res_mask() is None:
+            return
+        last_point = self.last_eraser_point if is_erasing else self.last_brush_point
+        self.brush_engine.stroke(last_point, point, radius, is_erasing)
+        if is_erasing:
+            self.last_eraser_point = point
+        else:
+            self.last_brush_point = point
+        self.update_low_res_mask(self.brush_engine.take_dirty())
+    
+    def update_low_res_mask(self, dirty: Optional[DirtyRect]) -> None:
+        """Provide visual feedback for a low-res edit covering `dirty` (low-res pixels)"""
+        if dirty is None:
+            return
         
-        # Update the display mask immediately with upscaled version for visual feedback
+        # The full-resolution mask is left alone until the stroke ends; displays
+        # redraw the edited rectangle from the low-res mask in the meantime
         if self.dust_mask is not None:
-            upscaled_mask = new_low_res_mask.resize(self.dust_mask.size, Image.NEAREST)
-            self.dust_mask = upscaled_mask
+            self.mark_mask_changed(dirty.scaled(self.low_res_mask.size, self.dust_mask.size))
         
-        self.notify_observers()
+        self.notify_observers(StateSlice.MASK)
     
     def sync_low_res_to_full_res(self) -> None:
         """Sync low-res drawing to full resolution"""
-        if self.low_res_mask is None or self.dust_mask is None:
+        if not self.has_pending_stroke or self.dust_mask is None:
             return
         
-        # Upscale the low-res mask to full resolution
-        final_mask = self.low_res_mask.resize(self.dust_mask.size, Image.NEAREST)
-        self.dust_mask = final_mask
+        engine = self.brush_engine
+        low_w, low_h = engine.size
+        full_w, full_h = self.dust_mask.size
+        rect = engine.stroke_dirty.scaled((low_w, low_h), (full_w, full_h))
+        
+        # Upscale only the stroke's rectangle, and within it overwrite only the
+        # pixels the brush actually covered so full-res detail elsewhere survives
+        rows = nearest_indices(low_h, full_h)[rect.y0:rect.y1]
+        cols = nearest_indices(low_w, full_w)[rect.x0:rect.x1]
+        touched = engine.touched[np.ix_(rows, cols)]
+        region = np.array(self.dust_mask.crop(rect.box).convert('L'))
+        region[touched] = engine.buffer[np.ix_(rows, cols)][touched]
+        self.dust_mask.paste(Image.fromarray(region, mode='L'), rect.box[:2])
+        engine.reset_stroke()
         
-        print("🔄 Synced low-res drawing to full resolution")
+        # Edited in place: the preview is stale, but only inside the rectangle
+        self.preview_mask = None
+        self.mark_mask_changed(rect)
+        print(f"🔄 Synced {rect.x1 - rect.x0}x{rect.y1 - rect.y0} stroke region to full resolution")
 
     # MARK: - Image Processing Helpers
     
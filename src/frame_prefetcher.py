@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Frame Prefetcher
+
+Roll review: when a folder of scans is opened as a session, the frames
+around the current one are decoded (and, with a model loaded, detected) as
+PREFETCH jobs on the JobScheduler, so stepping to the next frame finds its image,
+preview and prediction already in memory. Prefetched frames are kept in an
+LRU bounded by a byte budget; the on-disk PredictionCache still catches
+anything evicted here.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+from PIL import Image
+
+from job_scheduler import CancellationToken, Job, JobScheduler, Priority
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.tiff', '.tif', '.bmp')
+DEFAULT_PREFETCH_BYTES = 1024 ** 3
+DEFAULT_RADIUS = 2  # Frames prefetched on each side of the current one
+
+
+def list_session_frames(folder: Union[str, Path]) -> List[str]:
+    """Image files of a roll folder in name order"""
+    folder = Path(folder)
+    return sorted(str(path) for path in folder.iterdir()
+                  if path.is_file() and path.suffix.lower() in IMAGE_EXTENSIONS)
+
+
+def _image_bytes(image: Optional[Image.Image]) -> int:
+    if image is None:
+        return 0
+    return image.width * image.height * len(image.getbands())
+
+
+@dataclass
+class PrefetchedFrame:
+    """One decoded frame, optionally with the prediction made for it"""
+    path: str
+    array: np.ndarray
+    image: Image.Image
+    preview: Image.Image
+    prediction: Optional[object] = None  # Dense array or LazyPrediction
+    prediction_key: Optional[str] = None  # PredictionCache key the prediction was made under
+
+    @property
+    def nbytes(self) -> int:
+        total = self.array.nbytes + _image_bytes(self.preview)
+        if self.array.dtype != np.uint8:
+            # The 8-bit display image is its own copy for 16-bit scans
+            total += _image_bytes(self.image)
+        if self.prediction is not None:
+            total += int(getattr(self.prediction, 'nbytes', 0))
+        return total
+
+
+class FramePrefetcher:
+    """Decodes and pre-detects the neighbours of the current frame as low-priority jobs
+
+    `decode(path)` builds a PrefetchedFrame; `detect(frame)` returns
+    (prediction, cache_key) or None when detection is not possible yet.
+    `on_detected(frame)` is called from the worker once a prediction lands.
+    Without a shared `scheduler` the prefetcher runs its own; `detect_lock`
+    is held around each detect() and should be shared with the caller's own
+    inference so the two never hold the model's memory at once.
+    """
+
+    def __init__(self, frames: List[str], decode: Callable[[str], PrefetchedFrame],
+                 detect: Optional[Callable[[PrefetchedFrame], Optional[Tuple[object, str]]]] = None,
+                 on_detected: Optional[Callable[[PrefetchedFrame], None]] = None,
+                 radius: int = DEFAULT_RADIUS, scheduler: Optional[JobScheduler] = None,
+                 max_bytes: int = DEFAULT_PREFETCH_BYTES, detect_lock: Optional[threading.Lock] = None):
+        self.frames = list(frames)
+        self.decode = decode
+        self.detect = detect
+        self.on_detected = on_detected
+        self.radius = radius
+        self.max_bytes = max_bytes
+        self.current: Optional[str] = None
+        self._closed = False
+
+        self._cache: "OrderedDict[str, PrefetchedFrame]" = OrderedDict()
+        self._total_bytes = 0
+        self._pending: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+        # One inference at a time; other workers keep decoding
+        self._detect_lock = detect_lock or threading.Lock()
+        self._owns_scheduler = scheduler is None
+        self.scheduler = scheduler or JobScheduler(max_workers=3)
+
+    @property
+    def nbytes(self) -> int:
+        return self._total_bytes
+
+    def index_of(self, path: str) -> Optional[int]:
+        try:
+            return self.frames.index(path)
+        except ValueError:
+            return None
+
+    def neighbours(self, path: str) -> List[str]:
+        """Frames within `radius` of path, nearest first and the next frame before the previous"""
+        index = self.index_of(path)
+        if index is None:
+            return []
+        order = []
+        for step in range(1, self.radius + 1):
+            for neighbour in (index + step, index - step):
+                if 0 <= neighbour < len(self.frames):
+                    order.append(self.frames[neighbour])
+        return order
+
+    def set_current(self, path: str) -> None:
+        """Make `path` the current frame and queue its neighbourhood"""
+        self.current = path
+        wanted = self.neighbours(path)
+        with self._lock:
+            # Work that has scrolled out of the window is dropped
+            for queued, job in list(self._pending.items()):
+                if queued not in wanted and queued != path:
+                    job.cancel()
+                    del self._pending[queued]
+            for neighbour in wanted:
+                if neighbour not in self._cache and neighbour not in self._pending:
+                    self._pending[neighbour] = self.scheduler.submit(
+                        lambda token, neighbour=neighbour: self._prefetch(neighbour, token),
+                        priority=Priority.PREFETCH, key=("prefetch", neighbour),
+                        name=f"prefetch {os.path.basename(neighbour)}"
+                    )
+
+    def take(self, path: str) -> Optional[PrefetchedFrame]:
+        """The prefetched frame for path, if it is already decoded"""
+        with self._lock:
+            frame = self._cache.get(path)
+            if frame is not None:
+                self._cache.move_to_end(path)
+            return frame
+
+    def add(self, frame: PrefetchedFrame) -> None:
+        """Keep a frame the caller decoded itself, so stepping back to it is instant"""
+        with self._lock:
+            self._store(frame)
+
+    def wait(self, path: str) -> Optional[PrefetchedFrame]:
+        """Like take(), but waits for a decode of path that is already running
+
+        A decode still queued is cancelled instead: it could sit behind
+        pre-detect jobs, so the caller is quicker decoding path itself.
+        """
+        with self._lock:
+            job = self._pending.get(path)
+            if job is not None and not job.started:
+                job.cancel()
+                del self._pending[path]
+                job = None
+        if job is not None:
+            job.wait()
+        return self.take(path)
+
+    def close(self) -> None:
+        with self._lock:
+            for job in self._pending.values():
+                job.cancel()
+            self._pending.clear()
+            self._cache.clear()
+            self._total_bytes = 0
+            self._closed = True
+        if self._owns_scheduler:
+            self.scheduler.shutdown()
+
+    def _prefetch(self, path: str, token: CancellationToken) -> None:
+        try:
+            frame = self.decode(path)
+        except Exception as e:
+            print(f"⚠️ Prefetch of {os.path.basename(path)} failed: {e}")
+            with self._lock:
+                self._forget(path, token)
+            return
+        with self._lock:
+            self._forget(path, token)
+            if self._closed:
+                return
+            # Kept even if it left the window meanwhile: stepping back is likely
+            self._store(frame)
+        print(f"🎞️ Prefetched {os.path.basename(path)} ({self._total_bytes / 1024 ** 2:.0f} MB cached)")
+        if self.detect is not None:
+            self.scheduler.submit(lambda token: self._detect(frame), priority=Priority.PREFETCH,
+                                  key=("prefetch-detect", path), name=f"pre-detect {os.path.basename(path)}")
+
+    def _detect(self, frame: PrefetchedFrame) -> None:
+        with self._detect_lock:
+            # The frame may have been evicted or left the window while queued
+            with self._lock:
+                cached = self._cache.get(frame.path) is frame
+            wanted = frame.path == self.current or frame.path in self.neighbours(self.current or "")
+            if not cached or not wanted:
+                return
+            try:
+                result = self.detect(frame)
+            except Exception as e:
+                print(f"⚠️ Prefetch detection of {os.path.basename(frame.path)} failed: {e}")
+                return
+        if result is None:
+            return
+        with self._lock:
+            if self._cache.get(frame.path) is not frame:
+                return
+            self._total_bytes -= frame.nbytes
+            frame.prediction, frame.prediction_key = result
+            self._total_bytes += frame.nbytes
+            self._evict()
+        print(f"🎞️ Pre-detected {os.path.basename(frame.path)}")
+        if self.on_detected is not None:
+            self.on_detected(frame)
+
+    def _forget(self, path: str, token: CancellationToken) -> None:
+        job = self._pending.get(path)
+        if job is not None and job.token is token:
+            del self._pending[path]
+
+    def _store(self, frame: PrefetchedFrame) -> None:
+        old = self._cache.pop(frame.path, None)
+        if old is not None:
+            self._total_bytes -= old.nbytes
+        self._cache[frame.path] = frame
+        self._total_bytes += frame.nbytes
+        self._evict()
+
+    def _evict(self) -> None:
+        # Least recently used first; always keep the newest entry
+        while self._total_bytes > self.max_bytes and len(self._cache) > 1:
+            _, frame = self._cache.popitem(last=False)
+            self._total_bytes -= frame.nbytes
@@ -2,11 +2,23 @@
 """
 OpenGL image preview for Spotless Film (Tkinter integration via pyopengltk)
 
+Textures are uploaded only when their content changes. Everything that is
+just a different way of looking at the same pixels (zoom/pan, the split
+slider, overlay opacity) is draw state: the split is a texcoord split between
+the original and processed textures, and the dust mask is a single-channel
+alpha texture tinted red with the overlay opacity as the vertex colour.
+
+Images are drawn as tiles of their ImagePyramid: each frame uses the level
+matching the on-screen size and uploads only the tiles that are visible, so
+full-resolution scans larger than GL_MAX_TEXTURE_SIZE can be shown at 1:1.
+
 Dependencies:
   pip install PyOpenGL pyopengltk
 """
 
-from typing import Optional, Tuple
+import math
+from collections import OrderedDict
+from typing import List, Optional, Tuple, Union
 
 try:
     from pyopengltk import OpenGLFrame as TkOpenGLFrame
@@ -15,10 +27,14 @@ try:
         glViewport, glMatrixMode, GL_PROJECTION, GL_MODELVIEW,
         glLoadIdentity, glOrtho, glEnable, GL_TEXTURE_2D, glDisable,
         glBindTexture, glTexParameteri, GL_TEXTURE_MIN_FILTER, GL_TEXTURE_MAG_FILTER,
-        GL_LINEAR, glTexImage2D, GL_RGBA, GL_UNSIGNED_BYTE,
-        glGenTextures, glBegin, glEnd, GL_QUADS, glTexCoord2f, glVertex2f,
+        GL_LINEAR, GL_NEAREST, glTexImage2D, glTexSubImage2D,
+        GL_RGBA, GL_RGB, GL_LUMINANCE, GL_ALPHA, GL_UNSIGNED_BYTE,
+        glGenTextures, glDeleteTextures, glBegin, glEnd, GL_QUADS, glTexCoord2f, glVertex2f,
+        glColor4f, glTexEnvi, GL_TEXTURE_ENV, GL_TEXTURE_ENV_MODE, GL_MODULATE,
+        glPixelStorei, GL_UNPACK_ALIGNMENT, GL_TEXTURE_WRAP_S, GL_TEXTURE_WRAP_T, GL_CLAMP_TO_EDGE,
         glBlendFunc, glEnableClientState, glDisableClientState,
-        GL_BLEND, GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA
+        GL_BLEND, GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA,
+        glGetIntegerv, GL_MAX_TEXTURE_SIZE
     )
     OPENGL_AVAILABLE = True
     _IMPORT_ERROR = None
@@ -30,42 +46,122 @@ from PIL import Image
 import numpy as np
 import time
 
+from image_pyramid import ImagePyramid
+
+OVERLAY_COLOR = (1.0, 0.0, 0.0)  # Red dust detection, as in the Tk overlay
+TILE_SIZE = 1024  # Image tile side (clamped to GL_MAX_TEXTURE_SIZE)
+MAX_RESIDENT_TILES = 64  # Tile textures kept across frames (~3 MB each for RGB)
+MAX_MASK_SIDE = 4096  # The overlay stays one texture, downsampled past this
+
+ImageSource = Union[Image.Image, ImagePyramid]
+
+
+def visible_tiles(level_size: Tuple[int, int], tile_size: int,
+                  visible: Tuple[float, float, float, float]) -> List[Tuple[int, int, int, int]]:
+    """Tile boxes (x0, y0, x1, y1) of a level that overlap `visible` (u0, v0, u1, v1 image fractions)"""
+    width, height = level_size
+    u0, v0, u1, v1 = visible
+    if u1 <= u0 or v1 <= v0:
+        return []
+    first_x = max(0, int(u0 * width) // tile_size)
+    last_x = min((width - 1) // tile_size, int(math.ceil(u1 * width) - 1) // tile_size)
+    first_y = max(0, int(v0 * height) // tile_size)
+    last_y = min((height - 1) // tile_size, int(math.ceil(v1 * height) - 1) // tile_size)
+    return [(tx * tile_size, ty * tile_size,
+             min(width, (tx + 1) * tile_size), min(height, (ty + 1) * tile_size))
+            for ty in range(first_y, last_y + 1) for tx in range(first_x, last_x + 1)]
+
+
+def fit_size(size: Tuple[int, int], max_side: int) -> Tuple[int, int]:
+    """`size` scaled down (keeping aspect) so its long side is at most max_side"""
+    scale = min(1.0, max_side / float(max(size)))
+    return max(1, int(round(size[0] * scale))), max(1, int(round(size[1] * scale)))
+
 
 if OPENGL_AVAILABLE:
     class GLImageView(TkOpenGLFrame):
-        """A lightweight GL viewer that draws a base image and an optional RGBA overlay."""
+        """A lightweight GL viewer: base image, optional processed image for a split, tinted mask overlay."""
 
         def __init__(self, master=None, **kw):
             super().__init__(master, **kw)
-            self.base_image: Optional[Image.Image] = None
-            self.overlay_image: Optional[Image.Image] = None
+            self.base_image: Optional[ImageSource] = None
+            self.processed_image: Optional[ImageSource] = None
+            self.mask: Optional[np.ndarray] = None
 
-            self.base_tex: Optional[int] = None
-            self.overlay_tex: Optional[int] = None
+            self.base_tiles: Optional[TiledTexture] = None
+            self.processed_tiles: Optional[TiledTexture] = None
+            self.mask_tex: Optional[int] = None
             self.base_size: Tuple[int, int] = (1, 1)
+            self.max_texture_size: int = TILE_SIZE
 
             self.zoom: float = 1.0
             self.offset: Tuple[float, float] = (0.0, 0.0)
+            # Fraction of the width showing the processed image, None for a single view
+            self.split: Optional[float] = None
+            self.overlay_opacity: float = 0.5
+
+            # Textures waiting for upload on the next redraw, and mask patches
+            # (x, y, uint8 region) waiting for a sub-image update
+            self._pending = set()
+            self._mask_patches = []
+
+        # Public API
+        def set_images(self, base: Optional[ImageSource], processed: Optional[ImageSource] = None):
+            """Set the base (original) image and, for the split view, the processed one
+
+            Either may be an ImagePyramid, which lets zoomed views draw tiles of the
+            full-resolution scan instead of magnifying a single preview texture.
+            """
+            if base is not self.base_image:
+                self.base_image = base
+                self._pending.add('base')
+            if processed is not self.processed_image:
+                self.processed_image = processed
+                self._pending.add('processed')
+            if base is not None:
+                self.base_size = base.size
+            if self._pending:
+                print(f"[GL] set_images: base={None if base is None else base.size}, "
+                      f"processed={None if processed is None else processed.size} (flagged for upload)")
+            self.after_idle(self.redraw)
+
+        def mask_size_for(self, size: Tuple[int, int]) -> Tuple[int, int]:
+            """Size of the mask texture to upload for an image of `size`"""
+            return fit_size(size, min(MAX_MASK_SIDE, self.max_texture_size))
+
+        def set_mask(self, mask: Optional[np.ndarray]):
+            """Replace the uint8 dust mask drawn over the base image (a full texture upload)"""
+            if mask is None and self.mask is None:
+                return
+            self.mask = mask
+            self._mask_patches = []
+            self._pending.add('mask')
+            self.after_idle(self.redraw)
+
+        def update_mask_region(self, region: np.ndarray, x: int, y: int):
+            """Patch the mask at (x, y) with a uint8 region; only those bytes are uploaded"""
+            if self.mask is None:
+                return
+            region = np.ascontiguousarray(region, dtype=np.uint8)
+            self.mask[y:y + region.shape[0], x:x + region.shape[1]] = region
+            if 'mask' not in self._pending:
+                self._mask_patches.append((x, y, region))
+            self.after_idle(self.redraw)
+
+        def set_overlay_opacity(self, opacity: float):
+            self.overlay_opacity = float(opacity)
+            self.after_idle(self.redraw)
+
+        def set_split(self, position: Optional[float]):
+            """Show processed | original split at `position` (0..1), or None for a single view"""
+            self.split = None if position is None else min(1.0, max(0.0, float(position)))
+            self.after_idle(self.redraw)
 
-            self._needs_upload = False
-
-    # Public API
-    def set_images(self, base: Optional[Image.Image], overlay_rgba: Optional[Image.Image]):
-        t0 = time.time()
-        self.base_image = base
-        self.overlay_image = overlay_rgba
-        if base is not None:
-            self.base_size = base.size
-        self._needs_upload = True
-        print(f"[GL] set_images: base={None if base is None else base.size}, overlay={None if overlay_rgba is None else overlay_rgba.size}")
-        print(f"[GL] set_images took {(time.time()-t0)*1000:.2f} ms (flagged for upload)")
-        self.after_idle(self.redraw)
-
-    def set_view(self, zoom: float, offset: Tuple[float, float]):
-        print(f"[GL] set_view: zoom={zoom:.3f}, offset=({offset[0]:.1f},{offset[1]:.1f})")
-        self.zoom = max(zoom, 0.01)
-        self.offset = offset
-        self.after_idle(self.redraw)
+        def set_view(self, zoom: float, offset: Tuple[float, float]):
+            print(f"[GL] set_view: zoom={zoom:.3f}, offset=({offset[0]:.1f},{offset[1]:.1f})")
+            self.zoom = max(zoom, 0.01)
+            self.offset = offset
+            self.after_idle(self.redraw)
 
         # OpenGL lifecycle
         def initgl(self):
@@ -73,6 +169,11 @@ if OPENGL_AVAILABLE:
             glEnable(GL_TEXTURE_2D)
             glEnable(GL_BLEND)
             glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
+            # Texture colour times vertex colour: tints the alpha-only mask
+            glTexEnvi(GL_TEXTURE_ENV, GL_TEXTURE_ENV_MODE, GL_MODULATE)
+            # Mask rows are tightly packed single bytes
+            glPixelStorei(GL_UNPACK_ALIGNMENT, 1)
+            self.max_texture_size = int(glGetIntegerv(GL_MAX_TEXTURE_SIZE))
 
         def redraw(self):
             t0 = time.time()
@@ -90,7 +191,8 @@ if OPENGL_AVAILABLE:
                 self.swapbuffers()
                 return
 
-            if self._needs_upload:
+            uploaded = bool(self._pending or self._mask_patches)
+            if uploaded:
                 self._upload_textures()
 
             # Compute fitted size, then apply zoom and pan
@@ -105,64 +207,171 @@ if OPENGL_AVAILABLE:
             disp_h = img_h * scale * self.zoom
             cx = width * 0.5 + self.offset[0]
             cy = height * 0.5 + self.offset[1]
+            rect = (cx - disp_w * 0.5, cy - disp_h * 0.5, cx + disp_w * 0.5, cy + disp_h * 0.5)
 
-            x0 = cx - disp_w * 0.5
-            y0 = cy - disp_h * 0.5
-            x1 = cx + disp_w * 0.5
-            y1 = cy + disp_h * 0.5
-
-            # Draw base
-            if self.base_tex is not None:
-                glBindTexture(GL_TEXTURE_2D, self.base_tex)
-                glBegin(GL_QUADS)
-                glTexCoord2f(0.0, 1.0); glVertex2f(x0, y1)
-                glTexCoord2f(1.0, 1.0); glVertex2f(x1, y1)
-                glTexCoord2f(1.0, 0.0); glVertex2f(x1, y0)
-                glTexCoord2f(0.0, 0.0); glVertex2f(x0, y0)
-                glEnd()
-
-            # Draw overlay
-            if self.overlay_tex is not None:
-                glBindTexture(GL_TEXTURE_2D, self.overlay_tex)
-                glBegin(GL_QUADS)
-                glTexCoord2f(0.0, 1.0); glVertex2f(x0, y1)
-                glTexCoord2f(1.0, 1.0); glVertex2f(x1, y1)
-                glTexCoord2f(1.0, 0.0); glVertex2f(x1, y0)
-                glTexCoord2f(0.0, 0.0); glVertex2f(x0, y0)
-                glEnd()
+            # Processed on the left of the split, original (with its overlay) on the right
+            split = self.split if self.processed_tiles is not None else None
+            original_from = 0.0 if split is None else split
+
+            glColor4f(1.0, 1.0, 1.0, 1.0)
+            if split is not None and split > 0.0:
+                self.processed_tiles.draw(rect, 0.0, split, (width, height))
+            if self.base_tiles is not None and original_from < 1.0:
+                self.base_tiles.draw(rect, original_from, 1.0, (width, height))
+
+            # Mask overlay: red, with the opacity applied through the vertex alpha
+            if self.mask_tex is not None and original_from < 1.0 and self.overlay_opacity > 0.0:
+                glColor4f(OVERLAY_COLOR[0], OVERLAY_COLOR[1], OVERLAY_COLOR[2], self.overlay_opacity)
+                self._draw_quad(self.mask_tex, rect, original_from, 1.0)
+                glColor4f(1.0, 1.0, 1.0, 1.0)
 
             self.swapbuffers()
-            print(f"[GL] redraw done in {(time.time()-t0)*1000:.2f} ms (upload={self._needs_upload})")
+            print(f"[GL] redraw done in {(time.time()-t0)*1000:.2f} ms (upload={uploaded})")
+
+        # Helpers
+        def _draw_quad(self, texture, rect, u0: float, u1: float):
+            """Draw columns u0..u1 (texture fractions) of `texture` at their place inside rect"""
+            x0, y0, x1, y1 = rect
+            left = x0 + (x1 - x0) * u0
+            right = x0 + (x1 - x0) * u1
+            _draw_textured(texture, (left, y0, right, y1), (u0, 0.0, u1, 1.0))
+
+        def _tiles_for(self, tiles: Optional["TiledTexture"], image: Optional[ImageSource]):
+            if tiles is not None:
+                tiles.release()
+            if image is None:
+                return None
+            return TiledTexture(image, min(TILE_SIZE, self.max_texture_size))
 
-    # Helpers
         def _upload_textures(self):
             t0 = time.time()
-            # Base
-            if self.base_image is not None:
-                base_rgba = self.base_image.convert('RGBA')
-                base_bytes = base_rgba.tobytes('raw', 'RGBA')
-                self.base_tex = self.base_tex or glGenTextures(1)
-                glBindTexture(GL_TEXTURE_2D, self.base_tex)
-                glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
-                glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
-                glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, base_rgba.width, base_rgba.height, 0,
-                             GL_RGBA, GL_UNSIGNED_BYTE, base_bytes)
-
-            # Overlay
-            if self.overlay_image is not None:
-                ov = self.overlay_image.convert('RGBA')
-                ov_bytes = ov.tobytes('raw', 'RGBA')
-                self.overlay_tex = self.overlay_tex or glGenTextures(1)
-                glBindTexture(GL_TEXTURE_2D, self.overlay_tex)
-                glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
-                glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
-                glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, ov.width, ov.height, 0,
-                             GL_RGBA, GL_UNSIGNED_BYTE, ov_bytes)
-            else:
-                self.overlay_tex = None
-
-            self._needs_upload = False
-            print(f"[GL] _upload_textures: base={None if self.base_image is None else self.base_image.size}, overlay={None if self.overlay_image is None else self.overlay_image.size}, took {(time.time()-t0)*1000:.2f} ms")
+            pending, self._pending = self._pending, set()
+            # Image tiles are uploaded lazily as they come into view
+            if 'base' in pending:
+                self.base_tiles = self._tiles_for(self.base_tiles, self.base_image)
+            if 'processed' in pending:
+                self.processed_tiles = self._tiles_for(self.processed_tiles, self.processed_image)
+            if 'mask' in pending:
+                if self.mask is None:
+                    if self.mask_tex is not None:
+                        glDeleteTextures([self.mask_tex])
+                    self.mask_tex = None
+                else:
+                    # One byte per pixel instead of an RGBA overlay: a quarter of the upload
+                    mask = np.ascontiguousarray(self.mask, dtype=np.uint8)
+                    self.mask_tex = _upload_texture(self.mask_tex, GL_ALPHA, mask.shape[1], mask.shape[0],
+                                                         GL_ALPHA, mask, mag_filter=GL_NEAREST)
+            patches, self._mask_patches = self._mask_patches, []
+            if self.mask_tex is not None and patches:
+                glBindTexture(GL_TEXTURE_2D, self.mask_tex)
+                for x, y, region in patches:
+                    glTexSubImage2D(GL_TEXTURE_2D, 0, x, y, region.shape[1], region.shape[0],
+                                    GL_ALPHA, GL_UNSIGNED_BYTE, region)
+            patched = sum(region.nbytes for _, _, region in patches)
+            print(f"[GL] _upload_textures: {sorted(pending)}, {len(patches)} mask patches ({patched} bytes), "
+                  f"took {(time.time()-t0)*1000:.2f} ms")
+
+    class TiledTexture:
+        """An image drawn as tiles of its pyramid level closest to the on-screen size
+
+        Tiles are uploaded when first drawn and kept in an LRU of textures, so
+        panning at 1:1 only uploads the tiles that scroll into view.
+        """
+
+        def __init__(self, image: ImageSource, tile_size: int = TILE_SIZE,
+                     max_tiles: int = MAX_RESIDENT_TILES):
+            self.levels: List[Image.Image] = list(image.levels) if isinstance(image, ImagePyramid) else [image]
+            self.tile_size = tile_size
+            self.max_tiles = max_tiles
+            self._tiles = OrderedDict()  # (level, x0, y0) -> texture
+
+        def level_for(self, display_width: float) -> int:
+            """Index of the coarsest level at least display_width pixels wide"""
+            for index in range(len(self.levels) - 1, -1, -1):
+                if self.levels[index].width >= display_width:
+                    return index
+            return 0
+
+        def draw(self, rect, u0: float, u1: float, screen_size: Tuple[int, int]):
+            """Draw columns u0..u1 (image fractions) at their place inside rect, clipped to the screen"""
+            x0, y0, x1, y1 = rect
+            rect_w, rect_h = x1 - x0, y1 - y0
+            if rect_w <= 0 or rect_h <= 0:
+                return
+            visible = (max(u0, -x0 / rect_w), max(0.0, -y0 / rect_h),
+                       min(u1, (screen_size[0] - x0) / rect_w), min(1.0, (screen_size[1] - y0) / rect_h))
+            index = self.level_for(rect_w)
+            level = self.levels[index]
+            width, height = level.size
+            used = set()
+            for box in visible_tiles(level.size, self.tile_size, visible):
+                key = (index,) + box[:2]
+                used.add(key)
+                texture = self._tile(key, level, box)
+                # The part of this tile inside the visible columns, as image fractions
+                tu0, tu1 = max(box[0] / width, visible[0]), min(box[2] / width, visible[2])
+                tv0, tv1 = box[1] / height, box[3] / height
+                if tu1 <= tu0:
+                    continue
+                tile_w, tile_h = box[2] - box[0], box[3] - box[1]
+                _draw_textured(texture,
+                               (x0 + tu0 * rect_w, y0 + tv0 * rect_h, x0 + tu1 * rect_w, y0 + tv1 * rect_h),
+                               ((tu0 * width - box[0]) / tile_w, 0.0, (tu1 * width - box[0]) / tile_w, 1.0))
+            self._evict(used)
+
+        def release(self):
+            if self._tiles:
+                glDeleteTextures(list(self._tiles.values()))
+            self._tiles.clear()
+
+        def _tile(self, key, level: Image.Image, box):
+            texture = self._tiles.get(key)
+            if texture is not None:
+                self._tiles.move_to_end(key)
+                return texture
+            texture = _upload_image(None, level.crop(box))
+            self._tiles[key] = texture
+            return texture
+
+        def _evict(self, used):
+            # Least recently drawn first; never the tiles of the frame just drawn
+            while len(self._tiles) > self.max_tiles:
+                key = next(iter(self._tiles))
+                if key in used:
+                    break
+                glDeleteTextures([self._tiles.pop(key)])
+
+    def _draw_textured(texture, screen_box, tex_box):
+        """Draw texcoords tex_box (s0, t0, s1, t1) of `texture` over screen_box (x0, y0, x1, y1)"""
+        x0, y0, x1, y1 = screen_box
+        s0, t0, s1, t1 = tex_box
+        glBindTexture(GL_TEXTURE_2D, texture)
+        glBegin(GL_QUADS)
+        glTexCoord2f(s0, t1); glVertex2f(x0, y1)
+        glTexCoord2f(s1, t1); glVertex2f(x1, y1)
+        glTexCoord2f(s1, t0); glVertex2f(x1, y0)
+        glTexCoord2f(s0, t0); glVertex2f(x0, y0)
+        glEnd()
+
+    def _upload_texture(texture, internal_format, width, height, pixel_format, data, mag_filter=GL_LINEAR):
+        texture = texture or glGenTextures(1)
+        glBindTexture(GL_TEXTURE_2D, texture)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, mag_filter)
+        # Split quads and tiles sample right up to their edge columns
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_CLAMP_TO_EDGE)
+        glTexImage2D(GL_TEXTURE_2D, 0, internal_format, width, height, 0,
+                     pixel_format, GL_UNSIGNED_BYTE, data)
+        return texture
+
+    def _upload_image(texture, image: Image.Image):
+        # Upload in the image's own layout; no RGBA conversion copy
+        formats = {'RGB': GL_RGB, 'RGBA': GL_RGBA, 'L': GL_LUMINANCE}
+        if image.mode not in formats:
+            image = image.convert('RGB')
+        pixel_format = formats[image.mode]
+        return _upload_texture(texture, pixel_format, image.width, image.height, pixel_format, image.tobytes())
 else:
     class GLImageView:  # stub to provide informative error if used when unavailable
         def __init__(self, *args, **kwargs):
@@ -170,6 +379,4 @@ else:
 
 
 GL_IMPORT_ERROR = _IMPORT_ERROR
-__all__ = ["GLImageView", "OPENGL_AVAILABLE", "GL_IMPORT_ERROR"]
-
-
+__all__ = ["GLImageView", "OPENGL_AVAILABLE", "GL_IMPORT_ERROR", "visible_tiles", "fit_size"]
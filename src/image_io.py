@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Image I/O
+
+Loads and saves scans as numpy arrays at their native bit depth (uint8 or
+uint16, RGB or greyscale) so 16-bit TIFF/PNG scans go through detection,
+inpainting and export without being quantized to 8 bits. PIL images are
+only produced as 8-bit views for display.
+"""
+
+from pathlib import Path
+from typing import Optional, Union
+
+import cv2
+import numpy as np
+from PIL import Image
+
+HIGH_BIT_DEPTH_EXTENSIONS = ('.tif', '.tiff', '.png')
+
+
+def load_image_array(path: Union[str, Path]) -> np.ndarray:
+    """Decode an image file to an RGB (or greyscale) uint8/uint16 array"""
+    # imdecode on the raw bytes also copes with non-ASCII paths on Windows
+    data = np.fromfile(str(path), dtype=np.uint8)
+    array = cv2.imdecode(data, cv2.IMREAD_UNCHANGED)
+    if array is None:
+        # Formats OpenCV cannot read (e.g. some TIFF compressions): fall back to PIL
+        with Image.open(path) as image:
+            return np.array(image.convert('RGB'))
+
+    if array.ndim == 3:
+        code = cv2.COLOR_BGRA2RGB if array.shape[2] == 4 else cv2.COLOR_BGR2RGB
+        array = cv2.cvtColor(array, code)
+    return _to_supported_dtype(array)
+
+
+def load_draft(path: Union[str, Path], min_side: int = 512) -> Optional[Image.Image]:
+    """Quick reduced-resolution 8-bit decode for a first look, or None if the format has no cheap path
+
+    JPEGs decode straight to 1/2, 1/4 or 1/8 scale via PIL's draft mode (DCT
+    scaling), many times faster than the full decode that follows. Also None
+    when the JPEG is too small to reduce, as the draft would be a full decode.
+    """
+    try:
+        with Image.open(path) as image:
+            full_size = image.size
+            # draft() picks the smallest scale still at least min_side on both axes
+            if image.draft('RGB', (min_side, min_side)) is None or image.size == full_size:
+                return None
+            return image.convert('RGB')
+    except Exception as e:
+        print(f"⚠️ Draft decode failed: {e}")
+        return None
+
+
+def save_image_array(path: Union[str, Path], array: np.ndarray, jpeg_quality: int = 95) -> None:
+    """Encode an array to disk, keeping 16 bits where the format allows it"""
+    ext = Path(path).suffix.lower()
+    params = []
+    if ext in ('.jpg', '.jpeg'):
+        params = [cv2.IMWRITE_JPEG_QUALITY, int(jpeg_quality)]
+    if ext not in HIGH_BIT_DEPTH_EXTENSIONS:
+        array = to_uint8(array)
+
+    if array.ndim == 3:
+        array = cv2.cvtColor(array, cv2.COLOR_RGB2BGR)
+    ok, encoded = cv2.imencode(ext, array, params)
+    if not ok:
+        raise ValueError(f"Could not encode image as {ext}")
+    encoded.tofile(str(path))
+
+
+def to_uint8(array: np.ndarray) -> np.ndarray:
+    """8-bit version of an array (no copy if it already is 8-bit)"""
+    if array.dtype == np.uint8:
+        return array
+    return (array >> 8).astype(np.uint8)
+
+
+def to_pil(array: np.ndarray) -> Image.Image:
+    """8-bit PIL view of an array for display and detection"""
+    array = np.ascontiguousarray(to_uint8(array))
+    if array.ndim == 2:
+        return Image.frombuffer('L', (array.shape[1], array.shape[0]), array, 'raw', 'L', 0, 1)
+    # Shares memory with `array`, so 8-bit frames are not held twice
+    return Image.frombuffer('RGB', (array.shape[1], array.shape[0]), array, 'raw', 'RGB', 0, 1)
+
+
+def to_grayscale_uint8(array: np.ndarray) -> np.ndarray:
+    """Single-channel 8-bit luminance, as fed to the U-Net"""
+    if array.ndim == 3:
+        array = cv2.cvtColor(array, cv2.COLOR_RGB2GRAY)
+    return to_uint8(array)
+
+
+def is_high_bit_depth(array: np.ndarray) -> bool:
+    """True when the array carries more than 8 bits per channel"""
+    return array.dtype != np.uint8
+
+
+def _to_supported_dtype(array: np.ndarray) -> np.ndarray:
+    """Map decoder output onto uint8/uint16"""
+    if array.dtype in (np.uint8, np.uint16):
+        return array
+    if np.issubdtype(array.dtype, np.floating):
+        # Float TIFFs are normalised 0..1
+        return (np.clip(array, 0.0, 1.0) * 65535.0 + 0.5).astype(np.uint16)
+    raise ValueError(f"Unsupported image data type: {array.dtype}")
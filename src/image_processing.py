@@ -10,10 +10,19 @@ import torch
 import torch.nn as nn
 from PIL import Image, ImageDraw
 import cv2
-from typing import Optional, Tuple, List
-import threading
+from typing import Optional, Tuple, List, Iterator
+import os
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
 from dataclasses import dataclass
+from enum import Enum
+from functools import lru_cache
+from pathlib import Path
+
+import image_io
+from inpaint_pool import InpaintProcessPool, telea
+from lazy_prediction import LazyPrediction
 
 
 # Import model architecture (copy from notebook)
@@ -73,9 +82,71 @@ except ImportError:
     LAMA_AVAILABLE = False
 
 
+# Optional: psutil gives a portable view of free system memory for batch sizing
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+
+# The U-Net is trained on (and always fed) 1024x1024 greyscale inputs
+MODEL_INPUT_SIZE = 1024
+# Rough peak activation memory of one 1024x1024 float32 forward pass under
+# no_grad (skip connections e1..e4 stay alive until the decoder finishes)
+UNET_BYTES_PER_FRAME = 2 * 1024 ** 3
+
+# Detection modes: "fast" squeezes the frame to one 1024x1024 pass,
+# "tiled" slides 1024x1024 windows over the full-resolution scan
+DETECTION_MODES = ("fast", "tiled")
+
+
+class RemovalStage(Enum):
+    """Stages of band-wise removal, reported to removal progress callbacks"""
+    DILATE = "Dilating mask"
+    INPAINT = "Inpainting"
+    BLEND = "Blending"
+
+
+@lru_cache(maxsize=8)
+def _blend_window(window_size: int) -> np.ndarray:
+    """Precomputed 2D Hann weight window for overlap blending of tiles"""
+    ramp = 0.5 - 0.5 * np.cos(2.0 * np.pi * (np.arange(window_size) + 0.5) / window_size)
+    # Keep a small floor so pixels covered by a single tile (image borders) stay well defined
+    ramp = np.maximum(ramp, 1e-3).astype(np.float32)
+    window = np.outer(ramp, ramp)
+    window.setflags(write=False)
+    return window
+
+
+def _tile_origins(length: int, window_size: int, stride: int) -> List[int]:
+    """Start offsets covering [0, length) with windows; the last one is clamped to the edge"""
+    if length <= window_size:
+        return [0]
+    origins = list(range(0, length - window_size + 1, stride))
+    if origins[-1] + window_size < length:
+        origins.append(length - window_size)
+    return origins
+
+
+@dataclass
+class DustRegion:
+    """Padded crop around one group of nearby dust components"""
+    x0: int
+    y0: int
+    x1: int
+    y1: int
+    mask: np.ndarray  # uint8 mask of this group's pixels only, crop-sized
+
+    @property
+    def area(self) -> int:
+        return (self.x1 - self.x0) * (self.y1 - self.y0)
+
+
 class LamaInpainter:
     """LaMa deep learning inpainting wrapper"""
-    def __init__(self):
+    def __init__(self, inpaint_pool: Optional[InpaintProcessPool] = None):
+        self.inpaint_pool = inpaint_pool
         self.device = torch.device("mps" if torch.backends.mps.is_available() else 
                                  "cuda" if torch.cuda.is_available() else "cpu")
         self.available = False
@@ -104,29 +175,39 @@ class LamaInpainter:
                 print(f"Failed to load LaMa: {e}")
                 self.available = False
     
-    def inpaint(self, image: Image.Image, mask: Image.Image) -> Image.Image:
-        """Inpaint using LaMa or fallback to advanced CV2"""
+    def inpaint(self, image, mask):
+        """
+        Inpaint using LaMa or fallback to advanced CV2.
+
+        Accepts PIL images or numpy arrays; arrays are returned as arrays at
+        their own bit depth. LaMa itself is 8-bit, so for 16-bit input only
+        its fill of the masked pixels is scaled back into the native frame.
+        """
+        as_array = isinstance(image, np.ndarray)
+        image_np = image if as_array else np.array(image.convert('RGB'))
+        mask_np = mask if isinstance(mask, np.ndarray) else np.array(mask.convert('L'))
+        
         if not self.available:
-            return self._fallback_inpaint(image, mask)
+            result = self._fallback_inpaint(image_np, mask_np)
+            return result if as_array else Image.fromarray(result)
         
         try:
-            # Convert to numpy
-            image_np = np.array(image.convert('RGB'))
-            mask_np = np.array(mask.convert('L'))
-                
-            result = self.model(image_np, mask_np, self.config)
-            return Image.fromarray(result)
+            fill = self.model(image_io.to_uint8(image_np), mask_np, self.config)
+            if image_io.is_high_bit_depth(image_np):
+                result = image_np.copy()
+                ImageProcessingService.blend_arrays(result, fill.astype(np.uint16) * 257, mask_np)
+            else:
+                result = fill
+            return result if as_array else Image.fromarray(result)
             
         except Exception as e:
             print(f"LaMa failed: {e}, falling back to CV2")
-            return self._fallback_inpaint(image, mask)
+            result = self._fallback_inpaint(image_np, mask_np)
+            return result if as_array else Image.fromarray(result)
     
-    def _fallback_inpaint(self, image: Image.Image, mask: Image.Image) -> Image.Image:
+    def _fallback_inpaint(self, image_np: np.ndarray, mask_np: np.ndarray) -> np.ndarray:
         """Fallback to TELEA CV2 inpainting with a single pass (radius=5)."""
-        image_np = np.array(image.convert('RGB'))
-        mask_np = np.array(mask.convert('L'))
-        result = cv2.inpaint(image_np, mask_np, inpaintRadius=5, flags=cv2.INPAINT_TELEA)
-        return Image.fromarray(result)
+        return ImageProcessingService.inpaint_regions(image_np, mask_np, radius=5, inpaint_pool=self.inpaint_pool)
 
 
 class ImageProcessingService:
@@ -167,30 +248,93 @@ class ImageProcessingService:
             traceback.print_exc()
             raise
     
+    @staticmethod
+    def find_model_weights() -> Optional[str]:
+        """Find U-Net weights - prioritize the specific weights file from main.ipynb"""
+        # First, look for the exact weights file mentioned in main.ipynb
+        exact_weight_path = Path(__file__).parent / "weights" / "v5_bce_unet_epoch30.pth"
+        if exact_weight_path.exists():
+            print(f"✅ Found exact weights file: {exact_weight_path}")
+            return str(exact_weight_path)
+        
+        # Fallback: search in common locations
+        search_dirs = [
+            Path(__file__).parent / "weights",
+            Path(__file__).parent / "checkpoints", 
+            Path.cwd() / "models",
+            Path.cwd() / "checkpoints",
+            Path.cwd() / "weights",
+            Path.cwd().parent / "models",
+            Path.cwd().parent / "checkpoints",
+        ]
+        
+        for search_dir in search_dirs:
+            if search_dir.exists():
+                print(f"🔍 Searching in: {search_dir}")
+                # Look for U-Net models (prioritize v5 and v6 models from notebook)
+                for pattern in ["v5_*.pth", "v6_*.pth", "*unet*.pth", "*.pth"]:
+                    unet_files = list(search_dir.glob(pattern))
+                    if unet_files:
+                        # Sort by name to get latest version
+                        unet_files.sort(reverse=True)
+                        print(f"✅ Found weights file: {unet_files[0]}")
+                        return str(unet_files[0])
+        
+        return None
+    
     @staticmethod
     def predict_dust_mask(model: UNet, image_path_or_image, threshold: float = 0.5, 
                          window_size: int = 1024, stride: int = 512, 
-                         device: torch.device = None, progress_callback: Optional[callable] = None) -> np.ndarray:
+                         device: torch.device = None, progress_callback: Optional[callable] = None,
+                         mode: str = "fast", batch_size: Optional[int] = None,
+                         stats: Optional[dict] = None, cache=None,
+                         cache_key: Optional[str] = None, lazy: bool = False):
         """
         Fast path: scale the original image to 1024x1024 (squeezed), run once,
         then scale the probability map back to the original resolution.
 
-        window_size/stride are ignored in this mode (kept for API compatibility).
+        window_size/stride are only used by mode="tiled", which runs the
+        sliding-window detector over the full-resolution scan instead.
+        With a PredictionCache and key, inference is skipped on a hit; the
+        fast path caches the 1024x1024 map and re-upscales it.
+        With lazy=True the fast path returns a LazyPrediction that keeps the
+        1024x1024 map and upsamples only what is read.
         """
         if device is None:
             device = torch.device("mps" if torch.backends.mps.is_available() else "cpu")
+        use_cache = cache is not None and cache_key is not None
+
+        if mode == "tiled":
+            cached = cache.get(cache_key) if use_cache else None
+            if cached is not None:
+                print(f"⚡ Using cached full-resolution prediction {cache_key[:10]}")
+                return cached
+            prediction = ImageProcessingService.predict_dust_mask_tiled(
+                model, image_path_or_image, window_size=window_size, stride=stride,
+                device=device, batch_size=batch_size,
+                progress_callback=progress_callback, stats=stats
+            )
+            if use_cache:
+                cache.put(cache_key, prediction)
+            return prediction
+        if mode != "fast":
+            raise ValueError(f"Unknown detection mode: {mode} (expected one of {DETECTION_MODES})")
 
         # Load image in grayscale
-        if isinstance(image_path_or_image, str):
-            image = Image.open(image_path_or_image).convert('L')
-        else:
-            image = image_path_or_image.convert('L') if image_path_or_image.mode != 'L' else image_path_or_image
+        image = ImageProcessingService._load_grayscale(image_path_or_image)
 
         orig_w, orig_h = image.size
         print(f"🔍 Input image size: {orig_w}x{orig_h}")
 
+        pred_np = cache.get(cache_key) if use_cache else None
+        if pred_np is not None:
+            print(f"⚡ Using cached prediction {cache_key[:10]}")
+            if progress_callback:
+                progress_callback(1.0)
+            return ImageProcessingService._upsample_prediction(pred_np, (orig_w, orig_h), lazy)
+
         # Force-resize to 1024x1024 (squeezed if necessary)
-        target = 1024
+        target = MODEL_INPUT_SIZE
         image_1024 = image.resize((target, target), Image.Resampling.BILINEAR)
 
         img_np = np.array(image_1024, dtype=np.float32) / 255.0
@@ -203,19 +347,210 @@ class ImageProcessingService:
             pred = model(tensor)
             pred_np = pred.squeeze().detach().cpu().numpy().astype(np.float32)
 
+        if use_cache:
+            cache.put(cache_key, pred_np)
+
         if progress_callback:
             progress_callback(0.7)
 
         # Resize prediction back to original dimensions (stretch back)
-        up_pred = cv2.resize(pred_np, (orig_w, orig_h), interpolation=cv2.INTER_LINEAR).astype(np.float32)
+        up_pred = ImageProcessingService._upsample_prediction(pred_np, (orig_w, orig_h), lazy)
 
         if progress_callback:
             progress_callback(1.0)
 
         print(f"🔍 Final prediction shape: {up_pred.shape}")
-        print(f"🔍 Prediction range: {up_pred.min():.6f} to {up_pred.max():.6f}")
+        print(f"🔍 Prediction range: {pred_np.min():.6f} to {pred_np.max():.6f}")
         return up_pred
     
+    @staticmethod
+    def _upsample_prediction(pred_np: np.ndarray, size: Tuple[int, int], lazy: bool = False):
+        """Stretch a model-resolution map to `size`, now or (lazy) on demand"""
+        if lazy:
+            return LazyPrediction(pred_np, size)
+        return cv2.resize(pred_np, size, interpolation=cv2.INTER_LINEAR).astype(np.float32)
+    
+    @staticmethod
+    def predict_dust_mask_tiled(model: UNet, image_path_or_image, window_size: int = 1024,
+                                stride: int = 512, device: torch.device = None,
+                                batch_size: Optional[int] = None,
+                                progress_callback: Optional[callable] = None,
+                                stats: Optional[dict] = None) -> np.ndarray:
+        """
+        Full-resolution path (notebook's sliding window): run the model over
+        overlapping window_size tiles and blend them with a Hann window.
+
+        Tiles are generated lazily and accumulated into a band only
+        window_size rows tall; rows are normalized and written out as soon as
+        no later tile can touch them, so working memory does not grow with
+        the scan height.
+        """
+        if device is None:
+            device = torch.device("mps" if torch.backends.mps.is_available() else "cpu")
+        if stride <= 0 or stride > window_size:
+            raise ValueError(f"stride must be in (0, window_size], got {stride}")
+        if batch_size is None:
+            batch_size = ImageProcessingService.estimate_batch_size(device)
+        batch_size = max(1, int(batch_size))
+
+        gray = np.asarray(ImageProcessingService._load_grayscale(image_path_or_image))
+        H, W = gray.shape
+        ys = _tile_origins(H, window_size, stride)
+        xs = _tile_origins(W, window_size, stride)
+        total_tiles = len(ys) * len(xs)
+        print(f"🔍 Tiled detection: {W}x{H} → {total_tiles} tiles ({window_size}px, stride {stride})")
+
+        window = _blend_window(window_size)
+        output = np.empty((H, W), dtype=np.float32)
+        band_rows = min(H, window_size)
+        acc = np.zeros((band_rows, W), dtype=np.float32)
+        wsum = np.zeros((band_rows, W), dtype=np.float32)
+        band_y0 = 0
+
+        def flush_rows(until_y: int) -> None:
+            """Normalize band rows above until_y into the output and slide the band down"""
+            nonlocal band_y0
+            n = until_y - band_y0
+            if n <= 0:
+                return
+            output[band_y0:until_y] = acc[:n] / np.maximum(wsum[:n], 1e-8)
+            acc[:band_rows - n] = acc[n:].copy()
+            wsum[:band_rows - n] = wsum[n:].copy()
+            acc[band_rows - n:] = 0.0
+            wsum[band_rows - n:] = 0.0
+            band_y0 = until_y
+
+        def iter_tiles() -> Iterator[Tuple[int, int, np.ndarray]]:
+            for y in ys:
+                for x in xs:
+                    patch = gray[y:y + window_size, x:x + window_size]
+                    ph, pw = patch.shape
+                    if ph < window_size or pw < window_size:
+                        # Smaller-than-window scans: reflect-pad the tile like the notebook
+                        patch = np.pad(patch, ((0, window_size - ph), (0, window_size - pw)), mode='reflect')
+                    yield y, x, patch
+
+        done = 0
+        infer_time = 0.0
+        tiles = iter_tiles()
+        batch_np = np.empty((batch_size, 1, window_size, window_size), dtype=np.float32)
+        while True:
+            batch = []
+            for y, x, patch in tiles:
+                batch_np[len(batch), 0] = patch
+                batch.append((y, x))
+                if len(batch) == batch_size:
+                    break
+            if not batch:
+                break
+
+            t0 = time.time()
+            with torch.no_grad():
+                tensor = torch.from_numpy(batch_np[:len(batch)] / 255.0).to(device)
+                pred_np = model(tensor).detach().cpu().numpy().astype(np.float32)
+            infer_time += time.time() - t0
+
+            for i, (y, x) in enumerate(batch):
+                flush_rows(y)
+                th = min(window_size, H - y)
+                tw = min(window_size, W - x)
+                by = y - band_y0
+                acc[by:by + th, x:x + tw] += pred_np[i, 0, :th, :tw] * window[:th, :tw]
+                wsum[by:by + th, x:x + tw] += window[:th, :tw]
+
+            done += len(batch)
+            if progress_callback:
+                progress_callback(done / total_tiles)
+
+        flush_rows(H)
+
+        tiles_per_second = total_tiles / infer_time if infer_time > 0 else 0.0
+        print(f"🔍 Tiled detection: {total_tiles} tiles in {infer_time:.2f}s ({tiles_per_second:.2f} tiles/s)")
+        if stats is not None:
+            stats.update(tiles=total_tiles, seconds=infer_time, tiles_per_second=tiles_per_second)
+        return output
+    
+    @staticmethod
+    def available_memory(device: torch.device) -> Optional[int]:
+        """Best-effort estimate of free memory (bytes) on the inference device"""
+        try:
+            if device.type == "cuda":
+                free, _total = torch.cuda.mem_get_info(device)
+                return int(free)
+            if device.type == "mps" and hasattr(torch.mps, "recommended_max_memory"):
+                return int(torch.mps.recommended_max_memory() - torch.mps.driver_allocated_memory())
+            if PSUTIL_AVAILABLE:
+                return int(psutil.virtual_memory().available)
+            if hasattr(os, "sysconf") and "SC_AVPHYS_PAGES" in os.sysconf_names:
+                return int(os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE"))
+        except Exception as e:
+            print(f"⚠️ Could not query free memory on {device}: {e}")
+        return None
+    
+    @staticmethod
+    def estimate_batch_size(device: torch.device, max_batch_size: int = 8,
+                            memory_fraction: float = 0.5,
+                            bytes_per_frame: int = UNET_BYTES_PER_FRAME) -> int:
+        """Pick how many 1024x1024 frames fit in one forward pass on this device"""
+        free = ImageProcessingService.available_memory(device)
+        if free is None:
+            return 1
+        batch_size = int(free * memory_fraction) // bytes_per_frame
+        batch_size = max(1, min(max_batch_size, batch_size))
+        print(f"🔍 Batch size {batch_size} ({free / 1024 ** 3:.1f} GB free on {device})")
+        return batch_size
+    
+    @staticmethod
+    def predict_dust_masks_batch(model: UNet, images: List, device: torch.device = None,
+                                 batch_size: Optional[int] = None,
+                                 progress_callback: Optional[callable] = None,
+                                 lazy: bool = False) -> List:
+        """
+        Batched fast path: stack N squeezed 1024x1024 frames into one
+        N x 1 x 1024 x 1024 tensor per forward pass and return one full-size
+        probability map per input (same output as predict_dust_mask,
+        including lazy=True returning LazyPrediction maps).
+        """
+        if device is None:
+            device = torch.device("mps" if torch.backends.mps.is_available() else "cpu")
+        if batch_size is None:
+            batch_size = ImageProcessingService.estimate_batch_size(device)
+        batch_size = max(1, int(batch_size))
+
+        predictions: List[np.ndarray] = []
+        total = len(images)
+        for start in range(0, total, batch_size):
+            chunk = images[start:start + batch_size]
+            sizes = []
+            batch_np = np.empty((len(chunk), 1, MODEL_INPUT_SIZE, MODEL_INPUT_SIZE), dtype=np.float32)
+            for i, image_path_or_image in enumerate(chunk):
+                image = ImageProcessingService._load_grayscale(image_path_or_image)
+                sizes.append(image.size)
+                image_1024 = image.resize((MODEL_INPUT_SIZE, MODEL_INPUT_SIZE), Image.Resampling.BILINEAR)
+                batch_np[i, 0] = np.asarray(image_1024, dtype=np.float32) / 255.0
+
+            with torch.no_grad():
+                pred = model(torch.from_numpy(batch_np).to(device))
+                pred_np = pred.detach().cpu().numpy().astype(np.float32)
+
+            for i, size in enumerate(sizes):
+                predictions.append(ImageProcessingService._upsample_prediction(pred_np[i, 0], size, lazy))
+
+            print(f"🔍 Batch inference: {len(predictions)}/{total} frames")
+            if progress_callback:
+                progress_callback(len(predictions) / total)
+
+        return predictions
+    
+    @staticmethod
+    def _load_grayscale(image_path_or_image) -> Image.Image:
+        """Load a path, array or PIL image as an 8-bit greyscale PIL image"""
+        if isinstance(image_path_or_image, (str, Path)):
+            image_path_or_image = image_io.load_image_array(image_path_or_image)
+        if isinstance(image_path_or_image, np.ndarray):
+            return Image.fromarray(image_io.to_grayscale_uint8(image_path_or_image), mode='L')
+        return image_path_or_image.convert('L') if image_path_or_image.mode != 'L' else image_path_or_image
+    
     @staticmethod
     def create_binary_mask(prediction: np.ndarray, threshold: float, 
                           original_size: Tuple[int, int]) -> Image.Image:
@@ -223,6 +558,10 @@ class ImageProcessingService:
         print(f"🎯 Creating binary mask with threshold {threshold:.3f}")
         print(f"🔍 Prediction shape: {prediction.shape}, Original size: {original_size}")
         
+        if isinstance(prediction, LazyPrediction) and prediction.size == tuple(original_size):
+            # Threshold band by band; the full-resolution float map is never built
+            return Image.fromarray(prediction.threshold(threshold), mode='L')
+        
         # Handle different prediction shapes (from PyTorch model)
         if len(prediction.shape) == 4:
             # Shape is typically (1, 1, H, W) from PyTorch
@@ -298,139 +637,494 @@ class ImageProcessingService:
         if mask.size != original.size:
             mask = mask.resize(original.size, Image.NEAREST)
         
-        # Convert to numpy arrays
-        orig_np = np.array(original, dtype=np.float32)
-        inpaint_np = np.array(inpainted, dtype=np.float32)
-        mask_np = np.array(mask, dtype=np.float32) / 255.0
-        
-        # Expand mask to 3 channels
-        mask_3d = np.stack([mask_np] * 3, axis=2)
-        
-        # Blend: use inpainted where mask is white, original elsewhere
-        blended = orig_np * (1 - mask_3d) + inpaint_np * mask_3d
+        # Masked copy into one working copy of the original (no float32 frames)
+        result_np = np.array(original)
+        ImageProcessingService.blend_arrays(result_np, np.asarray(inpainted), np.asarray(mask))
         
         # Convert back to PIL
-        result = Image.fromarray(np.clip(blended, 0, 255).astype(np.uint8))
+        result = Image.fromarray(result_np)
         
         print(f"✅ Images blended successfully")
         return result
+    
+    @staticmethod
+    def blend_arrays(original: np.ndarray, inpainted: np.ndarray, mask: np.ndarray,
+                     feather: int = 0, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Blend inpainted pixels into original, touching only masked pixels.
 
+        Works in place on uint8 or uint16 arrays (HxW or HxWxC): `out`
+        defaults to `original` itself. Binary (0/255) masks become a plain
+        masked copy; soft mask values are blended in float only where
+        0 < mask < 255. With feather > 0 the mask edge is softened by a
+        Gaussian, computed only inside the padded dust regions.
+        """
+        if out is None:
+            out = original
+        elif out is not original:
+            np.copyto(out, original)
+        if mask.ndim == 3:
+            mask = mask[..., 0]
 
-class BrushTools:
-    """Tools for brush and eraser operations on masks"""
+        if feather > 0:
+            # Soft edges spread `feather` pixels, so crops need that much padding
+            sigma = feather / 2.0
+            for region in ImageProcessingService.find_dust_regions(mask, padding=2 * feather + 1):
+                window = (slice(region.y0, region.y1), slice(region.x0, region.x1))
+                alpha = cv2.GaussianBlur(region.mask.astype(np.float32) / 255.0, (0, 0), sigma)
+                alpha = np.maximum(alpha, region.mask / 255.0)
+                ImageProcessingService._blend_soft(out[window], inpainted[window], alpha)
+            return out
+
+        solid = mask >= 255
+        if out.flags.c_contiguous and inpainted.flags.c_contiguous:
+            # Flat gather/scatter is far cheaper than a broadcast copyto(where=)
+            idx = np.flatnonzero(solid)
+            channels = out.shape[2] if out.ndim == 3 else 1
+            out.reshape(-1, channels)[idx] = inpainted.reshape(-1, channels)[idx]
+        else:
+            out[solid] = inpainted[solid]
+
+        # Partial coverage (antialiased or hand-painted masks): float only on those pixels
+        soft = (mask > 0) & ~solid
+        if soft.any():
+            ys, xs = np.nonzero(soft)
+            alpha = mask[ys, xs].astype(np.float32) / 255.0
+            if out.ndim == 3:
+                alpha = alpha[:, None]
+            blended = out[ys, xs] * (1 - alpha) + inpainted[ys, xs].astype(np.float32) * alpha
+            out[ys, xs] = np.clip(blended, 0, np.iinfo(out.dtype).max).astype(out.dtype)
+        return out
     
     @staticmethod
-    def apply_circular_brush(mask: Image.Image, center: Tuple[float, float], 
-                           radius: int, is_erasing: bool = True) -> Image.Image:
-        """Apply circular brush stroke to mask"""
-        # Convert to numpy for processing
+    def _blend_soft(out: np.ndarray, inpainted: np.ndarray, alpha: np.ndarray) -> None:
+        """orig*(1-a) + inpaint*a for the pixels of one crop where alpha > 0"""
+        ys, xs = np.nonzero(alpha > 0)
+        a = alpha[ys, xs]
+        if out.ndim == 3:
+            a = a[:, None]
+        blended = out[ys, xs] * (1 - a) + inpainted[ys, xs].astype(np.float32) * a
+        out[ys, xs] = np.clip(blended, 0, np.iinfo(out.dtype).max).astype(out.dtype)
+    
+    @staticmethod
+    def inpaint_cv2(image: Image.Image, mask: Image.Image, radius: int = 5,
+                    inpaint_pool: Optional[InpaintProcessPool] = None) -> Image.Image:
+        """Perform single-pass CV2 TELEA inpainting (fast), only around dust regions."""
+        # Convert PIL images to numpy arrays
+        image_np = np.array(image.convert('RGB'))
         mask_np = np.array(mask.convert('L'))
-        h, w = mask_np.shape
-        
-        # Convert center to integer coordinates
-        cx, cy = int(center[0]), int(center[1])
         
-        # Bounds check
-        if cx < 0 or cx >= w or cy < 0 or cy >= h:
-            return mask
-        
-        # Create circular brush
-        y, x = np.ogrid[:h, :w]
-        mask_circle = (x - cx) ** 2 + (y - cy) ** 2 <= radius ** 2
-        
-        # Apply brush
-        if is_erasing:
-            mask_np[mask_circle] = 0  # Erase (set to black)
+        print(f"🔍 Image shape: {image_np.shape}, Mask shape: {mask_np.shape}")
+        result = ImageProcessingService.inpaint_regions(image_np, mask_np, radius=radius, out=image_np,
+                                                        inpaint_pool=inpaint_pool)
+        print(f"✅ CV2 single-pass inpainting completed (radius={radius})")
+        return Image.fromarray(result)
+    
+    @staticmethod
+    def find_dust_regions(mask_np: np.ndarray, padding: int = 12) -> List[DustRegion]:
+        """
+        Group dust pixels into padded, non-interacting crops.
+
+        The mask is max-pooled onto a coarse grid (one cell = `padding`
+        pixels) and grown by one cell; connected groups of cells become one
+        crop each. Dust of a different group is therefore always at least
+        `padding` away, so with padding > inpaint radius every crop
+        inpaints exactly as it would inside the full frame.
+        """
+        H, W = mask_np.shape[:2]
+        groups = ImageProcessingService._dust_groups(mask_np, padding)
+        if groups is None:
+            return []
+        cell, group_labels, group_stats = groups
+        regions = []
+        for k in range(1, len(group_stats)):
+            gx, gy, gw, gh, _area = group_stats[k]
+            x0, y0 = gx * cell, gy * cell
+            x1, y1 = min(W, (gx + gw) * cell), min(H, (gy + gh) * cell)
+            # Bounding boxes of different groups may overlap; keep only this group's cells
+            cells = (group_labels[gy:gy + gh, gx:gx + gw] == k).astype(np.uint8)
+            owned = np.repeat(np.repeat(cells, cell, axis=0), cell, axis=1)[:y1 - y0, :x1 - x0]
+            crop_mask = np.where(owned > 0, mask_np[y0:y1, x0:x1], 0).astype(np.uint8)
+            regions.append(DustRegion(x0, y0, x1, y1, crop_mask))
+        return regions
+    
+    @staticmethod
+    def _dust_groups(mask_np: np.ndarray, padding: int) -> Optional[Tuple[int, np.ndarray, np.ndarray]]:
+        """(cell size, grid labels, grid stats) of the coarse dust groups, or None without dust"""
+        H, W = mask_np.shape[:2]
+        cell = max(8, int(padding))
+        # Max-pool to the coarse grid (cheap: runs over the 1-byte mask only)
+        rows = np.maximum.reduceat(mask_np, np.arange(0, H, cell), axis=0)
+        occupied = np.maximum.reduceat(rows, np.arange(0, W, cell), axis=1)
+        if not occupied.any():
+            return None
+        grid = cv2.dilate((occupied > 0).astype(np.uint8), np.ones((3, 3), np.uint8))
+        _n_groups, group_labels, group_stats, _ = cv2.connectedComponentsWithStats(grid, connectivity=8)
+        return cell, group_labels, group_stats
+
+    @staticmethod
+    def dust_row_extents(mask_np: np.ndarray, padding: int = 12) -> Tuple[np.ndarray, np.ndarray]:
+        """First and last+1 rows of every dust group of find_dust_regions (without building the crops)"""
+        groups = ImageProcessingService._dust_groups(mask_np, padding)
+        if groups is None:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        cell, _labels, group_stats = groups
+        top = group_stats[1:, cv2.CC_STAT_TOP].astype(np.int64)
+        height = group_stats[1:, cv2.CC_STAT_HEIGHT].astype(np.int64)
+        return top * cell, np.minimum(mask_np.shape[0], (top + height) * cell)
+
+    @staticmethod
+    def inpaint_regions(image_np: np.ndarray, mask_np: np.ndarray, radius: int = 5,
+                        padding: Optional[int] = None, max_workers: Optional[int] = None,
+                        out: Optional[np.ndarray] = None,
+                        progress_callback: Optional[callable] = None,
+                        inpaint_pool: Optional[InpaintProcessPool] = None) -> np.ndarray:
+        """
+        Sparse TELEA inpainting: inpaint only padded crops around connected
+        dust components (in parallel) and paste the filled pixels back.
+
+        Equivalent to cv2.inpaint over the whole frame, but the cost scales
+        with dust area instead of image area. Writes into `out` when given
+        (may be image_np itself), otherwise into a copy. `progress_callback`
+        gets the fraction of crop area done after each crop; if it raises,
+        crops not yet started are dropped and the exception propagates.
+        With an `inpaint_pool`, enough dust area is inpainted in its worker
+        processes instead of threads.
+        """
+        if padding is None:
+            padding = 2 * radius + 2
+        result = image_np.copy() if out is None else out
+        if out is not None and out is not image_np:
+            np.copyto(result, image_np)
+
+        regions = ImageProcessingService.find_dust_regions(mask_np, padding=padding)
+        if not regions:
+            return result
+
+        def inpaint_region(region: DustRegion) -> None:
+            crop = image_np[region.y0:region.y1, region.x0:region.x1]
+            filled = telea(crop, region.mask, radius)
+            target = result[region.y0:region.y1, region.x0:region.x1]
+            where = region.mask > 0
+            np.copyto(target, filled, where=where[..., None] if target.ndim == 3 else where)
+
+        covered = sum(region.area for region in regions)
+        print(f"🔍 Inpainting {len(regions)} dust regions "
+              f"({covered / float(mask_np.size) * 100:.2f}% of frame)")
+
+        if inpaint_pool is not None and inpaint_pool.available and covered >= inpaint_pool.min_area:
+            try:
+                inpaint_pool.inpaint(image_np, regions, radius, result, progress_callback)
+                return result
+            except (OSError, BrokenProcessPool) as e:
+                print(f"⚠️ Inpaint process pool failed, using threads: {e}")
+                inpaint_pool.available = False
+
+        done = 0
+        # cv2.inpaint releases the GIL, so threads give real parallelism
+        workers = max_workers or os.cpu_count() or 1
+        if workers <= 1 or len(regions) == 1:
+            for region in regions:
+                inpaint_region(region)
+                done += region.area
+                if progress_callback:
+                    progress_callback(done / covered)
         else:
-            mask_np[mask_circle] = 255  # Add dust (set to white)
-        
-        return Image.fromarray(mask_np, mode='L')
+            # Largest crops first so the pool drains evenly
+            regions.sort(key=lambda region: region.area, reverse=True)
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = {executor.submit(inpaint_region, region): region for region in regions}
+                try:
+                    for future in as_completed(futures):
+                        future.result()
+                        done += futures[future].area
+                        if progress_callback:
+                            progress_callback(done / covered)
+                except BaseException:
+                    # Crops already running finish; the rest never start
+                    for future in futures:
+                        future.cancel()
+                    raise
+        return result
     
     @staticmethod
-    def interpolated_stroke(mask: Image.Image, start_point: Tuple[float, float],
-                          end_point: Tuple[float, float], radius: int, 
-                          is_erasing: bool = True) -> Image.Image:
-        """Apply interpolated stroke between two points"""
-        # Calculate distance and steps
+    def remove_dust_streaming(image, mask, band_height: int = 512, kernel_size: int = 5,
+                              radius: int = 5, halo: Optional[int] = None,
+                              progress_callback: Optional[callable] = None,
+                              inpaint_pool: Optional[InpaintProcessPool] = None) -> Image.Image:
+        """
+        Memory-bounded removal: dilate, inpaint and blend one horizontal band
+        at a time and paste it into the output image.
+
+        Each band is processed with `halo` extra rows of context above and
+        below, widened to take in every dust group the band touches, so
+        dilation and TELEA see the same neighbourhood as a full-frame pass
+        and the result matches it; only the band's own rows are written
+        back. The working set is a few copies of one band (taller where a
+        long hair or scratch crosses it) instead of several full-frame
+        RGB/float32 buffers.
+
+        `progress_callback(progress, stage)` is called with the overall
+        fraction done and the RemovalStage being worked on, several times
+        per band; an exception raised from it (e.g. a cancellation) aborts
+        the removal between stages. With an `inpaint_pool` the inpainting
+        runs in worker processes, off this process's GIL.
+        """
+        if isinstance(image, np.ndarray):
+            image = Image.fromarray(image)
+        if isinstance(mask, np.ndarray):
+            mask = Image.fromarray(mask, mode='L')
+        mask = mask.convert('L') if mask.mode != 'L' else mask
+        if mask.size != image.size:
+            mask = mask.resize(image.size, Image.NEAREST)
+
+        W, H = image.size
+        result = Image.new('RGB', (W, H))
+        for y0, y1, cy0, cy1, inner, report in ImageProcessingService._iter_bands(
+                np.asarray(mask), band_height, kernel_size, radius, halo, progress_callback):
+            band_rgb = np.array(image.crop((0, cy0, W, cy1)).convert('RGB'))
+            band_mask = np.asarray(mask.crop((0, cy0, W, cy1)))
+            ImageProcessingService._remove_dust_band(band_rgb, band_mask, inner, kernel_size, radius,
+                                                     report, inpaint_pool)
+            result.paste(Image.fromarray(band_rgb[inner]), (0, y0))
+
+        print("✅ Streaming removal completed")
+        return result
+    
+    @staticmethod
+    def remove_dust_array(image_np: np.ndarray, mask_np: np.ndarray, band_height: int = 512,
+                          kernel_size: int = 5, radius: int = 5, halo: Optional[int] = None,
+                          progress_callback: Optional[callable] = None,
+                          inpaint_pool: Optional[InpaintProcessPool] = None) -> np.ndarray:
+        """
+        remove_dust_streaming for numpy frames at their native bit depth
+        (uint8 or uint16, RGB or greyscale). No PIL mode conversions: each
+        band is read as a view of `image_np` and the result has its dtype.
+        """
+        H, W = image_np.shape[:2]
+        if mask_np.ndim == 3:
+            mask_np = mask_np[..., 0]
+        if mask_np.shape != (H, W):
+            mask_np = cv2.resize(mask_np, (W, H), interpolation=cv2.INTER_NEAREST)
+
+        result = np.empty_like(image_np)
+        for y0, y1, cy0, cy1, inner, report in ImageProcessingService._iter_bands(
+                mask_np, band_height, kernel_size, radius, halo, progress_callback):
+            # Bands are processed in a copy so later bands still see the original halo rows
+            band = image_np[cy0:cy1].copy()
+            ImageProcessingService._remove_dust_band(band, mask_np[cy0:cy1], inner, kernel_size, radius,
+                                                     report, inpaint_pool)
+            result[y0:y1] = band[inner]
+
+        print(f"✅ Streaming removal completed ({image_np.dtype})")
+        return result
+    
+    @staticmethod
+    def _iter_bands(mask_np: np.ndarray, band_height: int, kernel_size: int, radius: int,
+                    halo: Optional[int], progress_callback: Optional[callable]
+                    ) -> Iterator[Tuple[int, int, int, int, slice, Optional[callable]]]:
+        """Yield (y0, y1, context_y0, context_y1, inner rows, report) for each band
+
+        The context covers `halo` rows plus every dust group (as grouped by
+        find_dust_regions, whose one-cell margin also holds the dilation)
+        that reaches into the band: TELEA's fill order depends on the whole
+        dilated component, so a component cut at the context edge would
+        inpaint differently. `report(fraction, stage)` maps progress within
+        the band onto the whole frame for progress_callback (None without a
+        callback).
+        """
+        H, W = mask_np.shape[:2]
+        band_height = max(1, int(band_height))
+        if halo is None:
+            # Enough context for the dilation kernel plus several inpaint radii
+            halo = max(32, kernel_size + 4 * radius)
+        n_bands = (H + band_height - 1) // band_height
+        print(f"🎨 Streaming removal: {W}x{H} in {n_bands} bands of {band_height} rows (halo {halo})")
+        group_y0, group_y1 = ImageProcessingService.dust_row_extents(
+            mask_np, padding=max(2 * radius + 2, kernel_size))
+
+        for i, y0 in enumerate(range(0, H, band_height)):
+            y1 = min(H, y0 + band_height)
+            touching = (group_y0 < y1) & (group_y1 > y0)
+            if touching.any():
+                cy0 = max(0, min(y0, int(group_y0[touching].min())) - halo)
+                cy1 = min(H, max(y1, int(group_y1[touching].max())) + halo)
+            else:
+                cy0 = max(0, y0 - halo)
+                cy1 = min(H, y1 + halo)
+            report = None
+            if progress_callback:
+                def report(fraction: float, stage: RemovalStage, i=i) -> None:
+                    progress_callback((i + fraction) / n_bands, stage)
+            yield y0, y1, cy0, cy1, slice(y0 - cy0, y1 - cy0), report
+            if report:
+                report(1.0, RemovalStage.BLEND)
+    
+    @staticmethod
+    def _remove_dust_band(band: np.ndarray, band_mask: np.ndarray, inner: slice,
+                          kernel_size: int, radius: int, report: Optional[callable] = None,
+                          inpaint_pool: Optional[InpaintProcessPool] = None) -> None:
+        """Dilate, inpaint and blend one band; only its `inner` rows are updated (in place)"""
+        if report:
+            report(0.0, RemovalStage.DILATE)
+        kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (kernel_size, kernel_size))
+        band_mask = cv2.dilate(band_mask, kernel, iterations=1)
+        if band_mask[inner].any():
+            # Inpainting dominates the band's time; dilation and blending get the ends
+            inpaint_progress = None
+            if report:
+                report(0.1, RemovalStage.INPAINT)
+                inpaint_progress = lambda fraction: report(0.1 + 0.8 * fraction, RemovalStage.INPAINT)
+            inpainted = ImageProcessingService.inpaint_regions(band, band_mask, radius=radius,
+                                                              progress_callback=inpaint_progress,
+                                                              inpaint_pool=inpaint_pool)
+            if report:
+                report(0.9, RemovalStage.BLEND)
+            ImageProcessingService.blend_arrays(band[inner], inpainted[inner], band_mask[inner])
+
+
+@dataclass
+class DirtyRect:
+    """Half-open pixel rectangle [x0, x1) x [y0, y1) touched by an edit"""
+    x0: int
+    y0: int
+    x1: int
+    y1: int
+
+    @property
+    def is_empty(self) -> bool:
+        return self.x1 <= self.x0 or self.y1 <= self.y0
+
+    @property
+    def box(self) -> Tuple[int, int, int, int]:
+        """(left, upper, right, lower) as PIL's crop/paste expect"""
+        return self.x0, self.y0, self.x1, self.y1
+
+    def union(self, other: Optional["DirtyRect"]) -> "DirtyRect":
+        if other is None or other.is_empty:
+            return self
+        if self.is_empty:
+            return other
+        return DirtyRect(min(self.x0, other.x0), min(self.y0, other.y0),
+                         max(self.x1, other.x1), max(self.y1, other.y1))
+
+    def scaled(self, from_size: Tuple[int, int], to_size: Tuple[int, int]) -> "DirtyRect":
+        """The rectangle covering the same area in an image of to_size (rounded outwards)"""
+        sx, sy = to_size[0] / float(from_size[0]), to_size[1] / float(from_size[1])
+        return DirtyRect(max(0, int(np.floor(self.x0 * sx))), max(0, int(np.floor(self.y0 * sy))),
+                         min(to_size[0], int(np.ceil(self.x1 * sx))),
+                         min(to_size[1], int(np.ceil(self.y1 * sy))))
+
+
+@lru_cache(maxsize=64)
+def _disc_stencil(radius: int) -> np.ndarray:
+    """Boolean (2r+1)x(2r+1) disc of pixels within radius of the centre"""
+    y, x = np.ogrid[-radius:radius + 1, -radius:radius + 1]
+    stencil = x * x + y * y <= radius * radius
+    stencil.setflags(write=False)
+    return stencil
+
+
+class BrushEngine:
+    """Brush/eraser rasterizer over a persistent uint8 mask buffer
+
+    Stamps write into the buffer in place and only touch the stamp's bounding
+    box, using a cached disc stencil per radius. Every edit is reported as a
+    DirtyRect and accumulated in `dirty` until the display takes it. The
+    pixels a stroke covered are also tracked (`touched`, bounded by
+    `stroke_dirty`) until reset_stroke(), so they can be carried over to
+    another resolution without touching anything else.
+    """
+
+    def __init__(self, buffer: np.ndarray):
+        if buffer.dtype != np.uint8 or buffer.ndim != 2:
+            raise ValueError("BrushEngine needs a 2D uint8 mask buffer")
+        self.buffer = buffer
+        self.dirty: Optional[DirtyRect] = None
+        self.touched = np.zeros(buffer.shape, dtype=bool)
+        self.stroke_dirty: Optional[DirtyRect] = None
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        return self.buffer.shape[1], self.buffer.shape[0]
+
+    def stamp(self, center: Tuple[float, float], radius: int,
+              is_erasing: bool = True) -> Optional[DirtyRect]:
+        """Apply one circular stamp; returns the rectangle it changed (None if off the mask)"""
+        h, w = self.buffer.shape
+        cx, cy = int(center[0]), int(center[1])
+        if cx < 0 or cx >= w or cy < 0 or cy >= h:
+            return None
+
+        radius = max(0, int(radius))
+        stencil = _disc_stencil(radius)
+        x0, y0 = max(0, cx - radius), max(0, cy - radius)
+        x1, y1 = min(w, cx + radius + 1), min(h, cy + radius + 1)
+        # Clip the stencil the same way the rectangle was clipped at the borders
+        sx0, sy0 = x0 - (cx - radius), y0 - (cy - radius)
+        stencil = stencil[sy0:sy0 + (y1 - y0), sx0:sx0 + (x1 - x0)]
+        self.buffer[y0:y1, x0:x1][stencil] = 0 if is_erasing else 255
+        self.touched[y0:y1, x0:x1] |= stencil
+
+        rect = DirtyRect(x0, y0, x1, y1)
+        self.dirty = rect.union(self.dirty)
+        self.stroke_dirty = rect.union(self.stroke_dirty)
+        return rect
+
+    def stroke(self, start_point: Optional[Tuple[float, float]], end_point: Tuple[float, float],
+               radius: int, is_erasing: bool = True) -> Optional[DirtyRect]:
+        """Stamp along start -> end (a single stamp without a start); returns the changed rectangle"""
+        if start_point is None:
+            return self.stamp(end_point, radius, is_erasing)
         dx = end_point[0] - start_point[0]
         dy = end_point[1] - start_point[1]
         distance = np.sqrt(dx * dx + dy * dy)
-        
         if distance < 1.0:
-            # Single point application
-            return BrushTools.apply_circular_brush(mask, end_point, radius, is_erasing)
-        
-        # Calculate number of steps based on brush size
+            return self.stamp(end_point, radius, is_erasing)
+
+        # Same spacing as the original brush: a quarter radius between stamps
         spacing = max(1.0, radius * 0.25)
         steps = max(1, int(distance / spacing))
-        
-        # Apply brush at interpolated points
-        current_mask = mask
+        changed = None
         for i in range(steps + 1):
-            t = i / steps if steps > 0 else 0
-            interp_point = (
-                start_point[0] + t * dx,
-                start_point[1] + t * dy
-            )
-            current_mask = BrushTools.apply_circular_brush(
-                current_mask, interp_point, radius, is_erasing
-            )
-        
-        return current_mask
+            t = i / steps
+            rect = self.stamp((start_point[0] + t * dx, start_point[1] + t * dy), radius, is_erasing)
+            if rect is not None:
+                changed = rect.union(changed)
+        return changed
 
+    def take_dirty(self) -> Optional[DirtyRect]:
+        """Rectangle changed since the last call (None if nothing changed)"""
+        dirty, self.dirty = self.dirty, None
+        return dirty
 
-class ProcessingTask:
-    """Async processing task wrapper"""
-    
-    def __init__(self, target_func, args=(), kwargs=None, callback=None, error_callback=None):
-        self.target_func = target_func
-        self.args = args
-        self.kwargs = kwargs or {}
-        self.callback = callback
-        self.error_callback = error_callback
-        self.thread = None
-        self.result = None
-        self.error = None
-        self.completed = False
-    
-    def start(self):
-        """Start the processing task"""
-        self.thread = threading.Thread(target=self._run)
-        self.thread.daemon = True
-        self.thread.start()
-    
-    def _run(self):
-        """Run the task in background thread"""
-        try:
-            print(f"🧵 ProcessingTask thread started")
-            start_time = time.time()
-            self.result = self.target_func(*self.args, **self.kwargs)
-            end_time = time.time()
-            
-            print(f"🧵 ProcessingTask completed, result type: {type(self.result)}")
-            self.completed = True
-            
-            if self.callback:
-                print(f"🧵 Calling completion callback...")
-                self.callback(self.result, end_time - start_time)
-            else:
-                print(f"🧵 No callback provided")
-        except Exception as e:
-            print(f"🧵 ProcessingTask error: {e}")
-            self.error = e
-            self.completed = True
-            
-            if self.error_callback:
-                print(f"🧵 Calling error callback...")
-                self.error_callback(e)
-            else:
-                print(f"🧵 No error callback provided")
+    def reset_stroke(self) -> None:
+        """Forget which pixels the current stroke touched"""
+        if self.stroke_dirty is not None:
+            rect = self.stroke_dirty
+            self.touched[rect.y0:rect.y1, rect.x0:rect.x1] = False
+            self.stroke_dirty = None
+
+
+class BrushTools:
+    """Tools for brush and eraser operations on masks"""
     
-    def is_running(self) -> bool:
-        """Check if task is still running"""
-        return self.thread is not None and self.thread.is_alive()
+    @staticmethod
+    def apply_circular_brush(mask: Image.Image, center: Tuple[float, float], 
+                           radius: int, is_erasing: bool = True) -> Image.Image:
+        """Apply circular brush stroke to mask"""
+        engine = BrushEngine(np.array(mask.convert('L')))
+        if engine.stamp(center, radius, is_erasing) is None:
+            return mask
+        return Image.fromarray(engine.buffer, mode='L')
     
-    def join(self, timeout=None):
-        """Wait for task completion"""
-        if self.thread:
-            self.thread.join(timeout)
+    @staticmethod
+    def interpolated_stroke(mask: Image.Image, start_point: Tuple[float, float],
+                          end_point: Tuple[float, float], radius: int, 
+                          is_erasing: bool = True) -> Image.Image:
+        """Apply interpolated stroke between two points"""
+        # One numpy round-trip for the whole stroke instead of one per stamp
+        engine = BrushEngine(np.array(mask.convert('L')))
+        engine.stroke(start_point, end_point, radius, is_erasing)
+        return Image.fromarray(engine.buffer, mode='L')
+
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Image Pyramid
+
+Mipmap levels of a loaded scan (each level half the size of the previous
+one) so the canvas can draw just the visible viewport at any zoom: the crop
+is resampled from the coarsest level that still has at least as many pixels
+as the screen, instead of resizing a whole image to the zoomed size. The dust
+mask gets the same treatment for the red detection overlay.
+"""
+
+from typing import List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from image_processing import DirtyRect
+from threshold_mask import nearest_indices
+
+MIN_LEVEL_SIDE = 512  # Stop halving once the long side gets this small
+
+
+class ImagePyramid:
+    """Successively halved copies of an image for drawing zoomed viewports"""
+
+    def __init__(self, image: Image.Image, min_level_side: int = MIN_LEVEL_SIDE):
+        # The source is kept as level 0 (not copied), so full zoom shows every pixel
+        self.source = image
+        self.levels: List[Image.Image] = [image]
+        while max(self.levels[-1].size) >= 2 * min_level_side:
+            # reduce() box-filters 2x2 blocks: cheap and alias-free for halving
+            self.levels.append(self.levels[-1].reduce(2))
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        return self.source.size
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the levels beyond the source image"""
+        return sum(level.width * level.height * len(level.getbands()) for level in self.levels[1:])
+
+    def level_for(self, display_width: int) -> int:
+        """Index of the coarsest level at least display_width pixels wide"""
+        for index in range(len(self.levels) - 1, -1, -1):
+            if self.levels[index].width >= display_width:
+                return index
+        return 0
+
+    def render(self, display_size: Tuple[int, int], viewport: Tuple[int, int, int, int],
+               resample: Optional[int] = None) -> Image.Image:
+        """Viewport (x0, y0, x1, y1) of the image as drawn at display_size, resampled from one level"""
+        level = self.levels[self.level_for(display_size[0])]
+        sx = level.width / float(display_size[0])
+        sy = level.height / float(display_size[1])
+        x0, y0, x1, y1 = viewport
+        box = (x0 * sx, y0 * sy, x1 * sx, y1 * sy)
+        if resample is None:
+            resample = Image.Resampling.LANCZOS
+        return level.resize((x1 - x0, y1 - y0), resample, box=box)
+
+
+def _max_pool(mask: np.ndarray) -> np.ndarray:
+    """Halve a uint8 mask, keeping the maximum of each 2x2 block (odd edges keep their pixels)"""
+    pooled = mask[0::2, 0::2].copy()
+    h, w = mask.shape[0] // 2, mask.shape[1] // 2
+    np.maximum(pooled[:, :w], mask[0::2, 1::2], out=pooled[:, :w])
+    np.maximum(pooled[:h], mask[1::2, 0::2], out=pooled[:h])
+    np.maximum(pooled[:h, :w], mask[1::2, 1::2], out=pooled[:h, :w])
+    return pooled
+
+
+class MaskPyramid:
+    """Max-pooled halvings of a dust mask, for drawing overlay viewports at any zoom
+
+    Max-pooling (rather than averaging or point sampling) keeps single-pixel
+    specks visible when the whole frame is on screen. Level 0 is read from the
+    mask image itself, so deep zoom shows the exact full-resolution pixels.
+    """
+
+    def __init__(self, mask: Image.Image, min_level_side: int = MIN_LEVEL_SIDE):
+        # Kept by reference: in-place brush edits reach level 0 directly
+        self.source = mask
+        self.sizes: List[Tuple[int, int]] = [self.source.size]
+        width, height = self.source.size
+        while max(width, height) >= 2 * min_level_side:
+            width, height = (width + 1) // 2, (height + 1) // 2
+            self.sizes.append((width, height))
+
+        self.levels: List[Optional[np.ndarray]] = [None]
+        if len(self.sizes) > 1:
+            self.levels.append(_max_pool(self._read()))
+            while len(self.levels) < len(self.sizes):
+                self.levels.append(_max_pool(self.levels[-1]))
+
+    def level_for(self, display_width: int) -> int:
+        """Index of the coarsest level at least display_width pixels wide"""
+        for index in range(len(self.sizes) - 1, -1, -1):
+            if self.sizes[index][0] >= display_width:
+                return index
+        return 0
+
+    def refresh(self, rect: DirtyRect) -> None:
+        """Recompute the reduced levels inside `rect` (source pixels) after an in-place edit"""
+        for index in range(1, len(self.levels)):
+            # Parent rectangles stay 2x2-aligned so the pooled blocks match a full rebuild
+            rect = DirtyRect(rect.x0 // 2, rect.y0 // 2, (rect.x1 + 1) // 2, (rect.y1 + 1) // 2)
+            width, height = self.sizes[index - 1]
+            box = (2 * rect.x0, 2 * rect.y0, min(width, 2 * rect.x1), min(height, 2 * rect.y1))
+            if index == 1:
+                parent = self._read(box)
+            else:
+                parent = self.levels[index - 1][box[1]:box[3], box[0]:box[2]]
+            self.levels[index][rect.y0:rect.y1, rect.x0:rect.x1] = _max_pool(parent)
+
+    def render(self, display_size: Tuple[int, int], viewport: Tuple[int, int, int, int]) -> np.ndarray:
+        """uint8 mask of viewport (x0, y0, x1, y1) as drawn at display_size (NEAREST from one level)"""
+        index = self.level_for(display_size[0])
+        width, height = self.sizes[index]
+        x0, y0, x1, y1 = viewport
+        rows = nearest_indices(height, display_size[1])[y0:y1]
+        cols = nearest_indices(width, display_size[0])[x0:x1]
+        if index > 0:
+            return self.levels[index][np.ix_(rows, cols)]
+        # Level 0: only crop the part of the source image the viewport covers
+        region = self._read((int(cols[0]), int(rows[0]), int(cols[-1]) + 1, int(rows[-1]) + 1))
+        return region[np.ix_(rows - rows[0], cols - cols[0])]
+
+    def _read(self, box: Optional[Tuple[int, int, int, int]] = None) -> np.ndarray:
+        """Source pixels (optionally just a box) as a uint8 array"""
+        image = self.source if box is None else self.source.crop(box)
+        return np.asarray(image if image.mode == 'L' else image.convert('L'))
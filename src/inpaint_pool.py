@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Inpaint Pool
+
+TELEA inpainting of dust regions in worker processes, so CPU inpainting
+uses every core without competing with the Tk thread for the GIL. Pixels
+never go through pickle: the frame (or band), the packed region masks and
+the output live in multiprocessing.shared_memory blocks that the workers
+map; a task carries only the block names and its region boxes.
+
+Kept free of torch and UI imports; workers are spawned (not forked) because
+the app process runs Tk, torch and worker threads. A spawned worker also
+re-imports the script the app was launched from, so launch through the
+light spotless_film.py entry, not the heavy spotless_film_modern module.
+"""
+
+import heapq
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+from typing import Callable, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+ArraySpec = Tuple[str, Tuple[int, ...], str]  # (shared memory name, shape, dtype)
+RegionBox = Tuple[int, int, int, int, int]  # (x0, y0, x1, y1, offset into the packed masks)
+CHUNKS_PER_WORKER = 4  # Several chunks per worker keep the pool evenly loaded
+MIN_POOL_AREA = 512 * 512  # Less crop area than this is quicker on threads than handed to processes
+MAX_POOL_WORKERS = 8  # Each worker maps a copy of cv2/numpy; past this, memory grows faster than speed
+
+
+def telea(image_np: np.ndarray, mask_np: np.ndarray, radius: int) -> np.ndarray:
+    """cv2 TELEA at native depth; 16-bit input is only accepted one channel at a time"""
+    if image_np.dtype == np.uint8 or image_np.ndim == 2:
+        return cv2.inpaint(np.ascontiguousarray(image_np), mask_np,
+                           inpaintRadius=radius, flags=cv2.INPAINT_TELEA)
+    # TELEA treats channels independently, so this matches a 3-channel pass
+    channels = [cv2.inpaint(np.ascontiguousarray(image_np[..., c]), mask_np,
+                            inpaintRadius=radius, flags=cv2.INPAINT_TELEA)
+                for c in range(image_np.shape[2])]
+    return np.stack(channels, axis=2)
+
+
+class SharedArray:
+    """A numpy array in a new shared memory block; workers attach to it by `spec`"""
+
+    def __init__(self, shape: Tuple[int, ...], dtype):
+        dtype = np.dtype(dtype)
+        self.shm = shared_memory.SharedMemory(create=True, size=max(1, int(np.prod(shape)) * dtype.itemsize))
+        self.array = np.ndarray(shape, dtype=dtype, buffer=self.shm.buf)
+
+    @classmethod
+    def copy_of(cls, array: np.ndarray) -> "SharedArray":
+        shared = cls(array.shape, array.dtype)
+        np.copyto(shared.array, array)
+        return shared
+
+    @property
+    def spec(self) -> ArraySpec:
+        return self.shm.name, self.array.shape, self.array.dtype.str
+
+    def close(self) -> None:
+        # The view has to go before the mapping it points into can be closed
+        self.array = None
+        self.shm.close()
+        self.shm.unlink()
+
+    def __enter__(self) -> "SharedArray":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def _inpaint_boxes(image: np.ndarray, masks: np.ndarray, result: np.ndarray,
+                   boxes: Sequence[RegionBox], radius: int) -> int:
+    done = 0
+    for x0, y0, x1, y1, offset in boxes:
+        mask = masks[offset:offset + (y1 - y0) * (x1 - x0)].reshape(y1 - y0, x1 - x0)
+        filled = telea(image[y0:y1, x0:x1], mask, radius)
+        target = result[y0:y1, x0:x1]
+        where = mask > 0
+        # Owned pixels of different regions never overlap, so workers can share `result`
+        np.copyto(target, filled, where=where[..., None] if target.ndim == 3 else where)
+        done += (y1 - y0) * (x1 - x0)
+    return done
+
+
+def _inpaint_chunk(image_spec: ArraySpec, masks_spec: ArraySpec, result_spec: ArraySpec,
+                   boxes: Sequence[RegionBox], radius: int) -> int:
+    """Worker process: inpaint boxes from the shared frame into the shared result; returns the area done"""
+    specs = (image_spec, masks_spec, result_spec)
+    blocks = [shared_memory.SharedMemory(name=name) for name, _, _ in specs]
+    try:
+        arrays = [np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+                  for block, (_, shape, dtype) in zip(blocks, specs)]
+        return _inpaint_boxes(*arrays, boxes, radius)
+    finally:
+        arrays = None
+        for block in blocks:
+            try:
+                block.close()
+            except BufferError:
+                pass  # A traceback still holds a view; the mapping goes with the process
+
+
+def _balance(areas: Sequence[int], n_chunks: int) -> List[List[int]]:
+    """Split indices into n_chunks groups of similar total area (largest first, onto the lightest group)"""
+    n_chunks = max(1, min(n_chunks, len(areas)))
+    chunks: List[List[int]] = [[] for _ in range(n_chunks)]
+    loads = [(0, i) for i in range(n_chunks)]
+    for index in sorted(range(len(areas)), key=lambda i: areas[i], reverse=True):
+        load, chunk = heapq.heappop(loads)
+        chunks[chunk].append(index)
+        heapq.heappush(loads, (load + areas[index], chunk))
+    return [chunk for chunk in chunks if chunk]
+
+
+class InpaintProcessPool:
+    """Worker processes that inpaint the DustRegions of a frame in parallel
+
+    Workers start on the first inpaint(), which callers only make for at
+    least `min_area` of dust; `available` turns False if the pool breaks,
+    so callers can fall back to threads. Call shutdown() on exit.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, min_area: int = MIN_POOL_AREA):
+        # By default one core stays with the Tk thread
+        self.max_workers = max_workers or max(1, min((os.cpu_count() or 1) - 1, MAX_POOL_WORKERS))
+        self.min_area = min_area
+        self.available = True
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def inpaint(self, image_np: np.ndarray, regions: Sequence, radius: int, out: np.ndarray,
+                progress_callback: Optional[Callable[[float], None]] = None) -> None:
+        """TELEA each region of image_np into the masked pixels of `out`, across the workers
+
+        `progress_callback` gets the fraction of crop area done after each
+        chunk; if it raises, chunks not yet started are dropped and `out` is
+        left untouched.
+        """
+        areas = [region.area for region in regions]
+        total = sum(areas)
+        offsets = np.concatenate(([0], np.cumsum(areas)))
+        executor = self._get_executor()
+        with SharedArray.copy_of(image_np) as image, \
+                SharedArray((int(offsets[-1]),), np.uint8) as masks, \
+                SharedArray.copy_of(out) as result:
+            for region, offset, area in zip(regions, offsets, areas):
+                masks.array[offset:offset + area] = region.mask.ravel()
+
+            futures = []
+            for chunk in _balance(areas, self.max_workers * CHUNKS_PER_WORKER):
+                boxes = [(regions[i].x0, regions[i].y0, regions[i].x1, regions[i].y1, int(offsets[i]))
+                         for i in chunk]
+                futures.append(executor.submit(_inpaint_chunk, image.spec, masks.spec, result.spec,
+                                               boxes, radius))
+            try:
+                done = 0
+                for future in as_completed(futures):
+                    done += future.result()
+                    if progress_callback:
+                        progress_callback(done / total)
+            except BaseException:
+                # Chunks already handed to a worker finish into a block nobody reads
+                for future in futures:
+                    future.cancel()
+                raise
+            np.copyto(out, result.array)
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                print(f"⚙️ Starting inpaint process pool ({self.max_workers} workers)")
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                     mp_context=multiprocessing.get_context('spawn'))
+            return self._executor
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Job Scheduler
+
+One bounded worker pool for all background work (image loads, detection,
+removal, full-resolution re-thresholding, pyramid builds, roll prefetch)
+instead of a fresh thread per operation. Jobs run in priority order, carry
+a CancellationToken that their stages check, and jobs submitted under the
+same key coalesce: a new one cancels the one it supersedes and only starts
+once that has stopped, so two jobs of one kind never run at once.
+"""
+
+import heapq
+import itertools
+import threading
+import traceback
+from enum import IntEnum
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+
+class Priority(IntEnum):
+    """Lower runs first"""
+    INTERACTIVE = 0  # The user is waiting on it: loads, previews
+    RENDER = 1  # Full-resolution work: detection, removal, re-thresholding
+    PREFETCH = 2  # Speculative work for frames not on screen
+
+
+class OperationCancelled(Exception):
+    """Raised inside a job when its token has been cancelled"""
+
+
+class CancellationToken:
+    """Cancellation flag shared between a job and whoever may supersede it"""
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self) -> None:
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def check(self) -> None:
+        """Call between stages: raises OperationCancelled once cancelled"""
+        if self._event.is_set():
+            raise OperationCancelled()
+
+
+class Job:
+    """A unit of work: func(token) run on a worker, with callbacks for the outcome"""
+
+    def __init__(self, func: Callable[[CancellationToken], Any], priority: Priority,
+                 key: Optional[Hashable], name: str,
+                 on_done: Optional[Callable[[Any], None]] = None,
+                 on_error: Optional[Callable[[Exception], None]] = None,
+                 on_cancelled: Optional[Callable[[], None]] = None):
+        self.func = func
+        self.priority = priority
+        self.key = key
+        self.name = name
+        self.on_done = on_done
+        self.on_error = on_error
+        self.on_cancelled = on_cancelled
+        self.token = CancellationToken()
+        self.result = None
+        self.error: Optional[Exception] = None
+        self._started = threading.Event()
+        self._done = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.token.cancelled
+
+    @property
+    def started(self) -> bool:
+        """True once a worker has taken the job off the queue"""
+        return self._started.is_set()
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def cancel(self) -> None:
+        self.token.cancel()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the job has finished, failed or been cancelled"""
+        return self._done.wait(timeout)
+
+
+class JobScheduler:
+    """Priority queue of Jobs over a fixed number of worker threads
+
+    `dispatch(callback)` hands outcome callbacks to the UI thread (e.g.
+    root.after); without it they run on the worker. PREFETCH jobs never
+    occupy every worker, so interactive work always finds one free.
+    """
+
+    def __init__(self, max_workers: int = 3, dispatch: Optional[Callable[[Callable[[], None]], Any]] = None):
+        self.max_workers = max_workers
+        self.dispatch = dispatch
+        self._condition = threading.Condition()
+        self._queue: List[tuple] = []  # (priority, sequence, job)
+        self._sequence = itertools.count()
+        self._latest: Dict[Hashable, Job] = {}  # Newest job per key, until it is delivered
+        self._running_keys = set()
+        self._deferred: Dict[Hashable, Job] = {}  # Waiting for the running job of their key
+        self._prefetch_running = 0
+        self._shutdown = False
+        self._workers = [threading.Thread(target=self._worker, name=f"job-worker-{i}", daemon=True)
+                         for i in range(max_workers)]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, func: Callable[[CancellationToken], Any], priority: Priority = Priority.RENDER,
+               key: Optional[Hashable] = None, name: Optional[str] = None,
+               on_done: Optional[Callable[[Any], None]] = None,
+               on_error: Optional[Callable[[Exception], None]] = None,
+               on_cancelled: Optional[Callable[[], None]] = None) -> Job:
+        """Queue func(token); a job with the same key supersedes (cancels) the previous one"""
+        job = Job(func, priority, key, name or getattr(func, '__name__', 'job'),
+                  on_done, on_error, on_cancelled)
+        superseded = None
+        with self._condition:
+            if key is not None:
+                previous = self._latest.get(key)
+                if previous is not None:
+                    previous.cancel()
+                self._latest[key] = job
+                if key in self._running_keys:
+                    # Starts once the superseded job has noticed its cancellation
+                    superseded = self._deferred.get(key)
+                    self._deferred[key] = job
+                else:
+                    self._push(job)
+                    self._condition.notify()
+            else:
+                self._push(job)
+                self._condition.notify()
+        if superseded is not None:
+            # Never started, so nothing else will report it
+            superseded._done.set()
+            self._deliver(superseded)
+        return job
+
+    def cancel(self, key: Hashable) -> None:
+        """Cancel the newest job submitted under key (queued, running or awaiting delivery)"""
+        with self._condition:
+            job = self._latest.get(key)
+        if job is not None:
+            job.cancel()
+
+    def shutdown(self) -> None:
+        with self._condition:
+            self._shutdown = True
+            for _, _, job in self._queue:
+                job.cancel()
+            self._condition.notify_all()
+
+    @property
+    def pending(self) -> int:
+        """Jobs queued or deferred, not yet started"""
+        with self._condition:
+            return len(self._queue) + len(self._deferred)
+
+    def _push(self, job: Job) -> None:
+        heapq.heappush(self._queue, (int(job.priority), next(self._sequence), job))
+
+    def _next_job(self) -> Optional[Job]:
+        """Pop the next runnable job (called with the condition held)"""
+        prefetch_limit = max(1, self.max_workers - 1)
+        while True:
+            if self._shutdown:
+                return None
+            if self._queue:
+                job = self._queue[0][2]
+                # Cancelled jobs are popped right away; the worker only reports them
+                if job.cancelled or job.priority < Priority.PREFETCH or self._prefetch_running < prefetch_limit:
+                    return heapq.heappop(self._queue)[2]
+            self._condition.wait()
+
+    def _worker(self) -> None:
+        while True:
+            with self._condition:
+                job = self._next_job()
+                if job is None:
+                    return
+                if job.key is not None:
+                    self._running_keys.add(job.key)
+                if job.priority == Priority.PREFETCH:
+                    self._prefetch_running += 1
+                job._started.set()
+            try:
+                job.token.check()
+                job.result = job.func(job.token)
+                # A result finished after cancellation is stale
+                job.token.check()
+            except OperationCancelled:
+                pass
+            except Exception as e:
+                job.error = e
+            with self._condition:
+                if job.key is not None:
+                    self._running_keys.discard(job.key)
+                    deferred = self._deferred.pop(job.key, None)
+                    if deferred is not None:
+                        self._push(deferred)
+                if job.priority == Priority.PREFETCH:
+                    self._prefetch_running -= 1
+                self._condition.notify_all()
+            job._done.set()
+            self._deliver(job)
+
+    def _deliver(self, job: Job) -> None:
+        """Hand the job's outcome to its callbacks (on the UI thread with a dispatch)"""
+        def deliver():
+            try:
+                # Checked again at delivery: a job superseded after it finished is dropped too
+                if job.cancelled:
+                    if job.on_cancelled:
+                        job.on_cancelled()
+                elif job.error is not None:
+                    if job.on_error:
+                        job.on_error(job.error)
+                    else:
+                        print(f"❌ Job {job.name} failed: {job.error}")
+                        traceback.print_exception(type(job.error), job.error, job.error.__traceback__)
+                elif job.on_done:
+                    job.on_done(job.result)
+            finally:
+                self._release(job)
+
+        if self.dispatch is not None:
+            self.dispatch(deliver)
+        else:
+            deliver()
+
+    def _release(self, job: Job) -> None:
+        """Forget a delivered job, so its result (often a full-resolution frame) can be freed"""
+        job.result = None
+        if job.key is not None:
+            with self._condition:
+                if self._latest.get(job.key) is job:
+                    del self._latest[job.key]
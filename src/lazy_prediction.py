@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Lazy Prediction
+
+The fast detection path runs the U-Net at 1024x1024 and used to stretch the
+probability map to the scan's full resolution straight away: a full-frame
+float32 array (about 200 MB for a 50 MP scan) held for the whole session.
+LazyPrediction keeps the native map instead and computes the bilinear
+upsample only for the rows/pixels that are actually read, band by band.
+"""
+
+from typing import Iterator, Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+def _linear_taps(n_src: int, n_dst: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Source index pairs and weights of cv2.resize INTER_LINEAR along one axis"""
+    scale = n_src / n_dst
+    position = (np.arange(n_dst) + 0.5) * scale - 0.5
+    first = np.floor(position).astype(np.int64)
+    weight = (position - first).astype(np.float32)
+    # Clamp at the borders exactly like OpenCV does
+    before = first < 0
+    first[before], weight[before] = 0, 0
+    after = first >= n_src - 1
+    first[after], weight[after] = n_src - 1, 0
+    return first, np.minimum(first + 1, n_src - 1), weight
+
+
+class LazyPrediction:
+    """Model-resolution prediction that reads like its full-resolution upsample"""
+
+    ndim = 2
+    dtype = np.dtype(np.float32)
+
+    def __init__(self, native: np.ndarray, size: Tuple[int, int]):
+        self.native = np.array(native, dtype=np.float32)
+        self.size = (int(size[0]), int(size[1]))
+        self._x_taps = _linear_taps(self.native.shape[1], self.size[0])
+        self._y_taps = _linear_taps(self.native.shape[0], self.size[1])
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.size[1], self.size[0]
+
+    @property
+    def nbytes(self) -> int:
+        return self.native.nbytes
+
+    def sample(self, rows: np.ndarray, cols: np.ndarray) -> np.ndarray:
+        """Upsampled values at full-resolution rows x cols (matches cv2.resize to ~1e-7)"""
+        y0, y1, wy = (taps[rows] for taps in self._y_taps)
+        x0, x1, wx = (taps[cols] for taps in self._x_taps)
+        # Vertical pass on native rows first: it is len(rows) x 1024, not full width
+        rows_native = self.native[y0] * (1 - wy)[:, None] + self.native[y1] * wy[:, None]
+        return rows_native[:, x0] * (1 - wx) + rows_native[:, x1] * wx
+
+    def band(self, y0: int, y1: int) -> np.ndarray:
+        """Full-width rows y0..y1 of the upsampled prediction"""
+        first, second, weight = self._y_taps
+        r0, r1 = first[y0], second[y1 - 1] + 1
+        # Horizontal pass with OpenCV on just the native rows this band needs,
+        # then one weighted row sum per output row (both run outside numpy)
+        rows_native = cv2.resize(self.native[r0:r1], (self.size[0], r1 - r0),
+                                 interpolation=cv2.INTER_LINEAR)
+        out = np.empty((y1 - y0, self.size[0]), dtype=np.float32)
+        for i, y in enumerate(range(y0, y1)):
+            w = float(weight[y])
+            cv2.addWeighted(rows_native[first[y] - r0], 1.0 - w,
+                            rows_native[second[y] - r0], w, 0.0, dst=out[i])
+        return out
+
+    def iter_bands(self, band_height: int = 512) -> Iterator[Tuple[int, np.ndarray]]:
+        """Yield (y0, rows) over the whole frame without materializing it"""
+        height = self.size[1]
+        for y0 in range(0, height, band_height):
+            yield y0, self.band(y0, min(height, y0 + band_height))
+
+    def threshold(self, threshold: float, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Full-resolution uint8 (0/255) mask of prediction > threshold, built band by band"""
+        if out is None:
+            out = np.empty(self.shape, dtype=np.uint8)
+        for y0, rows in self.iter_bands():
+            np.multiply(rows > threshold, 255, out=out[y0:y0 + len(rows)], casting='unsafe')
+        return out
+
+    def materialize(self) -> np.ndarray:
+        """The full-resolution float32 map (only for callers that really need it)"""
+        full = np.empty(self.shape, dtype=np.float32)
+        for y0, rows in self.iter_bands():
+            full[y0:y0 + len(rows)] = rows
+        return full
+
+    def __array__(self, dtype=None, copy=None):
+        full = self.materialize()
+        return full if dtype is None else full.astype(dtype)
+
+
+def iter_prediction_bands(prediction, band_height: int = 512) -> Iterator[Tuple[int, np.ndarray]]:
+    """Rows of a dense or lazy prediction, band by band"""
+    if isinstance(prediction, LazyPrediction):
+        yield from prediction.iter_bands(band_height)
+        return
+    for y0 in range(0, prediction.shape[0], band_height):
+        yield y0, prediction[y0:y0 + band_height]
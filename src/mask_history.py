@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Mask History
+
+Compact undo history for dust masks. Binary (0/255) masks are stored as
+bit-packed, zlib-compressed snapshots (a 50 MP mask with typical dust
+coverage packs into a few hundred KB instead of 50 MB); anything else falls
+back to compressed bytes. Snapshots are only decoded back into a PIL image
+when they are undone, and the history is bounded by a memory budget rather
+than an entry count.
+"""
+
+import zlib
+from collections import deque
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+DEFAULT_HISTORY_BYTES = 64 * 1024 ** 2
+_COMPRESSION_LEVEL = 1  # Masks are mostly zeros; higher levels barely help
+
+
+@dataclass
+class MaskSnapshot:
+    """One compressed mask in the undo history"""
+    size: Tuple[int, int]
+    packed: bool
+    payload: bytes
+
+    @classmethod
+    def from_mask(cls, mask: Image.Image) -> "MaskSnapshot":
+        mask_np = np.asarray(mask.convert('L') if mask.mode != 'L' else mask)
+        nonzero = mask_np != 0
+        # Only binary masks survive bit-packing losslessly
+        packed = not np.any(mask_np[nonzero] != 255)
+        data = np.packbits(nonzero) if packed else mask_np
+        return cls(mask.size, packed, zlib.compress(data.tobytes(), _COMPRESSION_LEVEL))
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.payload)
+
+    def to_image(self) -> Image.Image:
+        """Decode back into a full-resolution L-mode mask"""
+        width, height = self.size
+        raw = np.frombuffer(zlib.decompress(self.payload), dtype=np.uint8)
+        if self.packed:
+            mask_np = np.unpackbits(raw, count=width * height).reshape(height, width)
+            mask_np *= 255
+        else:
+            mask_np = raw.reshape(height, width)
+        return Image.fromarray(mask_np, mode='L')
+
+
+class MaskHistory:
+    """Undo stack of MaskSnapshots that drops the oldest entries beyond max_bytes"""
+
+    def __init__(self, max_bytes: int = DEFAULT_HISTORY_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = deque()
+        self._total_bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def nbytes(self) -> int:
+        return self._total_bytes
+
+    def push(self, mask: Image.Image) -> None:
+        """Compress and store a mask, then trim the history to the memory budget"""
+        snapshot = MaskSnapshot.from_mask(mask)
+        self._entries.append(snapshot)
+        self._total_bytes += snapshot.nbytes
+        # Always keep the newest entry, even if it alone exceeds the budget
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            self._total_bytes -= self._entries.popleft().nbytes
+
+    def pop(self) -> Optional[Image.Image]:
+        """Remove the newest entry and decode it, or None if the history is empty"""
+        if not self._entries:
+            return None
+        snapshot = self._entries.pop()
+        self._total_bytes -= snapshot.nbytes
+        return snapshot.to_image()
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._total_bytes = 0
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Prediction Cache
+
+Content-addressed on-disk cache for raw U-Net predictions, so reopening a
+frame that was already detected (same pixels, same weights, same detection
+settings) skips inference entirely. Entries are float16 .npz files keyed by
+a hash of the image file, the weights file and the detection parameters,
+and the directory is kept under a byte budget with LRU eviction.
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Optional, Union
+
+import numpy as np
+
+CACHE_VERSION = 1
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+_HASH_CHUNK = 4 * 1024 ** 2
+
+
+def default_cache_dir() -> Path:
+    """Per-user cache location (override with SPOTLESS_FILM_CACHE_DIR)"""
+    override = os.environ.get("SPOTLESS_FILM_CACHE_DIR")
+    if override:
+        return Path(override)
+    base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "spotless_film" / "predictions"
+
+
+class PredictionCache:
+    """Size-bounded LRU store of predictions keyed by content hashes"""
+
+    def __init__(self, cache_dir: Optional[Union[str, Path]] = None,
+                 max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = Path(cache_dir) if cache_dir else default_cache_dir()
+        self.max_bytes = max_bytes
+        # (path, size, mtime) -> digest, so unchanged files are hashed once per session
+        self._digests = {}
+        self._lock = threading.Lock()
+
+    def file_digest(self, path: Union[str, Path]) -> str:
+        """BLAKE2 digest of a file's bytes (memoised on size and mtime)"""
+        path = Path(path)
+        stat = path.stat()
+        memo_key = (str(path.resolve()), stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            digest = self._digests.get(memo_key)
+        if digest is None:
+            hasher = hashlib.blake2b(digest_size=20)
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(_HASH_CHUNK), b''):
+                    hasher.update(chunk)
+            digest = hasher.hexdigest()
+            with self._lock:
+                self._digests[memo_key] = digest
+        return digest
+
+    def make_key(self, image_path: Union[str, Path], weights_path: Union[str, Path],
+                 mode: str, **params) -> str:
+        """Cache key for one image + weights + detection settings combination"""
+        parts = [f"v{CACHE_VERSION}", self.file_digest(image_path),
+                 self.file_digest(weights_path), mode]
+        parts += [f"{name}={params[name]}" for name in sorted(params)]
+        return hashlib.blake2b("|".join(parts).encode(), digest_size=20).hexdigest()
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """Cached prediction as float32, or None on a miss"""
+        path = self._entry_path(key)
+        try:
+            with np.load(path) as data:
+                prediction = data['prediction'].astype(np.float32)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"⚠️ Dropping unreadable cache entry {path.name}: {e}")
+            path.unlink(missing_ok=True)
+            return None
+        # Bump mtime: it is the recency used for eviction
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return prediction
+
+    def put(self, key: str, prediction: np.ndarray) -> None:
+        """Store a prediction (as compressed float16) and evict down to the budget"""
+        start = time.time()
+        tmp_path = None
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            # Write to a temp file and rename so readers never see a partial entry
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(fd, 'wb') as f:
+                np.savez_compressed(f, prediction=prediction.astype(np.float16))
+            os.replace(tmp_path, self._entry_path(key))
+        except OSError as e:
+            # A full or read-only disk must never fail detection itself
+            print(f"⚠️ Could not write prediction cache entry: {e}")
+            if tmp_path:
+                Path(tmp_path).unlink(missing_ok=True)
+            return
+        print(f"💾 Cached prediction {key[:10]} ({time.time() - start:.2f}s)")
+        self.evict()
+
+    def evict(self) -> int:
+        """Delete least recently used entries until the cache fits max_bytes"""
+        entries = []
+        for path in self.cache_dir.glob("*.npz"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        freed = 0
+        for _, size, path in sorted(entries):
+            if total - freed <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            freed += size
+        if freed:
+            print(f"🧹 Evicted {freed / 1024 ** 2:.1f} MB from prediction cache")
+        return freed
+
+    def clear(self) -> None:
+        """Remove every cached prediction"""
+        for path in self.cache_dir.glob("*.npz"):
+            path.unlink(missing_ok=True)
+
+    @property
+    def size_bytes(self) -> int:
+        return sum(path.stat().st_size for path in self.cache_dir.glob("*.npz"))
+
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.npz"
@@ -13,7 +13,7 @@ from PIL import Image, ImageTk, ImageDraw
 import numpy as np
 from typing import Optional, Callable, Tuple
 import math
-from dust_removal_state import DustRemovalState, ProcessingMode, ToolMode
+from dust_removal_state import DustRemovalState, ProcessingMode, StateSlice, ToolMode
 from simple_modern_theme import SimpleModernColors
 
 
@@ -40,7 +40,7 @@ class SpotlessCanvas(tk.Frame):
         self.split_dragging = False
         
         self.setup_ui()
-        self.state.add_observer(self.update_canvas)
+        self.state.add_observer(self.update_canvas, (StateSlice.VIEW, StateSlice.MASK, StateSlice.IMAGES))
         
     def setup_ui(self):
         """Setup canvas UI"""
@@ -592,7 +592,7 @@ class SpotlessCanvas(tk.Frame):
                     self.pan_start_offset[1] + dy
                 )
                 self.state.view_state.drag_offset = new_offset
-                self.state.notify_observers()
+                self.state.notify_observers(StateSlice.VIEW)
         elif self.state.view_state.tool_mode == ToolMode.ERASER:
             self.apply_eraser_at_point(event.x, event.y)
         elif self.state.view_state.tool_mode == ToolMode.BRUSH:
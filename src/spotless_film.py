@@ -0,0 +1,18 @@
+#!/usr/bin/env python3
+"""
+Spotless Film launcher
+
+Entry script for running and for PyInstaller builds. Inpaint pool workers
+are spawned, and a spawned worker re-imports the script the app was started
+from; keeping this one free of heavy imports means workers load only
+inpaint_pool, not torch and the UI.
+"""
+
+import multiprocessing
+
+if __name__ == "__main__":
+    # In a frozen build each worker re-runs the executable; this hands it to the worker loop
+    multiprocessing.freeze_support()
+
+    from spotless_film_modern import main
+    main()
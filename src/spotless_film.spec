@@ -3,7 +3,7 @@
 block_cipher = None
 
 a = Analysis(
-    ['spotless_film_modern.py'],
+    ['spotless_film.py'],
     pathex=[],
     binaries=[],
     datas=[
@@ -9,23 +9,30 @@ professional UI components for advanced dust removal workflow.
 import customtkinter as ctk
 from tkinter import filedialog, messagebox
 from tkinterdnd2 import TkinterDnD
-import threading
 from pathlib import Path
 import sys
 from PIL import Image, ImageTk
 import numpy as np
 import torch
 import os
+import multiprocessing
 import time
 from typing import Optional, List, Tuple
 
 # Add current directory to path for imports
 sys.path.insert(0, str(Path(__file__).parent))
 
-from dust_removal_state import DustRemovalState, ProcessingMode, ToolMode
+from dust_removal_state import DustRemovalState, ProcessingMode, StateSlice, ToolMode
 from ui_components import SpotlessSidebar, SpotlessToolbar, ZoomControls
 from professional_canvas import SpotlessCanvas
-from image_processing import ImageProcessingService, LamaInpainter, BrushTools, ProcessingTask, UNet
+from image_processing import ImageProcessingService, LamaInpainter, UNet
+import image_io
+from prediction_cache import PredictionCache
+from frame_prefetcher import FramePrefetcher, PrefetchedFrame, list_session_frames
+from job_scheduler import JobScheduler, Priority
+from inpaint_pool import InpaintProcessPool
+from threshold_mask import nearest_indices
+from image_pyramid import ImagePyramid, MaskPyramid
 from simple_modern_theme import SimpleModernTheme
 try:
     from gl_image_view import GLImageView, OPENGL_AVAILABLE, GL_IMPORT_ERROR
@@ -52,11 +59,27 @@ class SpotlessFilmModern:
         # Preview (downscaled) images for faster display
         self.preview_selected_image = None
         self.preview_processed_image = None
+        # Reduced-resolution draft on screen while a load decodes the full image
+        self._load_draft = None
+        # Mipmaps of the selected/processed images (keyed by image id) for zoomed display
+        self.image_pyramids = {}
         # Split view caches
-        self._split_cached_size = None
-        self._split_resized_original = None
-        self._split_resized_processed = None
+        self._split_photo_original = None
+        self._split_photo_processed = None
+        self._split_drawn_columns = 0
         self._split_cached_signature = None
+        # Viewport overlay RGBA, patched in place for brush edits, and the
+        # mask pyramid it is sampled from
+        self._overlay_cache = None
+        # Where the single view's overlay item sits: (display size, viewport, canvas position),
+        # and the mask version it shows
+        self._overlay_geometry = None
+        self._overlay_drawn_version = -1
+        self._mask_pyramid = None
+        self._mask_pyramid_version = -1
+        # What the GL mask texture holds: (size, pyramid id) and the mask version
+        self._gl_mask_key = None
+        self._gl_mask_version = -1
         
         # Initialize split view position
         self.split_position = 0.5  # Default to middle
@@ -66,7 +89,24 @@ class SpotlessFilmModern:
         
         # Processing components
         self.lama_inpainter: Optional[LamaInpainter] = None
-        self.processing_task: Optional[ProcessingTask] = None
+        # All background work (loads, detection, removal, re-thresholding,
+        # pyramids, prefetch) runs here; outcomes are delivered on the Tk thread
+        self.scheduler = JobScheduler(max_workers=3, dispatch=lambda callback: self.root.after(0, callback))
+        # Rows per band for streaming full-resolution removal
+        self.removal_band_height = 512
+        # TELEA runs in these worker processes, off the Tk process's GIL; started by the first large removal
+        self.inpaint_pool = InpaintProcessPool()
+        # Raw predictions persisted across sessions, keyed by image/weights hash
+        self.prediction_cache = PredictionCache()
+        # Full-resolution re-threshold runs once the slider has rested this long
+        self.threshold_sync_delay_ms = 150
+        self._threshold_sync_job = None
+        # Removal in flight: the job, the mask version it started from, and a
+        # restart waiting for a mask edit to settle
+        self._removal_job = None
+        self._removal_mask_version: Optional[int] = None
+        self._removal_restart_job = None
+        self.removal_restart_delay_ms = 300
         
         # Callback dictionary for UI components
         self.callbacks = {
@@ -111,7 +151,11 @@ class SpotlessFilmModern:
         self.setup_status_bar()
         
         # Add observer for state changes
-        self.state.add_observer(self.update_ui)
+        # Scoped per slice: brush strokes (MASK) only redraw the overlay
+        self.state.add_observer(self.update_controls, (StateSlice.PROCESSING, StateSlice.IMAGES))
+        self.state.add_observer(self.update_view, (StateSlice.VIEW, StateSlice.IMAGES))
+        self.state.add_observer(self.refresh_mask_overlay, (StateSlice.MASK,))
+        self.state.add_observer(self.on_mask_changed, (StateSlice.MASK,))
     
     def setup_modern_sidebar(self):
         """Setup the modern CustomTkinter sidebar matching macOS design"""
@@ -218,9 +262,24 @@ class SpotlessFilmModern:
                                        hover_color="#5A5A5A")
         self.import_btn.pack(fill="x", pady=(0, 5))
         self._importing = False
+        
+        # Roll review: step through a folder with its neighbours prefetched
+        self.roll_btn = ctk.CTkButton(parent, text="🎞️ Open Roll Folder",
+                                     command=self.open_session_folder,
+                                     font=ctk.CTkFont(size=12),
+                                     height=32, fg_color="#4A4A4A",
+                                     hover_color="#5A5A5A")
+        self.roll_btn.pack(fill="x", pady=(0, 5))
     
     def create_detection_section(self, parent):
         """Create detection section content matching macOS design"""
+        # Detection mode (fast 1024px pass vs. full-resolution tiles)
+        self.detection_mode_selector = ctk.CTkSegmentedButton(parent, values=["Fast", "Full Res"],
+                                                             command=self.on_detection_mode_changed,
+                                                             font=ctk.CTkFont(size=11))
+        self.detection_mode_selector.set("Full Res" if self.state.processing_state.detection_mode == "tiled" else "Fast")
+        self.detection_mode_selector.pack(fill="x", pady=(0, 8))
+        
         # Detect button
         self.detect_btn = ctk.CTkButton(parent, text="🔍 Detect Dust",
                                        command=self.detect_dust,
@@ -269,6 +328,11 @@ class SpotlessFilmModern:
                                  font=ctk.CTkFont(size=9), text_color="#666666")
         help_label.pack(anchor="w", pady=(5, 0))
     
+    def on_detection_mode_changed(self, value):
+        """Switch between fast (squeezed) and full-resolution tiled detection"""
+        self.state.processing_state.detection_mode = "tiled" if value == "Full Res" else "fast"
+        print(f"🔍 Detection mode: {self.state.processing_state.detection_mode}")
+    
     def create_removal_section(self, parent):
         """Create dust removal section content matching macOS design"""
         # Remove button
@@ -336,6 +400,7 @@ class SpotlessFilmModern:
         self.is_panning = False
         self.last_mouse_pos = None
         self.last_loaded_path = None  # Track loaded file for export
+        self.prefetcher = None  # FramePrefetcher while a roll folder is open
         if not self.use_gl:
             self.canvas.focus_set()  # Allow canvas to receive key events
         
@@ -351,6 +416,7 @@ class SpotlessFilmModern:
         # Canvas item handles for fast pan
         self.image_item_id = None
         self.overlay_item_id = None
+        self._view_redraw_job = None
         
         # Show welcome message or GL clear
         if not self.use_gl:
@@ -695,15 +761,13 @@ class SpotlessFilmModern:
                 self.last_mouse_pos = (event.x, event.y)
                 print(f"🔧 Panning: dx={dx}, dy={dy}, offset={self.state.view_state.drag_offset}")
                 
-                # Move existing canvas items without re-rendering
+                # Move existing canvas items right away, then fill in the newly
+                # exposed part of the viewport on the next idle redraw
                 if self.image_item_id is not None:
-                    canvas_w = self.canvas.winfo_width() or 1
-                    canvas_h = self.canvas.winfo_height() or 1
-                    center_x = canvas_w // 2 + int(self.state.view_state.drag_offset[0])
-                    center_y = canvas_h // 2 + int(self.state.view_state.drag_offset[1])
-                    self.canvas.coords(self.image_item_id, center_x, center_y)
+                    self.canvas.move(self.image_item_id, dx, dy)
                     if self.overlay_item_id is not None:
-                        self.canvas.coords(self.overlay_item_id, center_x, center_y)
+                        self.canvas.move(self.overlay_item_id, dx, dy)
+                    self._schedule_view_redraw()
             return
 
         # Tool drags (only when space is not pressed)
@@ -742,6 +806,7 @@ class SpotlessFilmModern:
             
             # Clear canvas first
             self.canvas.delete('all')
+            self._overlay_geometry = None
             
             # Handle different view modes
             mode = self.state.view_state.processing_mode
@@ -749,13 +814,16 @@ class SpotlessFilmModern:
             
             if mode == ProcessingMode.SINGLE:
                 if self.use_gl:
-                    self.display_single_view_gl(canvas_width, canvas_height)
+                    self.display_gl_view()
                 else:
                     self.display_single_view(canvas_width, canvas_height, image)
             elif mode == ProcessingMode.SIDE_BY_SIDE:
                 self.display_side_by_side_view(canvas_width, canvas_height)
             elif mode == ProcessingMode.SPLIT_SLIDER:
-                self.display_split_view(canvas_width, canvas_height)
+                if self.use_gl:
+                    self.display_gl_view(split=True)
+                else:
+                    self.display_split_view(canvas_width, canvas_height)
             
         except Exception as e:
             print(f"Error displaying image: {e}")
@@ -776,9 +844,6 @@ class SpotlessFilmModern:
         if not image:
             return
         
-        # Create working image from chosen source (preview/full)
-        display_image = image.copy()
-        
         # Determine if we're showing processed (for info; we now allow overlay on both)
         is_processed_display = (
             (self.state.processed_image is not None) and 
@@ -789,7 +854,7 @@ class SpotlessFilmModern:
         margin = 40
         base_w = canvas_width - margin
         base_h = canvas_height - margin
-        img_ratio = display_image.size[0] / display_image.size[1]
+        img_ratio = image.size[0] / image.size[1]
         canvas_ratio = base_w / base_h if base_h > 0 else 1.0
         if img_ratio > canvas_ratio:
             fitted_w = base_w
@@ -803,34 +868,93 @@ class SpotlessFilmModern:
         disp_w = max(1, int(fitted_w * zoom))
         disp_h = max(1, int(fitted_h * zoom))
 
-        # Choose resampling quality (interactive zoom uses faster filter)
-        resample = self._current_resample or Image.Resampling.LANCZOS
-        display_image = display_image.resize((disp_w, disp_h), resample)
-
         # Calculate position with pan offset
         off_x, off_y = self.state.view_state.drag_offset
         center_x = canvas_width // 2 + int(off_x)
         center_y = canvas_height // 2 + int(off_y)
+        left, top = center_x - disp_w // 2, center_y - disp_h // 2
+
+        # Store bounds for hit-testing/brush mapping (top-left, size)
+        self.image_item_bounds = (left, top, disp_w, disp_h)
+        self.image_item_id = None
+        self.overlay_item_id = None
+
+        # Only the part of the zoomed image that lands on the canvas is rendered
+        viewport = (max(0, -left), max(0, -top),
+                    min(disp_w, canvas_width - left), min(disp_h, canvas_height - top))
+        if viewport[2] <= viewport[0] or viewport[3] <= viewport[1]:
+            return
+
+        # Choose resampling quality (interactive zoom uses faster filter)
+        resample = self._current_resample or Image.Resampling.LANCZOS
+        display_image = self.render_viewport(image, (disp_w, disp_h), viewport, resample)
 
         # Convert to PhotoImage
         self.photo = ImageTk.PhotoImage(display_image)
 
-        # Display image centered with pan offset
-        self.image_item_id = self.canvas.create_image(center_x, center_y, image=self.photo)
+        # Display the visible crop where it sits inside the zoomed image
+        item_x, item_y = left + viewport[0], top + viewport[1]
+        self.image_item_id = self.canvas.create_image(item_x, item_y, image=self.photo, anchor='nw')
+        self._overlay_geometry = ((disp_w, disp_h), viewport, (item_x, item_y))
 
         # If overlay visible, render as a separate canvas image for speed
         if (self.state.dust_mask and getattr(self, 'overlay_visible', True)):
-            overlay_img = self.create_overlay_layer((disp_w, disp_h))
+            overlay_img = self.create_overlay_layer((disp_w, disp_h), viewport)
             if overlay_img is not None:
                 self.photo_overlay = ImageTk.PhotoImage(overlay_img)
-                self.overlay_item_id = self.canvas.create_image(center_x, center_y, image=self.photo_overlay)
-            else:
-                self.overlay_item_id = None
-        else:
-            self.overlay_item_id = None
+                self.overlay_item_id = self.canvas.create_image(item_x, item_y, image=self.photo_overlay, anchor='nw')
+        self._overlay_drawn_version = self.state.mask_version
 
-        # Store bounds for hit-testing/brush mapping (top-left, size)
-        self.image_item_bounds = (center_x - disp_w // 2, center_y - disp_h // 2, disp_w, disp_h)
+    def render_viewport(self, image, display_size, viewport, resample):
+        """Viewport of `image` drawn at display_size, from its pyramid once that is built"""
+        source = image
+        if image is self.preview_processed_image:
+            source = self.state.processed_image
+        elif image is self.preview_selected_image:
+            source = self.state.selected_image
+        pyramid = self.image_pyramids.get(id(source))
+        if pyramid is not None and pyramid.source is source:
+            return pyramid.render(display_size, viewport, resample)
+        # Until then crop-and-resample the preview/full image directly
+        sx = image.size[0] / float(display_size[0])
+        sy = image.size[1] / float(display_size[1])
+        box = (viewport[0] * sx, viewport[1] * sy, viewport[2] * sx, viewport[3] * sy)
+        return image.resize((viewport[2] - viewport[0], viewport[3] - viewport[1]), resample, box=box)
+
+    def start_pyramid_build(self, image):
+        """Build the zoom pyramid for `image` in the background, then redraw"""
+        if image is None or id(image) in self.image_pyramids:
+            return
+        
+        def build(token):
+            start = time.time()
+            pyramid = ImagePyramid(image)
+            print(f"🗻 Image pyramid built: {len(pyramid.levels)} levels in {time.time() - start:.2f}s")
+            return pyramid
+        
+        self.scheduler.submit(build, priority=Priority.RENDER, name="image pyramid",
+                              on_done=self._install_pyramid,
+                              on_error=lambda e: print(f"⚠️ Image pyramid build failed: {e}"))
+
+    def _install_pyramid(self, pyramid):
+        """Keep pyramids only for the images still on screen and redraw with the new one"""
+        current = (self.state.selected_image, self.state.processed_image)
+        self.image_pyramids = {key: p for key, p in self.image_pyramids.items()
+                               if any(p.source is img for img in current)}
+        if any(pyramid.source is img for img in current):
+            self.image_pyramids[id(pyramid.source)] = pyramid
+            self.display_image()
+
+    def _schedule_view_redraw(self):
+        """Coalesce redraws requested by pan events into one idle-time redraw"""
+        if self._view_redraw_job is not None:
+            return
+        
+        def redraw():
+            self._view_redraw_job = None
+            self.display_image()
+        
+        self._view_redraw_job = self.root.after_idle(redraw)
     
     def display_side_by_side_view(self, canvas_width, canvas_height):
         """Display side-by-side comparison view"""
@@ -895,88 +1019,80 @@ class SpotlessFilmModern:
         base_original = self.preview_selected_image or self.state.selected_image
         base_processed = self.preview_processed_image or self.state.processed_image
 
-        # Add dust overlay to original if visible (baked-in in split)
-        if self.state.dust_mask and getattr(self, 'overlay_visible', True):
-            base_original = self.create_overlay_image(base_original)
-
-        # Calculate base fit size while maintaining aspect ratio
-        display_width = canvas_width - 40
-        display_height = canvas_height - 40
-        img_ratio = base_original.size[0] / base_original.size[1]
-        canvas_ratio = display_width / display_height
-        if img_ratio > canvas_ratio:
-            fit_w = display_width
-            fit_h = int(display_width / img_ratio)
-        else:
-            fit_h = display_height
-            fit_w = int(display_height * img_ratio)
-
-        # Apply zoom
-        zoom = max(1.0, float(self.state.view_state.zoom_scale))
-        new_width = max(1, int(fit_w * zoom))
-        new_height = max(1, int(fit_h * zoom))
+        # Same size math as _get_split_bounds: the zoomed image centred on the canvas
+        left, top, new_width, new_height = self._get_split_bounds(canvas_width, canvas_height)
+        cache_size = (new_width, new_height)
+        # Only the visible part of the zoomed image is rendered
+        viewport = (max(0, -left), max(0, -top),
+                    min(new_width, canvas_width - left), min(new_height, canvas_height - top))
+        if viewport[2] <= viewport[0] or viewport[3] <= viewport[1]:
+            return
 
         # Build a signature so cache invalidates on content changes (mask/process/opacity)
         overlay_flag = bool(self.state.dust_mask and getattr(self, 'overlay_visible', True))
-        mask_token = id(self.state.dust_mask) if overlay_flag else None
+        mask_token = self.state.mask_version if overlay_flag else None
         orig_token = id(base_original)
         proc_token = id(base_processed)
-        cache_size = (new_width, new_height)
-        signature = (cache_size, orig_token, proc_token, overlay_flag, mask_token, float(getattr(self, 'overlay_opacity', 0.5)))
+        signature = (cache_size, viewport, orig_token, proc_token, overlay_flag, mask_token, float(getattr(self, 'overlay_opacity', 0.5)))
 
-        # Cache resized images for current size/content to make slider smooth
+        # Both halves are rendered once per signature; slider moves then only
+        # copy the columns that switch sides into a persistent composite
         if self._split_cached_signature != signature:
             resample = self._current_resample or Image.Resampling.LANCZOS
-            self._split_resized_original = base_original.resize(cache_size, resample)
-            self._split_resized_processed = base_processed.resize(cache_size, resample)
-            self._split_cached_size = cache_size
+            original_view = self.render_viewport(base_original, cache_size, viewport, resample)
+            if overlay_flag:
+                # Add dust overlay to original if visible (baked-in in split)
+                overlay = self.create_overlay_layer(cache_size, viewport)
+                if overlay is not None:
+                    original_view = Image.alpha_composite(original_view.convert('RGBA'), overlay).convert('RGB')
+            processed_view = self.render_viewport(base_processed, cache_size, viewport, resample)
+            self._split_photo_original = ImageTk.PhotoImage(original_view)
+            self._split_photo_processed = ImageTk.PhotoImage(processed_view)
+            self.photo_split = ImageTk.PhotoImage(original_view)
+            self._split_drawn_columns = 0
             self._split_cached_signature = signature
         
         # Get split position (default to middle)
         split_position = getattr(self, 'split_position', 0.5)
         split_x_image = int(cache_size[0] * split_position)
+        view_width = viewport[2] - viewport[0]
+        self._update_split_columns(min(view_width, max(0, split_x_image - viewport[0])), viewport[3] - viewport[1])
         
-        # Create composite image
-        composite = Image.new('RGB', cache_size)
-        
-        # Left side: processed image
-        if split_x_image > 0:
-            left_crop = self._split_resized_processed.crop((0, 0, split_x_image, cache_size[1]))
-            composite.paste(left_crop, (0, 0))
-        
-        # Right side: original image
-        if split_x_image < cache_size[0]:
-            right_crop = self._split_resized_original.crop((split_x_image, 0, cache_size[0], cache_size[1]))
-            composite.paste(right_crop, (split_x_image, 0))
-        
-        # Convert to PhotoImage
-        self.photo_split = ImageTk.PhotoImage(composite)
-        
-        # Calculate position to center the image
-        display_x = canvas_width // 2
-        display_y = canvas_height // 2
-        
-        # Display the composite image
-        split_item = self.canvas.create_image(display_x, display_y, image=self.photo_split)
+        # Display the composite where the viewport sits inside the zoomed image
+        self.canvas.create_image(left + viewport[0], top + viewport[1], image=self.photo_split, anchor='nw')
         # Store bounds for tool hit-testing in split view
-        self.image_item_bounds = (display_x - (cache_size[0] // 2), display_y - (cache_size[1] // 2), cache_size[0], cache_size[1])
+        self.image_item_bounds = (left, top, cache_size[0], cache_size[1])
         
         # Calculate split line position on canvas
-        canvas_split_x = display_x - (cache_size[0] // 2) + split_x_image
+        canvas_split_x = left + split_x_image
         
         # Draw split line
-        line_y1 = display_y - (cache_size[1] // 2)
-        line_y2 = display_y + (cache_size[1] // 2)
+        line_y1 = top
+        line_y2 = top + cache_size[1]
         self.canvas.create_line(canvas_split_x, line_y1, canvas_split_x, line_y2, fill="white", width=3)
         
         # Add labels
-        left_label_x = display_x - (cache_size[0] // 2) + (split_x_image // 2)
-        right_label_x = canvas_split_x + ((display_x + (cache_size[0] // 2) - canvas_split_x) // 2)
+        left_label_x = left + (split_x_image // 2)
+        right_label_x = canvas_split_x + ((left + cache_size[0] - canvas_split_x) // 2)
         label_y = line_y1 + 20
         
         self.canvas.create_text(left_label_x, label_y, text="Processed", fill="white", font=("Arial", 10, "bold"))
         self.canvas.create_text(right_label_x, label_y, text="Original", fill="white", font=("Arial", 10, "bold"))
 
+    def _update_split_columns(self, processed_columns, height):
+        """Copy only the columns that changed sides between the two cached halves into the composite"""
+        drawn = self._split_drawn_columns
+        if processed_columns == drawn:
+            return
+        if processed_columns > drawn:
+            source, x0, x1 = self._split_photo_processed, drawn, processed_columns
+        else:
+            source, x0, x1 = self._split_photo_original, processed_columns, drawn
+        # Tk's photo copy runs natively, without a Python-side image
+        self.canvas.tk.call(str(self.photo_split), 'copy', str(source),
+                            '-from', x0, 0, x1, height, '-to', x0, 0)
+        self._split_drawn_columns = processed_columns
+
     def _get_split_bounds(self, canvas_width: int, canvas_height: int):
         """Return (left, top, width, height) of the split-view image rect on the canvas."""
         # Compute the same size math used by display_split_view
@@ -1000,81 +1116,163 @@ class SpotlessFilmModern:
         top = (canvas_height - new_h) // 2
         return (left, top, new_w, new_h)
     
-    def display_single_view_gl(self, canvas_width, canvas_height):
-        """GL-backed single view rendering."""
+    def display_gl_view(self, split=False):
+        """GL-backed single/split rendering: textures follow content, split and opacity are draw state."""
         if not self.state.selected_image:
             return
-        # Base image preference: processed if available
-        base = (self.preview_processed_image or self.state.processed_image) if self.state.processed_image else (self.preview_selected_image or self.state.selected_image)
-        overlay_img = None
-        is_processed_display = (self.state.processed_image is not None) and (base is self.preview_processed_image or base is self.state.processed_image)
-        if (self.state.dust_mask and getattr(self, 'overlay_visible', True) and not is_processed_display):
-            # Provide an overlay RGBA the same size as base; GL scales it efficiently.
-            overlay_img = self.create_overlay_layer(base.size)
-        # Upload/update textures and draw
-        self.gl_view.set_images(base, overlay_img)
+        original = self.gl_image_source(self.state.selected_image, self.preview_selected_image)
+        processed = None
+        if self.state.processed_image:
+            processed = self.gl_image_source(self.state.processed_image, self.preview_processed_image)
+        split = split and processed is not None
+        # Base image preference: processed if available (the split shows both)
+        base = processed if processed is not None and not split else original
+        self.gl_view.set_images(base, processed if split else None)
+        self.sync_gl_overlay(split)
+        self.gl_view.set_split(getattr(self, 'split_position', 0.5) if split else None)
         self.gl_view.set_view(self.state.view_state.zoom_scale, self.state.view_state.drag_offset)
     
+    def sync_gl_overlay(self, split=False):
+        """Push the dust mask and opacity to the GL view (masks sit on the original, not a processed base)"""
+        original = self.gl_image_source(self.state.selected_image, self.preview_selected_image)
+        on_original = split or self.state.processed_image is None
+        if self.state.dust_mask and getattr(self, 'overlay_visible', True) and on_original:
+            self.update_gl_mask(self.gl_view.mask_size_for(original.size))
+        elif self._gl_mask_key is not None:
+            self.gl_view.set_mask(None)
+            self._gl_mask_key = None
+        self.gl_view.set_overlay_opacity(float(getattr(self, 'overlay_opacity', 0.5)))
+    
+    def gl_image_source(self, image, preview):
+        """The image's pyramid for tiled full-resolution GL drawing, or its preview until that is built"""
+        pyramid = self.image_pyramids.get(id(image))
+        if pyramid is not None and pyramid.source is image:
+            return pyramid
+        return preview or image
+
+    def update_gl_mask(self, size):
+        """Bring the GL mask texture (mask values at `size`) up to date, uploading only what changed"""
+        pyramid = self.current_mask_pyramid(size)
+        key = (size, id(pyramid))
+        changed = None
+        if self._gl_mask_key == key:
+            changed = self.state.mask_changes_since(self._gl_mask_version)
+        if changed is None:
+            self.gl_view.set_mask(self.render_overlay_mask(pyramid, size, (0, 0, size[0], size[1])))
+        elif not changed.is_empty:
+            # Brush edits: re-render and upload (glTexSubImage2D) only the touched rectangle
+            rect = changed.scaled(self.state.dust_mask.size, size)
+            x0, y0 = max(0, rect.x0 - 1), max(0, rect.y0 - 1)
+            x1, y1 = min(size[0], rect.x1 + 1), min(size[1], rect.y1 + 1)
+            if x1 > x0 and y1 > y0:
+                region = self.render_overlay_mask(pyramid, size, (x0, y0, x1, y1))
+                self.gl_view.update_mask_region(region, x0, y0)
+        self._gl_mask_key = key
+        self._gl_mask_version = self.state.mask_version
+
     def create_overlay_image(self, base_image):
         """Create image with dust overlay (matches Swift app visualization)"""
         try:
-            print("🎨 Creating dust overlay...")
-            
             # Convert base image to RGB if needed
             if base_image.mode != 'RGB':
                 base_image = base_image.convert('RGB')
             
-            # Get dust mask
-            dust_mask = self.state.dust_mask
-            if not dust_mask:
+            overlay = self.create_overlay_layer(base_image.size)
+            if overlay is None:
                 return base_image
             
-            # Ensure mask is same size as image
-            if dust_mask.size != base_image.size:
-                dust_mask = dust_mask.resize(base_image.size, Image.Resampling.NEAREST)
-            
-            # Convert to numpy arrays
-            base_array = np.array(base_image).astype(np.float32)
-            mask_array = np.array(dust_mask).astype(np.float32) / 255.0
-            
-            # Create colored overlay (red dust detection)
-            overlay_color = np.array([255, 0, 0], dtype=np.float32)  # Red
-            overlay_alpha = float(getattr(self, 'overlay_opacity', 0.5))
-            
-            # Apply overlay where mask is white (dust detected)
-            for i in range(3):  # RGB channels
-                base_array[:, :, i] = (base_array[:, :, i] * (1 - mask_array * overlay_alpha) + 
-                                     overlay_color[i] * mask_array * overlay_alpha)
-            
-            # Convert back to image
-            overlay_image = Image.fromarray(np.clip(base_array, 0, 255).astype(np.uint8))
-            
-            print("✅ Dust overlay created")
-            return overlay_image
+            # Red blended over the image by the overlay's alpha, in one C pass
+            return Image.alpha_composite(base_image.convert('RGBA'), overlay).convert('RGB')
             
         except Exception as e:
             print(f"❌ Error creating overlay: {e}")
             return base_image
 
-    def create_overlay_layer(self, display_size):
-        """Fast path: build an RGBA overlay at display size only."""
+    def create_overlay_layer(self, display_size, viewport=None):
+        """Fast path: build an RGBA overlay for the visible viewport of the display only."""
         try:
             if not self.state.dust_mask:
                 return None
-            # Always base overlay on the full-res mask and scale to the current display size
-            mask = self.state.dust_mask
-            if mask.size != display_size:
-                mask = mask.resize(display_size, Image.Resampling.NEAREST)
-            mask_array = np.array(mask.convert('L'), dtype=np.uint8)
+            if viewport is None:
+                viewport = (0, 0, display_size[0], display_size[1])
             alpha = float(getattr(self, 'overlay_opacity', 0.5))
-            a = (mask_array.astype(np.float32) * alpha).clip(0, 255).astype(np.uint8)
-            rgb = np.zeros((display_size[1], display_size[0], 3), dtype=np.uint8)
-            rgb[:, :, 0] = mask_array  # red
-            rgba = np.dstack([rgb, a])
-            return Image.fromarray(rgba, 'RGBA')
-        except Exception:
+            pyramid = self.current_mask_pyramid(display_size)
+            
+            cache = self._overlay_cache
+            key = (display_size, viewport, id(pyramid))
+            changed = None
+            if cache is not None and cache['key'] == key:
+                changed = self.state.mask_changes_since(cache['version'])
+            if changed is None:
+                values = self.render_overlay_mask(pyramid, display_size, viewport)
+                rgba = np.zeros(values.shape + (4,), dtype=np.uint8)
+                self._fill_overlay(rgba, values, alpha)
+                cache = self._overlay_cache = {'key': key, 'values': values, 'rgba': rgba, 'alpha': alpha}
+            elif not changed.is_empty:
+                # Only a brushed rectangle changed: re-render just that part of the viewport
+                self._patch_overlay(cache, pyramid, changed, alpha)
+            if cache['alpha'] != alpha:
+                # Opacity only rescales the alpha channel of the cached viewport
+                self._fill_overlay(cache['rgba'], cache['values'], alpha)
+                cache['alpha'] = alpha
+            cache['version'] = self.state.mask_version
+            return Image.fromarray(cache['rgba'], 'RGBA')
+        except Exception as e:
+            print(f"❌ Error creating overlay layer: {e}")
             return None
 
+    def current_mask_pyramid(self, display_size):
+        """Mask pyramid for the overlay, rebuilt on new masks and patched for brush edits"""
+        preview = self.state.preview_mask
+        # The 2K threshold preview runs ahead of the full mask while the slider moves
+        source = preview if preview is not None and preview.size[0] >= display_size[0] else self.state.dust_mask
+        pyramid = self._mask_pyramid
+        changed = None
+        if pyramid is not None and pyramid.source is source:
+            changed = self.state.mask_changes_since(self._mask_pyramid_version)
+        if changed is None:
+            pyramid = self._mask_pyramid = MaskPyramid(source)
+        elif not changed.is_empty:
+            pyramid.refresh(changed.scaled(self.state.dust_mask.size, source.size))
+        self._mask_pyramid_version = self.state.mask_version
+        return pyramid
+
+    def render_overlay_mask(self, pyramid, display_size, viewport):
+        """Mask values for a viewport, with a pending brush stroke drawn over the pyramid"""
+        values = pyramid.render(display_size, viewport)
+        if self.state.has_pending_stroke:
+            # Until the stroke ends its pixels only exist in the low-res brush buffer
+            engine = self.state.brush_engine
+            rect = engine.stroke_dirty.scaled(engine.size, display_size)
+            x0, y0 = max(viewport[0], rect.x0 - 1), max(viewport[1], rect.y0 - 1)
+            x1, y1 = min(viewport[2], rect.x1 + 1), min(viewport[3], rect.y1 + 1)
+            if x1 > x0 and y1 > y0:
+                rows = nearest_indices(engine.size[1], display_size[1])[y0:y1]
+                cols = nearest_indices(engine.size[0], display_size[0])[x0:x1]
+                touched = engine.touched[np.ix_(rows, cols)]
+                region = values[y0 - viewport[1]:y1 - viewport[1], x0 - viewport[0]:x1 - viewport[0]]
+                region[touched] = engine.buffer[np.ix_(rows, cols)][touched]
+        return values
+
+    def _fill_overlay(self, rgba, mask_array, alpha):
+        """Red overlay pixels with opacity-scaled alpha from a uint8 mask"""
+        rgba[:, :, 0] = mask_array  # red
+        rgba[:, :, 3] = (mask_array.astype(np.float32) * alpha).clip(0, 255).astype(np.uint8)
+
+    def _patch_overlay(self, cache, pyramid, changed, alpha):
+        """Refresh the cached overlay inside `changed` (full-res pixels)"""
+        display_size, viewport, _ = cache['key']
+        rect = changed.scaled(self.state.dust_mask.size, display_size)
+        # One pixel of slack for rounding in the NEAREST sample positions
+        x0, y0 = max(viewport[0], rect.x0 - 1), max(viewport[1], rect.y0 - 1)
+        x1, y1 = min(viewport[2], rect.x1 + 1), min(viewport[3], rect.y1 + 1)
+        if x1 <= x0 or y1 <= y0:
+            return
+        values = self.render_overlay_mask(pyramid, display_size, (x0, y0, x1, y1))
+        local = (slice(y0 - viewport[1], y1 - viewport[1]), slice(x0 - viewport[0], x1 - viewport[0]))
+        cache['values'][local] = values
+        self._fill_overlay(cache['rgba'][local], values, cache['alpha'])
+
     # MARK: - Zoom / Pan Controls
 
     def zoom_in(self):
@@ -1213,10 +1411,55 @@ class SpotlessFilmModern:
             self.zoom_out_btn.configure(state=("normal" if self.state.view_state.zoom_scale > 1.0 else "disabled"))
     
     def update_ui(self):
-        """Update UI based on state changes"""
+        """Refresh controls and display together (for callers outside the observer flush)"""
+        self.update_controls()
+        self.update_view()
+    
+    def update_view(self):
+        """VIEW/IMAGES observer: zoom controls, tool buttons and the displayed image"""
         # Keep zoom UI in sync with state changes
         self.update_zoom_ui()
-        # Update button states
+        # Update toolbar button states if they exist
+        if hasattr(self, 'view_cycle_btn'):
+            self.update_tool_buttons()
+        
+        # Display current image
+        if self.state.selected_image:
+            self.display_image()
+    
+    def refresh_mask_overlay(self):
+        """MASK observer: redraw only the dust overlay (brush, threshold, undo), not the image under it"""
+        if not self.state.selected_image:
+            return
+        mode = self.state.view_state.processing_mode
+        if self.use_gl and mode in (ProcessingMode.SINGLE, ProcessingMode.SPLIT_SLIDER):
+            self.sync_gl_overlay(split=mode == ProcessingMode.SPLIT_SLIDER)
+            return
+        geometry = self._overlay_geometry
+        if mode != ProcessingMode.SINGLE or geometry is None:
+            # Other canvas views bake the overlay into their images
+            self.display_image()
+            return
+        if self._overlay_drawn_version == self.state.mask_version:
+            return
+        display_size, viewport, position = geometry
+        overlay_img = None
+        if self.state.dust_mask and getattr(self, 'overlay_visible', True):
+            overlay_img = self.create_overlay_layer(display_size, viewport)
+        if overlay_img is None:
+            if self.overlay_item_id is not None:
+                self.canvas.delete(self.overlay_item_id)
+                self.overlay_item_id = None
+        else:
+            self.photo_overlay = ImageTk.PhotoImage(overlay_img)
+            if self.overlay_item_id is not None:
+                self.canvas.itemconfigure(self.overlay_item_id, image=self.photo_overlay)
+            else:
+                self.overlay_item_id = self.canvas.create_image(*position, image=self.photo_overlay, anchor='nw')
+        self._overlay_drawn_version = self.state.mask_version
+    
+    def update_controls(self):
+        """PROCESSING/IMAGES observer: button states, labels and conditional sections"""
         has_image = self.state.selected_image is not None
         has_dust_mask = self.state.dust_mask is not None
         has_processed = self.state.processed_image is not None
@@ -1224,7 +1467,8 @@ class SpotlessFilmModern:
         
         # Update button states
         if hasattr(self, 'detect_btn'):
-            self.detect_btn.configure(state="normal" if has_image and not self.state.processing_state.is_detecting else "disabled")
+            can_detect = has_image and not self.state.processing_state.is_detecting and not self.state.processing_state.is_loading
+            self.detect_btn.configure(state="normal" if can_detect else "disabled")
         if hasattr(self, 'remove_btn'):
             self.remove_btn.configure(state="normal" if has_dust_mask and not self.state.processing_state.is_removing else "disabled")
         if hasattr(self, 'export_btn'):
@@ -1274,14 +1518,6 @@ class SpotlessFilmModern:
             else:
                 self.export_frame.grid_forget()
         
-        # Update toolbar button states if they exist
-        if hasattr(self, 'view_cycle_btn'):
-            self.update_tool_buttons()
-        
-        # Display current image
-        if self.state.selected_image:
-            self.display_image()
-        
         # Update processing button text
         if hasattr(self, 'detect_btn'):
             if self.state.processing_state.is_detecting:
@@ -1376,42 +1612,113 @@ class SpotlessFilmModern:
             messagebox.showerror("Error", f"Failed to open file dialog: {str(e)}")
     
     def load_image(self, file_path: str):
-        """Load image from file path"""
+        """Load image from file path (decoding and preview building run on a worker thread)"""
         print(f"🔵 Loading image: {file_path}")
-        try:
-            # Check if file exists
-            if not os.path.exists(file_path):
-                raise FileNotFoundError(f"File not found: {file_path}")
-            
-            # Load image
-            image = Image.open(file_path)
-            self.state.selected_image = image
-            # Store the file path for export functionality
-            self.last_loaded_path = file_path
-            # Build preview version for faster display
-            self.preview_selected_image = self.build_preview_image(image)
-            self.state.reset_processing()
-            
-            filename = os.path.basename(file_path)
-            print(f"✅ Image loaded: {filename} ({image.size[0]}x{image.size[1]})")
-            print(f"✅ State.selected_image set: {self.state.selected_image is not None}")
-            print(f"✅ Can detect dust now: {self.state.can_detect_dust}")
-            
-            # Update UI
-            self.status_label.configure(text=f"Image loaded: {filename}")
+        if not os.path.exists(file_path):
+            self._load_failed(FileNotFoundError(f"File not found: {file_path}"))
+            return
+        
+        filename = os.path.basename(file_path)
+        # Results for the previous image no longer apply
+        self.cancel_dust_removal()
+        for key in ("load", "detect", "threshold-sync"):
+            self.scheduler.cancel(key)
+        self.state.processing_state.is_detecting = False
+        self.state.processing_state.is_removing = False
+        self.state.processing_state.is_loading = True
+        self.state.reset_processing()
+        self.status_label.configure(text=f"Loading {filename}...")
+        
+        prefetcher = self.prefetcher
+        if prefetcher is not None:
+            if prefetcher.index_of(file_path) is None:
+                self.close_session()
+                prefetcher = None
+            else:
+                prefetcher.set_current(file_path)
+                frame = prefetcher.take(file_path)
+                if frame is not None:
+                    print(f"⚡ Using prefetched frame {filename}")
+                    self._finish_load(file_path, frame.array, frame.image, frame.preview)
+                    self.apply_prefetched_prediction(frame)
+                    return
+        
+        def load_worker(token):
+            def on_ui(callback):
+                # Drop intermediate updates of a load that a newer one has replaced
+                self.root.after(0, lambda: callback() if not token.cancelled else None)
             
-            # Enable detect button
-            if hasattr(self, 'detect_btn'):
-                self.detect_btn.configure(state="normal")
+            # A prefetch of this frame that is already running beats a second decode
+            frame = prefetcher.wait(file_path) if prefetcher is not None else None
+            if frame is not None:
+                return frame
             
-            # Update canvas display
-            self.update_ui()
+            start_time = time.time()
+            draft = image_io.load_draft(file_path)
+            token.check()
+            if draft is not None:
+                print(f"⚡ Draft decoded: {draft.size[0]}x{draft.size[1]} in {time.time() - start_time:.2f}s")
+                on_ui(lambda: self._show_load_draft(draft))
+            on_ui(lambda: self.status_label.configure(text=f"Loading {filename}: decoding full resolution..."))
             
-        except Exception as e:
-            error_msg = f"Failed to load image: {str(e)}"
-            print(f"❌ {error_msg}")
-            self.status_label.configure(text=error_msg, text_color="red")
-            messagebox.showerror("Error", error_msg)
+            # Decode at native bit depth; the PIL image is an 8-bit view for display
+            array = image_io.load_image_array(file_path)
+            image = image_io.to_pil(array)
+            token.check()
+            on_ui(lambda: self.status_label.configure(text=f"Loading {filename}: building preview..."))
+            preview = self.build_preview_image(image)
+            print(f"✅ Decoded {filename} in {time.time() - start_time:.2f}s")
+            return PrefetchedFrame(file_path, array, image, preview)
+        
+        def finish(frame):
+            self._finish_load(file_path, frame.array, frame.image, frame.preview)
+            self.apply_prefetched_prediction(frame)
+        
+        self.scheduler.submit(load_worker, priority=Priority.INTERACTIVE, key="load", name=f"load {filename}",
+                              on_done=finish, on_error=self._load_failed)
+    
+    def _show_load_draft(self, draft):
+        """Show a reduced-resolution decode while the full image is still loading"""
+        self._load_draft = draft
+        self.state.selected_array = None
+        self.state.selected_image = draft
+        self.preview_selected_image = draft
+        self.state.notify_observers(StateSlice.IMAGES)
+    
+    def _finish_load(self, file_path, array, image, preview):
+        """Install the decoded full-resolution image (on the Tk thread)"""
+        self._load_draft = None
+        self.state.selected_array = array
+        self.state.selected_image = image
+        # Store the file path for export functionality
+        self.last_loaded_path = file_path
+        self.preview_selected_image = preview
+        self.start_pyramid_build(image)
+        if self.prefetcher is not None and self.prefetcher.take(file_path) is None:
+            self.prefetcher.add(PrefetchedFrame(file_path, array, image, preview))
+        self.state.processing_state.is_loading = False
+        self.state.notify_observers(StateSlice.IMAGES, StateSlice.PROCESSING)
+        
+        filename = os.path.basename(file_path)
+        print(f"✅ Image loaded: {filename} ({image.size[0]}x{image.size[1]}, {array.dtype})")
+        print(f"✅ Can detect dust now: {self.state.can_detect_dust}")
+        
+        self.status_label.configure(text=f"Image loaded: {filename}")
+    
+    def _load_failed(self, error):
+        self.state.processing_state.is_loading = False
+        if self._load_draft is not None and self.state.selected_image is self._load_draft:
+            # Detection, removal and export must never run on the reduced draft
+            self.state.selected_image = None
+            self.preview_selected_image = None
+            self.last_loaded_path = None
+            self.state.notify_observers(StateSlice.IMAGES)
+        self._load_draft = None
+        self.state.notify_observers(StateSlice.PROCESSING)
+        error_msg = f"Failed to load image: {str(error)}"
+        print(f"❌ {error_msg}")
+        self.status_label.configure(text=error_msg, text_color="red")
+        messagebox.showerror("Error", error_msg)
     
     def handle_file_drop(self, files: List[str]):
         """Handle drag and drop files"""
@@ -1444,35 +1751,21 @@ class SpotlessFilmModern:
             return
         
         self.state.processing_state.is_detecting = True
-        self.state.notify_observers()
+        self.state.notify_observers(StateSlice.PROCESSING)
         
-        def progress_callback(progress: float):
-            self.root.after_idle(lambda: self.status_label.configure(
-                text=f"Detecting dust... {int(progress * 100)}%"
-            ))
+        detection_mode = self.state.processing_state.detection_mode
         
-        def completion_callback(result: np.ndarray, processing_time: float):
+        def completion_callback(outcome):
+            result, processing_time = outcome
             try:
-                self.state.raw_prediction_mask = result
-                self.state.processing_state.processing_time = processing_time
-                
-                # Create initial binary mask
-                self.update_dust_mask_with_threshold()
-                
-                # Store original mask for brush modifications
-                self.state.original_dust_mask = self.state.dust_mask.copy() if self.state.dust_mask else None
-                
-                # Create low-res mask for performance
-                self.state.create_low_res_mask()
-                
-                # Clear undo history and save initial state
-                self.state.clear_mask_history()
-                if self.state.dust_mask:
-                    self.state.save_mask_to_history()
+                self.install_prediction(result, processing_time)
                 
                 self.state.processing_state.is_detecting = False
-                self.status_label.configure(text=f"Dust detected in {processing_time:.2f}s", text_color="green")
-                self.state.notify_observers()
+                status_text = f"Dust detected in {processing_time:.2f}s"
+                if detection_stats.get('tiles_per_second'):
+                    status_text += f" ({detection_stats['tiles']} tiles, {detection_stats['tiles_per_second']:.1f} tiles/s)"
+                self.status_label.configure(text=status_text, text_color="green")
+                self.state.notify_observers(StateSlice.MASK, StateSlice.PROCESSING)
                 
                 print(f"✅ Dust detection completed in {processing_time:.2f}s")
                 
@@ -1482,33 +1775,166 @@ class SpotlessFilmModern:
         def error_callback(error: Exception):
             self.handle_processing_error(error, "dust detection")
         
+        def cancelled_callback():
+            self.state.processing_state.is_detecting = False
+            self.state.notify_observers(StateSlice.PROCESSING)
+        
+        # Filled in by tiled detection with tiles/s throughput
+        detection_stats = {}
+        image = self.state.selected_image
+        cache_key = self.prediction_cache_key(detection_mode)
+        
         # Start processing task using the simple method (matches Swift macOS app)
-        def detect_worker():
+        def detect_worker(token):
+            print("🔍 Starting dust detection...")
+            start_time = time.time()
+            
+            def progress_callback(progress: float):
+                # Tiled detection reports per tile, so a superseded run stops there
+                token.check()
+                self.root.after_idle(lambda: self.status_label.configure(
+                    text=f"Detecting dust... {int(progress * 100)}%"
+                ))
+            
+            # A roll prefetch inference may hold the model; wait for it rather than
+            # stacking a second set of activations on the device
+            if not self.state.inference_lock.acquire(blocking=False):
+                print("⏳ Waiting for background detection to finish...")
+                self.state.inference_lock.acquire()
             try:
-                print("🔍 Starting dust detection...")
-                start_time = time.time()
-                
+                token.check()
                 # Use the exact prediction method from main.ipynb
                 result = ImageProcessingService.predict_dust_mask(
                     self.state.unet_model,
-                    self.state.selected_image,
+                    image,
                     threshold=0.5,  # Default threshold, will be adjustable
-                    window_size=1024,
-                    stride=512,
+                    window_size=self.state.processing_state.patch_size,
+                    stride=self.state.processing_state.stride,
                     device=self.state.device,
-                    progress_callback=progress_callback
+                    progress_callback=progress_callback,
+                    mode=detection_mode,
+                    stats=detection_stats,
+                    cache=self.prediction_cache,
+                    cache_key=cache_key,
+                    lazy=True
                 )
-                
-                processing_time = time.time() - start_time
-                completion_callback(result, processing_time)
-                
-            except Exception as e:
-                error_callback(e)
+            finally:
+                self.state.inference_lock.release()
+            return result, time.time() - start_time
+        
+        self.scheduler.submit(detect_worker, priority=Priority.RENDER, key="detect", name="dust detection",
+                              on_done=completion_callback, on_error=error_callback,
+                              on_cancelled=cancelled_callback)
+    
+    def install_prediction(self, result, processing_time: float):
+        """Make a raw prediction the current detection: threshold it and reset the mask history"""
+        self.state.raw_prediction_mask = result
+        self.state.build_threshold_masks()
+        self.state.processing_state.processing_time = processing_time
+        
+        # Create initial binary mask
+        self.update_dust_mask_with_threshold()
         
-        self.processing_task = threading.Thread(target=detect_worker)
-        self.processing_task.daemon = True
+        # Create low-res mask for performance
+        self.state.create_low_res_mask()
         
-        self.processing_task.start()
+        # Clear undo history and save initial state
+        self.state.clear_mask_history()
+        if self.state.dust_mask:
+            self.state.save_mask_to_history()
+    
+    def prediction_cache_key(self, detection_mode: str, image_path: Optional[str] = None) -> Optional[str]:
+        """Cache key for a file (default: the loaded one) and the weights, or None if either is unknown"""
+        weights_path = self.state.model_weights_path
+        image_path = image_path or getattr(self, 'last_loaded_path', None)
+        if not image_path or not weights_path:
+            return None
+        try:
+            params = {}
+            if detection_mode == "tiled":
+                params = {'window': self.state.processing_state.patch_size,
+                          'stride': self.state.processing_state.stride}
+            return self.prediction_cache.make_key(image_path, weights_path, detection_mode, **params)
+        except OSError as e:
+            print(f"⚠️ Prediction cache unavailable: {e}")
+            return None
+    
+    # MARK: - Roll Sessions
+    
+    def open_session_folder(self):
+        """Open a folder of scans as a roll and load its first frame"""
+        folder = filedialog.askdirectory(title="Select Roll Folder", initialdir=os.path.expanduser("~"))
+        if not folder:
+            return
+        frames = list_session_frames(folder)
+        if not frames:
+            messagebox.showerror("Error", "No images found in that folder")
+            return
+        
+        self.close_session()
+        self.prefetcher = FramePrefetcher(
+            frames, self._decode_frame, detect=self._prefetch_detect,
+            on_detected=lambda frame: self.root.after(0, lambda: self._on_frame_detected(frame)),
+            scheduler=self.scheduler, detect_lock=self.state.inference_lock
+        )
+        print(f"🎞️ Roll session: {len(frames)} frames in {folder}")
+        self.load_image(frames[0])
+    
+    def close_session(self):
+        if self.prefetcher is not None:
+            self.prefetcher.close()
+            self.prefetcher = None
+    
+    def step_frame(self, step: int):
+        """Load the next (step=1) or previous (step=-1) frame of the roll"""
+        if self.prefetcher is None or self.prefetcher.current is None:
+            return
+        index = self.prefetcher.index_of(self.prefetcher.current) + step
+        if 0 <= index < len(self.prefetcher.frames):
+            self.load_image(self.prefetcher.frames[index])
+    
+    def apply_prefetched_prediction(self, frame: PrefetchedFrame):
+        """Show a prefetched frame's prediction if it was made with the current weights and settings"""
+        if frame.prediction is None or self.state.unet_model is None:
+            return
+        if frame.prediction_key != self.prediction_cache_key(self.state.processing_state.detection_mode, frame.path):
+            return
+        self.install_prediction(frame.prediction, 0.0)
+        self.status_label.configure(text="Dust detected (prefetched)", text_color="green")
+        self.state.notify_observers(StateSlice.MASK, StateSlice.PROCESSING)
+    
+    def _decode_frame(self, path: str) -> PrefetchedFrame:
+        """Prefetch worker: decode a frame and build its preview"""
+        array = image_io.load_image_array(path)
+        image = image_io.to_pil(array)
+        return PrefetchedFrame(path, array, image, self.build_preview_image(image))
+    
+    def _prefetch_detect(self, frame: PrefetchedFrame):
+        """Prefetch worker: run detection with the current settings (also fills the prediction cache)"""
+        if self.state.unet_model is None:
+            return None
+        detection_mode = self.state.processing_state.detection_mode
+        cache_key = self.prediction_cache_key(detection_mode, frame.path)
+        prediction = ImageProcessingService.predict_dust_mask(
+            self.state.unet_model,
+            frame.image,
+            threshold=0.5,
+            window_size=self.state.processing_state.patch_size,
+            stride=self.state.processing_state.stride,
+            device=self.state.device,
+            mode=detection_mode,
+            cache=self.prediction_cache,
+            cache_key=cache_key,
+            lazy=True
+        )
+        return prediction, cache_key
+    
+    def _on_frame_detected(self, frame: PrefetchedFrame):
+        # A prediction landed for the frame on screen before detection was run on it
+        processing = self.state.processing_state
+        if (frame.path == self.last_loaded_path and self.state.raw_prediction_mask is None
+                and not processing.is_loading and not processing.is_detecting):
+            self.apply_prefetched_prediction(frame)
     
     def remove_dust(self):
         """Remove dust using AI inpainting"""
@@ -1519,6 +1945,9 @@ class SpotlessFilmModern:
             print("❌ Cannot remove dust - preconditions not met")
             return
         
+        # Removal must see the threshold the slider shows, not the last synced one
+        self.sync_full_res_threshold()
+        
         # Toggle overlay visibility when starting removal, per requested UX
         try:
             self.toggle_overlay()
@@ -1528,6 +1957,10 @@ class SpotlessFilmModern:
         # Deselect active tools when generating
         self.state.set_tool_mode(ToolMode.NONE)
 
+        self.start_dust_removal()
+    
+    def start_dust_removal(self):
+        """Show a preview inpaint right away and queue full-resolution removal of the current mask"""
         # 1) Generate a fast preview inpaint immediately for responsiveness (2K preview path)
         try:
             if self.preview_selected_image is not None and self.state.dust_mask is not None:
@@ -1541,7 +1974,7 @@ class SpotlessFilmModern:
                 self.preview_processed_image = preview_processed
                 # Switch view for quick feedback
                 self.state.set_processing_mode(ProcessingMode.SPLIT_SLIDER)
-                self.state.notify_observers()
+                self.state.notify_observers(StateSlice.IMAGES)
                 print("🎯 Preview inpaint generated for instant feedback")
                 # Ensure active view updates immediately
                 # Invalidate split cache so new preview is used
@@ -1551,115 +1984,163 @@ class SpotlessFilmModern:
             print(f"⚠️ Preview inpaint failed: {e}")
 
         self.state.processing_state.is_removing = True
-        self.state.notify_observers()
-        
-        def completion_callback(result: Image.Image, processing_time: float):
-            # Schedule GUI updates on main thread
-            def update_ui():
+        self.state.notify_observers(StateSlice.PROCESSING)
+        
+        # The worker gets its own copy of the mask: brush strokes, threshold
+        # changes and undo during the render restart it instead of racing it
+        image = self.state.selected_image
+        array = self.state.selected_array
+        mask_np = np.array(self.state.dust_mask)
+        self._removal_mask_version = self.state.mask_version
+        
+        def completion_callback(outcome):
+            result, processed_array, preview, processing_time = outcome
+            self._removal_mask_version = None
+            try:
+                print(f"🎯 Completion callback called with result: {type(result)}, time: {processing_time:.2f}s")
+                self.state.processed_image = result
+                self.state.processed_array = processed_array
+                print(f"🎯 Processed image set: {self.state.processed_image is not None}")
+                self.state.processing_state.processing_time = processing_time
+                self.state.processing_state.is_removing = False
+                
+                # Auto-switch to split view
+                print(f"🎯 Switching to SPLIT_SLIDER mode...")
+                self.state.set_processing_mode(ProcessingMode.SPLIT_SLIDER)
+                print(f"🎯 Current processing mode: {self.state.view_state.processing_mode}")
+                
+                self.status_label.configure(text=f"Dust removed in {processing_time:.2f}s", text_color="green")
+                
+                # Force multiple UI updates to ensure refresh
+                print(f"🎯 Forcing UI updates...")
+                self.state.notify_observers(StateSlice.IMAGES, StateSlice.PROCESSING)
+                
+                # Force immediate display update with processed image
+                # Invalidate split cache to pick up new processed preview/full-res
                 try:
-                    print(f"🎯 Completion callback called with result: {type(result)}, time: {processing_time:.2f}s")
-                    self.state.processed_image = result
-                    print(f"🎯 Processed image set: {self.state.processed_image is not None}")
-                    self.state.processing_state.processing_time = processing_time
-                    self.state.processing_state.is_removing = False
-                    
-                    # Auto-switch to split view
-                    print(f"🎯 Switching to SPLIT_SLIDER mode...")
-                    self.state.set_processing_mode(ProcessingMode.SPLIT_SLIDER)
-                    print(f"🎯 Current processing mode: {self.state.view_state.processing_mode}")
-                    
-                    self.status_label.configure(text=f"Dust removed in {processing_time:.2f}s", text_color="green")
-                    
-                    # Force multiple UI updates to ensure refresh
-                    print(f"🎯 Forcing UI updates...")
-                    self.state.notify_observers()
-                    
-                    # Force immediate display update with processed image
-                    # Invalidate split cache to pick up new processed preview/full-res
-                    try:
-                        self.preview_processed_image = self.build_preview_image(self.state.processed_image)
-                    except Exception as _e:
-                        print(f"⚠️ Failed to build processed preview: {_e}")
-                    self._split_cached_signature = None
-                    self.root.after_idle(lambda: self.display_image())
-                    print(f"🎯 Direct display_image update scheduled")
-                    
-                    # Force window refresh
-                    self.root.after_idle(lambda: self.root.update_idletasks())
-                    print(f"🎯 Window refresh scheduled")
-                    
-                    print(f"✅ Dust removal completed in {processing_time:.2f}s")
-                    
-                except Exception as e:
-                    print(f"❌ Error in completion callback: {e}")
-                    self.handle_processing_error(e, "dust removal")
-            
-            self.root.after_idle(update_ui)
+                    self.preview_processed_image = preview
+                    self.start_pyramid_build(self.state.processed_image)
+                except Exception as _e:
+                    print(f"⚠️ Failed to build processed preview: {_e}")
+                self._split_cached_signature = None
+                self.root.after_idle(lambda: self.display_image())
+                print(f"🎯 Direct display_image update scheduled")
+                
+                # Force window refresh
+                self.root.after_idle(lambda: self.root.update_idletasks())
+                print(f"🎯 Window refresh scheduled")
+                
+                print(f"✅ Dust removal completed in {processing_time:.2f}s")
+                
+            except Exception as e:
+                print(f"❌ Error in completion callback: {e}")
+                self.handle_processing_error(e, "dust removal")
         
         def error_callback(error: Exception):
-            def handle_error():
-                print(f"❌ Error callback called: {error}")
-                self.handle_processing_error(error, "dust removal")
+            print(f"❌ Error callback called: {error}")
+            self._removal_mask_version = None
+            self.handle_processing_error(error, "dust removal")
+        
+        def cancelled_callback():
+            # A newer run took over, or one restarts once the mask edit settles
+            if self._removal_job is not job or self._removal_mask_version is not None:
+                return
+            self.state.processing_state.is_removing = False
+            self.state.notify_observers(StateSlice.PROCESSING)
+        
+        def removal_worker(token):
+            start_time = time.time()
+            last_status = [None]
+            
+            def progress_callback(progress: float, stage):
+                # Checked several times per band, so an edit stops the render within one crop
+                token.check()
+                status = f"Removing dust... {stage.value} {int(progress * 100)}%"
+                if status != last_status[0]:
+                    last_status[0] = status
+                    self.root.after_idle(lambda: self.status_label.configure(text=status)
+                                         if not token.cancelled else None)
             
-            self.root.after_idle(handle_error)
+            result, processed_array = self.perform_dust_removal(image, array, mask_np, progress_callback)
+            token.check()
+            preview = self.build_preview_image(result)
+            return result, processed_array, preview, time.time() - start_time
         
         # Start processing task
-        print("🎯 Starting ProcessingTask...")
-        self.processing_task = ProcessingTask(
-            target_func=self.perform_dust_removal,
-            callback=completion_callback,
-            error_callback=error_callback
-        )
-        
-        self.processing_task.start()
-        print("🎯 ProcessingTask started")
-    
-    def perform_dust_removal(self) -> Image.Image:
-        """Perform the actual dust removal process using CV2 inpainting"""
+        print("🎯 Starting dust removal job...")
+        job = self.scheduler.submit(removal_worker, priority=Priority.RENDER, key="remove", name="dust removal",
+                                    on_done=completion_callback, on_error=error_callback,
+                                    on_cancelled=cancelled_callback)
+        self._removal_job = job
+    
+    def on_mask_changed(self):
+        """Abort a removal whose mask was edited, and restart it once the edit has settled"""
+        if self._removal_mask_version is None or self.state.mask_version == self._removal_mask_version:
+            return
+        if self._removal_job is not None and not self._removal_job.cancelled:
+            print("✋ Mask edited during removal: cancelling the stale render")
+            self._removal_job.cancel()
+            self.status_label.configure(text="Mask changed - removal will restart...")
+        # Mid-stroke and mid-slider edits are not in the full-resolution mask yet
+        if self.state.is_dragging or self.state.has_pending_stroke or self.state.threshold_sync_pending:
+            return
+        if self._removal_restart_job is not None:
+            self.root.after_cancel(self._removal_restart_job)
+        self._removal_restart_job = self.root.after(self.removal_restart_delay_ms, self.restart_dust_removal)
+    
+    def restart_dust_removal(self):
+        """Start removal again from the latest mask (after on_mask_changed cancelled it)"""
+        self._removal_restart_job = None
+        if self._removal_mask_version is None:
+            return
+        if self.state.dust_mask is None:
+            self._removal_mask_version = None
+            self.state.processing_state.is_removing = False
+            self.state.notify_observers(StateSlice.PROCESSING)
+            return
+        print("🔁 Restarting dust removal from the edited mask")
+        self.start_dust_removal()
+    
+    def cancel_dust_removal(self):
+        """Abort a running removal and any pending restart"""
+        if self._removal_restart_job is not None:
+            self.root.after_cancel(self._removal_restart_job)
+            self._removal_restart_job = None
+        self._removal_mask_version = None
+        self.scheduler.cancel("remove")
+    
+    def perform_dust_removal(self, image: Image.Image, array: Optional[np.ndarray], mask_np: np.ndarray,
+                             progress_callback=None) -> Tuple[Image.Image, Optional[np.ndarray]]:
+        """Full-resolution removal; returns the result image and, for array input, the native-depth array"""
         print(f"🎨 perform_dust_removal called")
-        print(f"🎨 Selected image available: {self.state.selected_image is not None}")
-        print(f"🎨 Dust mask available: {self.state.dust_mask is not None}")
         
-        if not self.state.selected_image or not self.state.dust_mask:
+        if image is None or mask_np is None:
             raise ValueError("Missing required components for dust removal")
         
         print("🎨 Starting CV2 inpainting process...")
         
-        # Dilate mask for better coverage
-        print("🎨 Dilating mask...")
-        dilated_mask = ImageProcessingService.dilate_mask(self.state.dust_mask)
-        
-        # Convert to RGB for processing
-        print("🎨 Converting image to RGB...")
-        image_rgb = self.state.selected_image.convert('RGB')
-        
-        # Perform CV2 inpainting using the fallback method
-        print("🎨 Performing CV2 inpainting...")
-        inpainted = self.perform_cv2_inpainting(image_rgb, dilated_mask)
-        
-        # Blend with original using mask
-        print("🎨 Blending images...")
-        final_result = ImageProcessingService.blend_images(
-            image_rgb, inpainted, dilated_mask
-        )
-        # Build preview for processed image
-        self.preview_processed_image = self.build_preview_image(final_result)
+        # Dilate, inpaint and blend band by band so only a few rows of
+        # full-resolution pixels are resident at any time
+        processed_array = None
+        if array is not None:
+            # Native uint8/uint16 path: no 8-bit round-trip for 16-bit scans
+            processed_array = ImageProcessingService.remove_dust_array(
+                array, mask_np, band_height=self.removal_band_height, kernel_size=5, radius=5,
+                progress_callback=progress_callback, inpaint_pool=self.inpaint_pool
+            )
+            final_result = image_io.to_pil(processed_array)
+        else:
+            final_result = ImageProcessingService.remove_dust_streaming(
+                image, mask_np, band_height=self.removal_band_height, kernel_size=5, radius=5,
+                progress_callback=progress_callback, inpaint_pool=self.inpaint_pool
+            )
         
         print("🎨 Dust removal process completed!")
-        return final_result
+        return final_result, processed_array
     
     def perform_cv2_inpainting(self, image: Image.Image, mask: Image.Image) -> Image.Image:
         """Perform single-pass CV2 TELEA inpainting (fast)."""
-        import cv2
-        
-        # Convert PIL images to numpy arrays
-        image_np = np.array(image.convert('RGB'))
-        mask_np = np.array(mask.convert('L'))
-        
-        print(f"🔍 Image shape: {image_np.shape}, Mask shape: {mask_np.shape}")
-        result = cv2.inpaint(image_np, mask_np, inpaintRadius=5, flags=cv2.INPAINT_TELEA)
-        print("✅ CV2 single-pass inpainting completed (radius=5)")
-        return Image.fromarray(result)
+        return ImageProcessingService.inpaint_cv2(image, mask, radius=5, inpaint_pool=self.inpaint_pool)
     
     def export_image(self):
         """Export processed image"""
@@ -1680,11 +2161,7 @@ class SpotlessFilmModern:
         
         if file_path:
             try:
-                # Save with high quality
-                if file_path.lower().endswith('.jpg') or file_path.lower().endswith('.jpeg'):
-                    self.state.processed_image.save(file_path, 'JPEG', quality=95)
-                else:
-                    self.state.processed_image.save(file_path)
+                self.save_processed_image(file_path)
                 
                 filename = os.path.basename(file_path)
                 print(f"✅ Image saved: {filename}")
@@ -1699,6 +2176,16 @@ class SpotlessFilmModern:
             except Exception as e:
                 self.state.show_error(f"Failed to save image: {str(e)}")
     
+    def save_processed_image(self, file_path: str):
+        """Write the processed image, keeping 16 bits per channel for TIFF/PNG"""
+        if self.state.processed_array is not None:
+            image_io.save_image_array(file_path, self.state.processed_array, jpeg_quality=95)
+        elif file_path.lower().endswith('.jpg') or file_path.lower().endswith('.jpeg'):
+            # Save with high quality
+            self.state.processed_image.save(file_path, 'JPEG', quality=95)
+        else:
+            self.state.processed_image.save(file_path)
+    
     # MARK: - UI Interaction Methods
     
     def set_view_mode(self, mode: ProcessingMode):
@@ -1743,6 +2230,8 @@ class SpotlessFilmModern:
         """Setup professional keyboard shortcuts"""
         # Global shortcuts
         self.root.bind('<Control-o>', lambda e: self.import_image())
+        self.root.bind('<Right>', lambda e: self.step_frame(1))
+        self.root.bind('<Left>', lambda e: self.step_frame(-1))
         self.root.bind('<Control-s>', lambda e: self.export_image())
         self.root.bind('<Control-z>', lambda e: self.undo_mask_change())
         # macOS Command+Z and Meta+Z fallback
@@ -1781,7 +2270,7 @@ class SpotlessFilmModern:
             pass
         # Update cursor to reflect space key state
         self.update_cursor_for_tool_change()
-        self.state.notify_observers()
+        self.state.notify_observers(StateSlice.VIEW)
     
     def export_full_resolution(self):
         """Export the full resolution processed image"""
@@ -1790,30 +2279,40 @@ class SpotlessFilmModern:
             return
         
         try:
+            # 16-bit scans default to TIFF so the extra precision survives export
+            high_bit_depth = (self.state.processed_array is not None and
+                              image_io.is_high_bit_depth(self.state.processed_array))
+            extension = ".tif" if high_bit_depth else ".jpg"
+            
             # Get the original filename to create export filename
             if hasattr(self, 'last_loaded_path') and self.last_loaded_path:
                 import os
                 base_name = os.path.splitext(os.path.basename(self.last_loaded_path))[0]
-                default_name = f"{base_name}_dust_removed.jpg"
+                default_name = f"{base_name}_dust_removed{extension}"
             else:
-                default_name = "dust_removed_image.jpg"
+                default_name = f"dust_removed_image{extension}"
+            
+            filetypes = [
+                ("JPEG files", "*.jpg"),
+                ("PNG files", "*.png"),
+                ("TIFF files", "*.tif *.tiff"),
+                ("All files", "*.*")
+            ]
+            if high_bit_depth:
+                filetypes.insert(0, filetypes.pop(2))
             
             # Ask user for save location
             from tkinter import filedialog
             file_path = filedialog.asksaveasfilename(
-                defaultextension=".jpg",
+                defaultextension=extension,
                 initialfile=default_name,
-                filetypes=[
-                    ("JPEG files", "*.jpg"),
-                    ("PNG files", "*.png"),
-                    ("All files", "*.*")
-                ],
+                filetypes=filetypes,
                 title="Export Full Resolution Image"
             )
             
             if file_path:
                 # Save the full resolution processed image
-                self.state.processed_image.save(file_path, quality=95)
+                self.save_processed_image(file_path)
                 messagebox.showinfo("Export Successful", f"Image exported successfully to:\n{file_path}")
                 print(f"✅ Full resolution image exported: {file_path}")
             else:
@@ -1852,7 +2351,7 @@ class SpotlessFilmModern:
     
     def load_models_async(self):
         """Load models asynchronously"""
-        def load_models():
+        def load_models(token):
             try:
                 print("🤖 Starting model loading...")
                 
@@ -1865,6 +2364,7 @@ class SpotlessFilmModern:
                     self.state.unet_model = ImageProcessingService.load_model(
                         model_paths['unet'], self.state.device
                     )
+                    self.state.model_weights_path = model_paths['unet']
                     print(f"🤖 U-Net model loaded successfully: {self.state.unet_model is not None}")
                     self.root.after_idle(lambda: self.status_label.configure(text="U-Net model loaded"))
                 else:
@@ -1875,7 +2375,7 @@ class SpotlessFilmModern:
                 
                 # Initialize LaMa
                 print("🤖 Initializing LaMa...")
-                self.lama_inpainter = LamaInpainter()
+                self.lama_inpainter = LamaInpainter(self.inpaint_pool)
                 self.state.lama_inpainter = self.lama_inpainter
                 
                 lama_status = "✅ Available" if self.lama_inpainter.available else "❌ Unavailable"
@@ -1898,49 +2398,11 @@ class SpotlessFilmModern:
                     text="Model loading failed", text_color="red"
                 ))
         
-        thread = threading.Thread(target=load_models)
-        thread.daemon = True
-        thread.start()
+        self.scheduler.submit(load_models, priority=Priority.INTERACTIVE, name="model loading")
     
     def find_model_files(self) -> dict:
         """Find model files - prioritize the specific weights file from main.ipynb"""
-        model_paths = {'unet': None, 'lama': None}
-        
-        # First, look for the exact weights file mentioned in main.ipynb
-        exact_weight_path = Path(__file__).parent / "weights" / "v5_bce_unet_epoch30.pth"
-        if exact_weight_path.exists():
-            model_paths['unet'] = str(exact_weight_path)
-            print(f"✅ Found exact weights file: {exact_weight_path}")
-            return model_paths
-        
-        # Fallback: search in common locations
-        search_dirs = [
-            Path(__file__).parent / "weights",
-            Path(__file__).parent / "checkpoints", 
-            Path.cwd() / "models",
-            Path.cwd() / "checkpoints",
-            Path.cwd() / "weights",
-            Path.cwd().parent / "models",
-            Path.cwd().parent / "checkpoints",
-        ]
-        
-        for search_dir in search_dirs:
-            if search_dir.exists():
-                print(f"🔍 Searching in: {search_dir}")
-                # Look for U-Net models (prioritize v5 and v6 models from notebook)
-                for pattern in ["v5_*.pth", "v6_*.pth", "*unet*.pth", "*.pth"]:
-                    unet_files = list(search_dir.glob(pattern))
-                    if unet_files:
-                        # Sort by name to get latest version
-                        unet_files.sort(reverse=True)
-                        model_paths['unet'] = str(unet_files[0])
-                        print(f"✅ Found weights file: {unet_files[0]}")
-                        break
-                
-                if model_paths['unet']:
-                    break
-        
-        return model_paths
+        return {'unet': ImageProcessingService.find_model_weights(), 'lama': None}
     
     # MARK: - Processing Support Methods
     
@@ -1951,7 +2413,7 @@ class SpotlessFilmModern:
         error_msg = f"{operation.capitalize()} failed: {str(error)}"
         self.state.show_error(error_msg)
         self.status_label.configure(text="Error occurred", text_color="red")
-        self.state.notify_observers()
+        self.state.notify_observers(StateSlice.PROCESSING)
         print(f"❌ {error_msg}")
     
     def update_dust_mask_with_threshold(self):
@@ -1959,6 +2421,11 @@ class SpotlessFilmModern:
         if self.state.raw_prediction_mask is None or not self.state.selected_image:
             return
         
+        if self.state.threshold_mask is not None:
+            self.state.apply_threshold(full_resolution=True)
+            self.state.notify_observers(StateSlice.MASK)
+            return
+        
         # Create new binary mask
         new_mask = ImageProcessingService.create_binary_mask(
             self.state.raw_prediction_mask,
@@ -1968,7 +2435,7 @@ class SpotlessFilmModern:
         
         self.state.dust_mask = new_mask
         self.state.create_low_res_mask()
-        self.state.notify_observers()
+        self.state.notify_observers(StateSlice.MASK)
     
     def update_dust_mask_with_threshold_realtime(self):
         """Real-time threshold updates (matches Swift app behavior)"""
@@ -1977,6 +2444,19 @@ class SpotlessFilmModern:
         
         print(f"🎚️ Updating threshold to {self.state.processing_state.threshold:.3f}")
         
+        if self.state.preview_threshold_mask is not None:
+            # Only pixels crossing the threshold change; the preview mask drives
+            # the overlay now and the full-resolution mask follows once the slider rests
+            self.state.apply_threshold(full_resolution=False)
+            # A rebuild for the previous threshold is stale now
+            self.scheduler.cancel("threshold-sync")
+            if self._threshold_sync_job is not None:
+                self.root.after_cancel(self._threshold_sync_job)
+            self._threshold_sync_job = self.root.after(self.threshold_sync_delay_ms,
+                                                       self.start_full_res_threshold_sync)
+            self.state.notify_observers(StateSlice.MASK)
+            return
+        
         # Create new binary mask with current threshold
         new_mask = ImageProcessingService.create_binary_mask(
             self.state.raw_prediction_mask,
@@ -1989,10 +2469,37 @@ class SpotlessFilmModern:
             self.state.create_low_res_mask()
             
             # Immediately update the display
-            self.update_ui()
+            self.state.notify_observers(StateSlice.MASK)
             
             print(f"✅ Mask updated with threshold {self.state.processing_state.threshold:.3f}")
     
+    def start_full_res_threshold_sync(self):
+        """Rebuild the full-resolution mask for the resting slider threshold in the background"""
+        self._threshold_sync_job = None
+        if not self.state.threshold_sync_pending:
+            return
+        threshold = self.state.processing_state.threshold
+        
+        def rebuild(token):
+            return self.state.compute_threshold_mask(threshold)
+        
+        def install(mask):
+            self.state.install_threshold_mask(mask, threshold)
+            self.state.notify_observers(StateSlice.MASK)
+        
+        self.scheduler.submit(rebuild, priority=Priority.RENDER, key="threshold-sync",
+                              name="full-res threshold", on_done=install)
+    
+    def sync_full_res_threshold(self):
+        """Apply a pending slider threshold to the full-resolution mask right away"""
+        if self._threshold_sync_job is not None:
+            self.root.after_cancel(self._threshold_sync_job)
+            self._threshold_sync_job = None
+        self.scheduler.cancel("threshold-sync")
+        if self.state.threshold_sync_pending:
+            self.state.sync_threshold_mask()
+            self.state.notify_observers(StateSlice.MASK)
+    
     # MARK: - Brush Tool Operations
     
     def apply_eraser_at_point(self, point: Tuple[float, float], canvas_width: int, canvas_height: int):
@@ -2021,20 +2528,8 @@ class SpotlessFilmModern:
         scale_factor = min(low_res_mask.size) / min(canvas_width, canvas_height)
         brush_radius = max(1, int(self.state.view_state.brush_size * scale_factor))
         
-        # Apply eraser with interpolation if we have a previous point
-        if self.state.last_eraser_point:
-            updated_mask = BrushTools.interpolated_stroke(
-                low_res_mask, self.state.last_eraser_point, low_res_point, 
-                brush_radius, is_erasing=True
-            )
-        else:
-            updated_mask = BrushTools.apply_circular_brush(
-                low_res_mask, low_res_point, brush_radius, is_erasing=True
-            )
-        
-        # Update state
-        self.state.last_eraser_point = low_res_point
-        self.state.update_low_res_mask(updated_mask)
+        # Apply eraser in place, interpolated from the previous point if we have one
+        self.state.paint_stroke(low_res_point, brush_radius, is_erasing=True)
     
     def apply_brush_at_point(self, point: Tuple[float, float], canvas_width: int, canvas_height: int):
         """Apply brush tool at given point"""
@@ -2062,20 +2557,8 @@ class SpotlessFilmModern:
         scale_factor = min(low_res_mask.size) / min(canvas_width, canvas_height)
         brush_radius = max(1, int(self.state.view_state.brush_size * scale_factor))
         
-        # Apply brush with interpolation if we have a previous point
-        if self.state.last_brush_point:
-            updated_mask = BrushTools.interpolated_stroke(
-                low_res_mask, self.state.last_brush_point, low_res_point, 
-                brush_radius, is_erasing=False
-            )
-        else:
-            updated_mask = BrushTools.apply_circular_brush(
-                low_res_mask, low_res_point, brush_radius, is_erasing=False
-            )
-        
-        # Update state
-        self.state.last_brush_point = low_res_point
-        self.state.update_low_res_mask(updated_mask)
+        # Apply brush in place, interpolated from the previous point if we have one
+        self.state.paint_stroke(low_res_point, brush_radius, is_erasing=False)
     
     def convert_to_low_res_coordinates(self, point: Tuple[float, float], 
                                      low_res_size: Tuple[int, int]) -> Optional[Tuple[float, float]]:
@@ -2231,15 +2714,19 @@ class SpotlessFilmModern:
     
     def cleanup(self):
         """Cleanup resources"""
-        if self.processing_task and self.processing_task.is_running():
-            print("Waiting for processing task to complete...")
-            self.processing_task.join(timeout=5.0)
+        self.close_session()
+        # Queued jobs are dropped; running ones are daemon threads and end with the process
+        self.scheduler.shutdown()
+        self.inpaint_pool.shutdown()
         
         print("✨ Spotless Film App closed")
 
 
 def main():
     """Main entry point"""
+    # Inpaint pool workers are spawned; in a frozen build they re-run the executable
+    multiprocessing.freeze_support()
+    
     print("✨ Starting Spotless Film (Modern Professional Version)...")
     print("Features:")
     print("  • Professional three-pane macOS-style interface")
@@ -92,13 +92,906 @@ def test_blend_images():
         print(f"❌ Image blending failed: {e}")
         return False
 
+def test_batched_prediction():
+    """Test batched prediction matches single-frame prediction"""
+    print("🧪 Testing batched U-Net prediction...")
+    
+    try:
+        import torch
+        # Tiny stand-in for the U-Net so the test runs quickly on CPU
+        model = torch.nn.Sequential(torch.nn.Conv2d(1, 1, 3, padding=1), torch.nn.Sigmoid()).eval()
+        device = torch.device("cpu")
+        
+        frames = [Image.new('L', (120, 80), color=c) for c in (0, 128, 255)]
+        frames[1].paste(255, (40, 30, 50, 40))
+        
+        batched = ImageProcessingService.predict_dust_masks_batch(model, frames, device=device, batch_size=2)
+        single = [ImageProcessingService.predict_dust_mask(model, f, device=device) for f in frames]
+        
+        assert len(batched) == len(frames)
+        for b, s in zip(batched, single):
+            assert b.shape == (80, 120)
+            assert np.allclose(b, s, atol=1e-5)
+        
+        print("✅ Batched prediction successful!")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Batched prediction failed: {e}")
+        return False
+
+def test_batch_pipeline():
+    """Test the headless decode → detect → inpaint → encode pipeline over a folder"""
+    print("🧪 Testing batch pipeline...")
+    
+    try:
+        import tempfile
+        import threading
+        import torch
+        from batch_process import BatchPipeline, collect_jobs
+        
+        class StubPipeline(BatchPipeline):
+            """Thresholds bright specks instead of running the U-Net"""
+            def detect(self, jobs):
+                self.batches.append(len(jobs))
+                for job in jobs:
+                    gray = job.image.max(axis=2) if job.image.ndim == 3 else job.image
+                    job.dust_mask = Image.fromarray(((gray > 250) * 255).astype(np.uint8), 'L')
+                    job.timings['detect'] = 0.0
+                return jobs
+        
+        rng = np.random.default_rng(11)
+        with tempfile.TemporaryDirectory() as tmp:
+            roll, out = Path(tmp) / "roll", Path(tmp) / "out"
+            roll.mkdir()
+            frames = {}
+            for i in range(6):
+                image = cv2.GaussianBlur((rng.random((90, 120, 3)) * 200).astype(np.uint8), (0, 0), 2)
+                for _ in range(4):
+                    cv2.circle(image, (int(rng.integers(10, 110)), int(rng.integers(10, 80))), 2, (255, 255, 255), -1)
+                frames[f"frame_{i:02d}"] = image
+                Image.fromarray(image).save(roll / f"frame_{i:02d}.png")
+            # Fails in decode; the frames after it must still come through
+            (roll / "frame_03b.png").write_bytes(b"not an image")
+            
+            jobs = collect_jobs(roll, out)
+            assert [job.path.stem for job in jobs][4] == "frame_03b"
+            pipeline = StubPipeline(None, torch.device("cpu"), batch_size=2, decode_workers=2,
+                                    inpaint_workers=2, encode_workers=2, queue_size=1)
+            pipeline.batches = []
+            runner = threading.Thread(target=lambda: pipeline.run(jobs), daemon=True)
+            runner.start()
+            runner.join(30)
+            assert not runner.is_alive(), "pipeline stalled"
+            
+            stats = pipeline.stats
+            assert stats.total == 7 and stats.processed == 6
+            assert stats.failed == [str(roll / "frame_03b.png")]
+            assert sum(pipeline.batches) == 6 and max(pipeline.batches) <= 2
+            for job in jobs:
+                if job.path.stem == "frame_03b":
+                    continue
+                # Every stage ran, in pipeline order, and each output belongs to its own frame
+                assert list(job.timings) == ['decode', 'detect', 'inpaint', 'encode']
+                image = frames[job.path.stem]
+                mask = ((image.max(axis=2) > 250) * 255).astype(np.uint8)
+                expected = ImageProcessingService.remove_dust_array(image, mask, band_height=512)
+                assert np.array_equal(np.asarray(Image.open(job.output_path)), expected)
+            
+            # The stop sentinel reached every stage, so no worker is left behind
+            stages = ('decode-', 'detect-', 'inpaint-', 'encode-')
+            assert not [t for t in threading.enumerate() if t.name.startswith(stages)]
+        
+        print("✅ Batch pipeline successful!")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Batch pipeline failed: {e}")
+        return False
+
+def test_tiled_prediction():
+    """Test full-resolution tiled prediction"""
+    print("🧪 Testing tiled prediction...")
+    
+    try:
+        import torch
+        model = torch.nn.Sequential(torch.nn.Conv2d(1, 1, 3, padding=1), torch.nn.Sigmoid()).eval()
+        device = torch.device("cpu")
+        
+        # A flat frame must give (nearly) the same probability everywhere, whatever
+        # the tiling; only the conv's zero padding at tile edges leaks in slightly
+        flat = Image.new('L', (300, 170), color=90)
+        stats = {}
+        pred = ImageProcessingService.predict_dust_mask(
+            model, flat, window_size=64, stride=48, device=device,
+            mode="tiled", batch_size=3, stats=stats
+        )
+        with torch.no_grad():
+            expected = model(torch.full((1, 1, 64, 64), 90 / 255.0))[0, 0, 32, 32].item()
+        
+        assert pred.shape == (170, 300)
+        assert np.allclose(pred[2:-2, 2:-2], expected, atol=1e-3)
+        assert stats['tiles'] == 24 and stats['tiles_per_second'] > 0
+        
+        print(f"✅ Tiled prediction successful! ({stats['tiles_per_second']:.1f} tiles/s)")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Tiled prediction failed: {e}")
+        return False
+
+def test_streaming_removal():
+    """Test band-by-band removal matches the full-frame pipeline"""
+    print("🧪 Testing streaming dust removal...")
+    
+    try:
+        rng = np.random.default_rng(0)
+        image_np = cv2.GaussianBlur((rng.random((300, 200, 3)) * 255).astype(np.uint8), (0, 0), 3)
+        mask_np = np.zeros((300, 200), dtype=np.uint8)
+        for _ in range(30):
+            cv2.circle(mask_np, (int(rng.integers(0, 200)), int(rng.integers(0, 300))), 3, 255, -1)
+        image = Image.fromarray(image_np)
+        mask = Image.fromarray(mask_np, mode='L')
+        
+        # Reference: dilate → inpaint → blend over the whole frame
+        dilated = ImageProcessingService.dilate_mask(mask)
+        inpainted = ImageProcessingService.inpaint_cv2(image, dilated)
+        expected = np.array(ImageProcessingService.blend_images(image, inpainted, dilated))
+        
+        streamed = ImageProcessingService.remove_dust_streaming(image, mask, band_height=40)
+        
+        assert streamed.size == image.size
+        assert np.array_equal(np.array(streamed), expected)
+        
+        # A blob much taller than the halo straddling a band boundary (y=256)
+        blob_image = cv2.GaussianBlur((rng.random((600, 400, 3)) * 255).astype(np.uint8), (0, 0), 3)
+        blob_mask = np.zeros((600, 400), dtype=np.uint8)
+        cv2.ellipse(blob_mask, (200, 256), (30, 120), 0, 0, 360, 255, -1)
+        full_frame = ImageProcessingService.remove_dust_array(blob_image, blob_mask, band_height=10000)
+        banded = ImageProcessingService.remove_dust_array(blob_image, blob_mask, band_height=256)
+        assert np.array_equal(banded, full_frame)
+        banded_pil = ImageProcessingService.remove_dust_streaming(Image.fromarray(blob_image),
+                                                                  Image.fromarray(blob_mask, mode='L'),
+                                                                  band_height=256)
+        assert np.array_equal(np.array(banded_pil), full_frame)
+        
+        print("✅ Streaming removal successful!")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Streaming removal failed: {e}")
+        return False
+
+def test_region_inpainting():
+    """Test sparse region inpainting matches full-frame TELEA"""
+    print("🧪 Testing region-based inpainting...")
+    
+    try:
+        rng = np.random.default_rng(1)
+        image_np = cv2.GaussianBlur((rng.random((240, 320, 3)) * 255).astype(np.uint8), (0, 0), 3)
+        mask_np = np.zeros((240, 320), dtype=np.uint8)
+        for _ in range(8):
+            cv2.circle(mask_np, (int(rng.integers(0, 320)), int(rng.integers(0, 240))),
+                       int(rng.integers(1, 6)), 255, -1)
+        cv2.line(mask_np, (10, 200), (120, 150), 255, 2)
+        
+        expected = cv2.inpaint(image_np, mask_np, inpaintRadius=5, flags=cv2.INPAINT_TELEA)
+        regions = ImageProcessingService.find_dust_regions(mask_np)
+        result = ImageProcessingService.inpaint_regions(image_np, mask_np, radius=5, max_workers=4)
+        
+        assert 0 < len(regions) and sum(r.area for r in regions) < mask_np.size
+        assert np.array_equal(result, expected)
+        
+        print(f"✅ Region inpainting successful! ({len(regions)} regions)")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Region inpainting failed: {e}")
+        return False
+
+def test_masked_blend():
+    """Test in-place masked blending for 8-bit and 16-bit arrays"""
+    print("🧪 Testing masked blending...")
+    
+    try:
+        rng = np.random.default_rng(2)
+        mask_np = rng.choice(np.array([0, 0, 0, 64, 255], dtype=np.uint8), size=(60, 80))
+        for dtype in (np.uint8, np.uint16):
+            top = np.iinfo(dtype).max
+            original = rng.integers(0, top, (60, 80, 3), dtype=dtype)
+            inpainted = rng.integers(0, top, (60, 80, 3), dtype=dtype)
+            
+            alpha = (mask_np.astype(np.float32) / 255.0)[..., None]
+            expected = np.clip(original * (1 - alpha) + inpainted.astype(np.float32) * alpha, 0, top).astype(dtype)
+            result = ImageProcessingService.blend_arrays(original.copy(), inpainted, mask_np)
+            feathered = ImageProcessingService.blend_arrays(original.copy(), inpainted, mask_np, feather=3)
+            
+            assert result.dtype == dtype and np.array_equal(result, expected)
+            assert feathered.dtype == dtype
+            assert np.array_equal(feathered[mask_np == 255], inpainted[mask_np == 255])
+        
+        print("✅ Masked blending successful!")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Masked blending failed: {e}")
+        return False
+
+def test_sixteen_bit_removal():
+    """Test uint16 frames go through removal and TIFF export at full depth"""
+    print("🧪 Testing 16-bit removal path...")
+    
+    try:
+        import tempfile
+        import image_io
+        
+        rng = np.random.default_rng(3)
+        image_8 = cv2.GaussianBlur((rng.random((240, 200, 3)) * 255).astype(np.uint8), (0, 0), 3)
+        image_16 = image_8.astype(np.uint16) * 257 + rng.integers(0, 257, image_8.shape, dtype=np.uint16)
+        mask_np = np.zeros((240, 200), dtype=np.uint8)
+        for _ in range(12):
+            cv2.circle(mask_np, (int(rng.integers(0, 200)), int(rng.integers(0, 240))), 3, 255, -1)
+        
+        result_8 = ImageProcessingService.remove_dust_array(image_8, mask_np, band_height=64)
+        result_16 = ImageProcessingService.remove_dust_array(image_16, mask_np, band_height=64)
+        untouched = cv2.dilate(mask_np, np.ones((7, 7), np.uint8)) == 0
+        
+        assert result_16.dtype == np.uint16
+        assert np.array_equal(result_16[untouched], image_16[untouched])
+        assert np.abs((result_16 >> 8).astype(int) - result_8).max() <= 4
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "frame.tif"
+            image_io.save_image_array(path, result_16)
+            assert np.array_equal(image_io.load_image_array(path), result_16)
+        
+        print("✅ 16-bit removal successful!")
+        return True
+        
+    except Exception as e:
+        print(f"❌ 16-bit removal failed: {e}")
+        return False
+
+def test_load_draft():
+    """Test the quick draft decode only applies to JPEGs large enough to reduce"""
+    print("🧪 Testing draft decode...")
+    
+    try:
+        import tempfile
+        import image_io
+        
+        rng = np.random.default_rng(5)
+        large = cv2.GaussianBlur((rng.random((1600, 2400, 3)) * 255).astype(np.uint8), (0, 0), 3)
+        with tempfile.TemporaryDirectory() as tmp:
+            Image.fromarray(large).save(Path(tmp) / "large.jpg")
+            Image.fromarray(large[:600, :800]).save(Path(tmp) / "small.jpg")
+            Image.fromarray(large).save(Path(tmp) / "large.png")
+            
+            draft = image_io.load_draft(Path(tmp) / "large.jpg", min_side=512)
+            assert draft is not None and draft.mode == 'RGB'
+            assert draft.size[0] < 2400 and draft.size[1] < 1600 and min(draft.size) >= 512
+            # Nothing to gain from a draft that is the full decode, or from formats without DCT scaling
+            assert image_io.load_draft(Path(tmp) / "small.jpg", min_side=512) is None
+            assert image_io.load_draft(Path(tmp) / "large.png", min_side=512) is None
+        
+        print("✅ Draft decode successful!")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Draft decode failed: {e}")
+        return False
+
+def test_removal_progress():
+    """Test removal reports stage progress and stops when the callback cancels"""
+    print("🧪 Testing removal progress and cancellation...")
+    
+    try:
+        from image_processing import RemovalStage
+        from job_scheduler import CancellationToken, OperationCancelled
+        
+        rng = np.random.default_rng(5)
+        image_np = cv2.GaussianBlur((rng.random((256, 200, 3)) * 255).astype(np.uint8), (0, 0), 3)
+        mask_np = np.zeros((256, 200), dtype=np.uint8)
+        for _ in range(40):
+            cv2.circle(mask_np, (int(rng.integers(0, 200)), int(rng.integers(0, 256))), 2, 255, -1)
+        
+        reports = []
+        result = ImageProcessingService.remove_dust_array(
+            image_np, mask_np, band_height=64,
+            progress_callback=lambda progress, stage: reports.append((progress, stage))
+        )
+        progress = [p for p, _ in reports]
+        assert progress == sorted(progress) and progress[-1] == 1.0
+        assert {stage for _, stage in reports} == set(RemovalStage)
+        assert np.array_equal(result, ImageProcessingService.remove_dust_array(image_np, mask_np, band_height=64))
+        
+        token = CancellationToken()
+        seen = []
+        
+        def cancelling_callback(progress, stage):
+            seen.append(stage)
+            if stage == RemovalStage.INPAINT:
+                token.cancel()
+            token.check()
+        
+        try:
+            ImageProcessingService.remove_dust_array(image_np, mask_np, band_height=64,
+                                                     progress_callback=cancelling_callback)
+            raise AssertionError("Cancelled removal ran to completion")
+        except OperationCancelled:
+            pass
+        assert RemovalStage.BLEND not in seen
+        
+        print("✅ Removal progress successful!")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Removal progress failed: {e}")
+        return False
+
+def test_inpaint_pool():
+    """Test process-pool inpainting through shared memory matches the threaded path"""
+    print("🧪 Testing inpaint process pool...")
+    
+    pool = None
+    try:
+        from inpaint_pool import InpaintProcessPool
+        
+        rng = np.random.default_rng(6)
+        image_np = cv2.GaussianBlur((rng.random((300, 260, 3)) * 65535).astype(np.uint16), (0, 0), 3)
+        mask_np = np.zeros((300, 260), dtype=np.uint8)
+        for _ in range(30):
+            cv2.circle(mask_np, (int(rng.integers(0, 260)), int(rng.integers(0, 300))), 3, 255, -1)
+        
+        expected = ImageProcessingService.inpaint_regions(image_np, mask_np, radius=5)
+        pool = InpaintProcessPool(max_workers=2, min_area=0)
+        progress = []
+        result = ImageProcessingService.inpaint_regions(image_np, mask_np, radius=5, inpaint_pool=pool,
+                                                        progress_callback=progress.append)
+        assert pool.available, "Pool fell back to threads"
+        assert result.dtype == np.uint16
+        assert np.array_equal(result, expected)
+        assert progress and progress[-1] == 1.0
+        
+        removed = ImageProcessingService.remove_dust_array(image_np, mask_np, band_height=128, inpaint_pool=pool)
+        assert np.array_equal(removed, ImageProcessingService.remove_dust_array(image_np, mask_np, band_height=128))
+        
+        print("✅ Inpaint process pool successful!")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Inpaint process pool failed: {e}")
+        return False
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+def test_prediction_cache():
+    """Test cached predictions skip inference and the cache stays within budget"""
+    print("🧪 Testing prediction cache...")
+    
+    try:
+        import tempfile
+        import torch
+        from prediction_cache import PredictionCache
+        
+        calls = []
+        model = torch.nn.Sequential(torch.nn.Conv2d(1, 1, 3, padding=1), torch.nn.Sigmoid()).eval()
+        model.register_forward_hook(lambda *_: calls.append(1))
+        device = torch.device("cpu")
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            image_path = Path(tmp) / "frame.png"
+            weights_path = Path(tmp) / "weights.pth"
+            Image.new('L', (160, 120), color=40).save(image_path)
+            torch.save(model.state_dict(), weights_path)
+            
+            cache = PredictionCache(Path(tmp) / "cache")
+            key = cache.make_key(image_path, weights_path, "fast")
+            assert key != cache.make_key(image_path, weights_path, "tiled", window=1024, stride=512)
+            
+            first = ImageProcessingService.predict_dust_mask(model, str(image_path), device=device,
+                                                             cache=cache, cache_key=key)
+            second = ImageProcessingService.predict_dust_mask(model, str(image_path), device=device,
+                                                              cache=cache, cache_key=key)
+            assert len(calls) == 1
+            assert second.shape == (120, 160) and np.allclose(first, second, atol=1e-3)
+            
+            # Budget of one entry: the least recently used one is evicted
+            cache.max_bytes = cache.size_bytes
+            cache.put("other", np.zeros((1024, 1024), dtype=np.float32))
+            assert cache.get(key) is None and cache.get("other") is not None
+        
+        print("✅ Prediction cache successful!")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Prediction cache failed: {e}")
+        return False
+
+def test_threshold_mask():
+    """Test incremental re-thresholding matches a full threshold pass"""
+    print("🧪 Testing incremental threshold mask...")
+    
+    try:
+        from threshold_mask import ThresholdMask, nearest_sample
+        
+        rng = np.random.default_rng(4)
+        prediction = cv2.resize((rng.random((32, 32)).astype(np.float32) ** 4) * 0.1, (300, 211))
+        mask = ThresholdMask(prediction, 0.0255)
+        
+        # In-range steps both ways, an out-of-range jump and back again
+        for threshold in (0.02, 0.0201, 0.035, 0.001, 0.05, 0.0005, 0.08, 0.0255):
+            expected = (prediction > threshold).astype(np.uint8) * 255
+            assert np.array_equal(mask.set_threshold(threshold), expected), threshold
+            assert abs(mask.coverage - (prediction > threshold).mean()) < 1e-9
+        
+        # The preview samples exactly what a NEAREST resize of the mask keeps
+        preview = nearest_sample(prediction, (128, 90))
+        resized = Image.fromarray(mask.mask).resize((128, 90), Image.NEAREST)
+        assert np.array_equal((preview > 0.0255).astype(np.uint8) * 255, np.array(resized))
+        
+        print("✅ Threshold mask successful!")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Threshold mask failed: {e}")
+        return False
+
+def test_lazy_prediction():
+    """Test lazily upsampled predictions read like the eager full-size map"""
+    print("🧪 Testing lazy prediction...")
+    
+    try:
+        import torch
+        from lazy_prediction import LazyPrediction
+        
+        rng = np.random.default_rng(5)
+        native = (rng.random((64, 64)).astype(np.float32) ** 4) * 0.1
+        eager = cv2.resize(native, (333, 250), interpolation=cv2.INTER_LINEAR)
+        lazy = LazyPrediction(native, (333, 250))
+        
+        assert lazy.shape == eager.shape
+        assert np.allclose(lazy.band(17, 120), eager[17:120], atol=1e-6)
+        assert np.allclose(lazy.sample(np.array([0, 99, 249]), np.array([5, 332])),
+                           eager[np.ix_([0, 99, 249], [5, 332])], atol=1e-6)
+        assert np.array_equal(lazy.threshold(0.02), (lazy.materialize() > 0.02).astype(np.uint8) * 255)
+        
+        model = torch.nn.Sequential(torch.nn.Conv2d(1, 1, 3, padding=1), torch.nn.Sigmoid()).eval()
+        frame = Image.fromarray((rng.random((90, 140)) * 255).astype(np.uint8))
+        device = torch.device("cpu")
+        dense = ImageProcessingService.predict_dust_mask(model, frame, device=device)
+        deferred = ImageProcessingService.predict_dust_mask(model, frame, device=device, lazy=True)
+        assert isinstance(deferred, LazyPrediction) and np.allclose(np.asarray(deferred), dense, atol=1e-6)
+        
+        print("✅ Lazy prediction successful!")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Lazy prediction failed: {e}")
+        return False
+
+def test_mask_history():
+    """Test compressed undo history round-trips masks and honours its budget"""
+    print("🧪 Testing mask history...")
+    
+    try:
+        from mask_history import MaskHistory
+        
+        rng = np.random.default_rng(6)
+        masks = []
+        for _ in range(5):
+            mask_np = np.zeros((300, 400), dtype=np.uint8)
+            for _ in range(20):
+                cv2.circle(mask_np, (int(rng.integers(0, 400)), int(rng.integers(0, 300))), 6, 255, -1)
+            masks.append(Image.fromarray(mask_np, mode='L'))
+        soft = Image.fromarray(cv2.GaussianBlur(np.array(masks[0]), (0, 0), 2), mode='L')
+        
+        history = MaskHistory()
+        for mask in masks + [soft]:
+            history.push(mask)
+        assert history.nbytes < 300 * 400
+        
+        # Newest first, bit-exact for both binary and soft masks
+        for mask in [soft] + masks[::-1]:
+            assert np.array_equal(np.array(history.pop()), np.array(mask))
+        assert history.pop() is None
+        
+        budget = MaskHistory(max_bytes=1)
+        for mask in masks:
+            budget.push(mask)
+        assert len(budget) == 1 and np.array_equal(np.array(budget.pop()), np.array(masks[-1]))
+        
+        print("✅ Mask history successful!")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Mask history failed: {e}")
+        return False
+
+def test_brush_engine():
+    """Test in-place stencil stamping matches full-mask circles and reports dirty rects"""
+    print("🧪 Testing brush engine...")
+    
+    try:
+        from image_processing import BrushEngine, BrushTools
+        
+        def reference_stamp(mask_np, center, radius, value):
+            h, w = mask_np.shape
+            cx, cy = int(center[0]), int(center[1])
+            if 0 <= cx < w and 0 <= cy < h:
+                y, x = np.ogrid[:h, :w]
+                mask_np[(x - cx) ** 2 + (y - cy) ** 2 <= radius ** 2] = value
+        
+        rng = np.random.default_rng(7)
+        base = (rng.random((120, 160)) > 0.7).astype(np.uint8) * 255
+        engine = BrushEngine(base.copy())
+        expected = base.copy()
+        # Interior, border-clipped and off-mask stamps
+        for center, radius, erase in [((80.4, 60.9), 9, True), ((2, 118), 7, False),
+                                      ((159, 0), 12, True), ((200, 50), 5, False)]:
+            before = engine.buffer.copy()
+            rect = engine.stamp(center, radius, erase)
+            reference_stamp(expected, center, radius, 0 if erase else 255)
+            assert np.array_equal(engine.buffer, expected)
+            # Nothing outside the reported rectangle may change
+            changed = engine.buffer != before
+            if rect is not None:
+                changed[rect.y0:rect.y1, rect.x0:rect.x1] = False
+            assert not changed.any()
+        
+        dirty = engine.take_dirty()
+        assert dirty.box == (0, 0, 160, 120) and engine.take_dirty() is None
+        
+        stroke = BrushTools.interpolated_stroke(Image.fromarray(base, mode='L'), (10, 10), (90, 70), 6, False)
+        engine = BrushEngine(base.copy())
+        rect = engine.stroke((10, 10), (90, 70), 6, False)
+        assert np.array_equal(np.array(stroke), engine.buffer)
+        assert rect.box == (4, 4, 97, 77)
+        
+        print("✅ Brush engine successful!")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Brush engine failed: {e}")
+        return False
+
+def test_stroke_sync():
+    """Test brush strokes reach the full-res mask only where the brush went"""
+    print("🧪 Testing stroke sync...")
+    
+    try:
+        from dust_removal_state import DustRemovalState
+        
+        class IdleRoot:
+            def after_idle(self, callback):
+                pass
+            
+            def after(self, delay_ms, callback):
+                pass
+        
+        rng = np.random.default_rng(8)
+        original = (rng.random((1500, 2000)) > 0.9).astype(np.uint8) * 255
+        state = DustRemovalState(IdleRoot())
+        state.dust_mask = Image.fromarray(original, mode='L')
+        state.create_low_res_mask()
+        
+        state.start_brush_stroke()
+        state.paint_stroke((100, 100), 12, is_erasing=True)
+        state.paint_stroke((300, 180), 12, is_erasing=True)
+        # Nothing reaches full resolution until the stroke ends
+        assert state.has_pending_stroke
+        assert np.array_equal(np.array(state.dust_mask), original)
+        state.end_brush_stroke()
+        
+        result = np.array(state.dust_mask)
+        assert not state.has_pending_stroke
+        # Pixels outside the stroke keep their full-res detail; inside it is erased
+        changed = result != original
+        assert changed.any() and not result[changed].any()
+        ys, xs = np.nonzero(changed)
+        scale = 2000 / state.low_res_mask.size[0]
+        assert xs.min() >= (100 - 12) * scale - 1 and xs.max() <= (300 + 13) * scale
+        assert np.array_equal(result[:, 1300:], original[:, 1300:])
+        
+        state.undo_last_mask_change()
+        assert np.array_equal(np.array(state.dust_mask), original)
+        
+        print("✅ Stroke sync successful!")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Stroke sync failed: {e}")
+        return False
+
+def test_observer_batching():
+    """Test notifications coalesce into one flush that only reaches subscribed observers"""
+    print("🧪 Testing observer batching...")
+    
+    try:
+        from dust_removal_state import DustRemovalState, StateSlice
+        
+        class QueueRoot:
+            def __init__(self):
+                self.queue = []
+            
+            def after_idle(self, callback):
+                self.queue.append(callback)
+            
+            def after(self, delay_ms, callback):
+                self.queue.append(callback)
+            
+            def run(self):
+                queue, self.queue = self.queue, []
+                for callback in queue:
+                    callback()
+        
+        root = QueueRoot()
+        state = DustRemovalState(root)
+        calls = {'all': 0, 'view': 0, 'mask': 0}
+        state.add_observer(lambda: calls.__setitem__('all', calls['all'] + 1))
+        state.add_observer(lambda: calls.__setitem__('view', calls['view'] + 1), (StateSlice.VIEW,))
+        state.add_observer(lambda: calls.__setitem__('mask', calls['mask'] + 1), (StateSlice.MASK,))
+        
+        for _ in range(10):
+            state.notify_observers(StateSlice.MASK)
+        state.zoom_in()
+        assert len(root.queue) == 1
+        root.run()
+        assert calls == {'all': 1, 'view': 1, 'mask': 1}
+        
+        # A flush only reaches observers of the slices that changed
+        state.notify_observers(StateSlice.PROCESSING)
+        root.run()
+        assert calls == {'all': 2, 'view': 1, 'mask': 1}
+        
+        print("✅ Observer batching successful!")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Observer batching failed: {e}")
+        return False
+
+def test_image_pyramid():
+    """Test pyramid levels halve and viewports come from the right level"""
+    print("🧪 Testing image pyramid...")
+    
+    try:
+        from image_processing import DirtyRect
+        from image_pyramid import ImagePyramid, MaskPyramid
+        
+        rng = np.random.default_rng(9)
+        image = Image.fromarray(rng.integers(0, 255, (1200, 2400, 3), dtype=np.uint8))
+        pyramid = ImagePyramid(image, min_level_side=256)
+        assert [level.size for level in pyramid.levels] == [(2400, 1200), (1200, 600), (600, 300), (300, 150)]
+        assert pyramid.levels[0] is image
+        
+        # Fit-to-window picks a reduced level; deep zoom reads the source itself
+        assert pyramid.level_for(800) == 1 and pyramid.level_for(5000) == 0
+        viewport = pyramid.render((4800, 2400), (1000, 600, 1800, 1100), Image.Resampling.NEAREST)
+        assert viewport.size == (800, 500)
+        expected = image.resize((800, 500), Image.Resampling.NEAREST, box=(500, 300, 900, 550))
+        assert np.array_equal(np.array(viewport), np.array(expected))
+        
+        # Mask levels are max-pooled, and an in-place edit refreshed by
+        # rectangle matches a full rebuild
+        mask_np = np.zeros((1001, 1499), dtype=np.uint8)
+        mask_np[500, 700] = 255
+        mask = Image.fromarray(mask_np, mode='L')
+        masks = MaskPyramid(mask, min_level_side=128)
+        assert all(level.max() == 255 for level in masks.levels[1:])
+        mask.paste(255, (301, 77, 345, 160))
+        masks.refresh(DirtyRect(301, 77, 345, 160))
+        rebuilt = MaskPyramid(mask, min_level_side=128)
+        assert all(np.array_equal(a, b) for a, b in zip(masks.levels[1:], rebuilt.levels[1:]))
+        assert np.array_equal(masks.render((3000, 2002), (600, 150, 700, 330)),
+                              np.array(mask.resize((3000, 2002), Image.Resampling.NEAREST))[150:330, 600:700])
+        
+        print("✅ Image pyramid successful!")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Image pyramid failed: {e}")
+        return False
+
+def test_gl_tiles():
+    """Test the GL view only picks the tiles a viewport overlaps"""
+    print("🧪 Testing GL tile layout...")
+    
+    try:
+        from gl_image_view import visible_tiles, fit_size
+        
+        # The whole image covers every tile, edge tiles are cut to the image
+        tiles = visible_tiles((2500, 1100), 1024, (0.0, 0.0, 1.0, 1.0))
+        assert len(tiles) == 6 and tiles[-1] == (2048, 1024, 2500, 1100)
+        
+        # A 1:1 viewport in the middle of a 9000x6000 scan needs only its four tiles
+        tiles = visible_tiles((9000, 6000), 1024, (0.45, 0.4, 0.55, 0.6))
+        assert tiles == [(3072, 2048, 4096, 3072), (4096, 2048, 5120, 3072),
+                         (3072, 3072, 4096, 4096), (4096, 3072, 5120, 4096)]
+        assert visible_tiles((9000, 6000), 1024, (0.5, 0.0, 0.5, 1.0)) == []
+        
+        assert fit_size((9000, 6000), 4096) == (4096, 2731)
+        assert fit_size((800, 600), 4096) == (800, 600)
+        
+        print("✅ GL tile layout successful!")
+        return True
+        
+    except Exception as e:
+        print(f"❌ GL tile layout failed: {e}")
+        return False
+
+def test_frame_prefetcher():
+    """Test roll prefetching stays in its window and memory budget"""
+    print("🧪 Testing frame prefetcher...")
+    
+    try:
+        import threading
+        import time
+        from frame_prefetcher import FramePrefetcher, PrefetchedFrame
+        
+        frames = [f"frame_{i:02d}.tif" for i in range(10)]
+        
+        def decode(path):
+            array = np.zeros((100, 100, 3), dtype=np.uint8)
+            image = Image.fromarray(array)
+            return PrefetchedFrame(path, array, image, image.resize((50, 50)))
+        
+        detected = []
+        # Shared with foreground detection: prefetch inference waits while it is held
+        inference_lock = threading.Lock()
+        inference_lock.acquire()
+        prefetcher = FramePrefetcher(frames, decode, detect=lambda frame: (np.zeros((100, 100), np.float32), "key"),
+                                     on_detected=detected.append, radius=2, max_bytes=10 ** 9,
+                                     detect_lock=inference_lock)
+        assert prefetcher.neighbours("frame_00.tif") == ["frame_01.tif", "frame_02.tif"]
+        assert prefetcher.neighbours("frame_05.tif") == ["frame_06.tif", "frame_04.tif",
+                                                         "frame_07.tif", "frame_03.tif"]
+        
+        def cached(prefetcher, path):
+            deadline = time.time() + 5
+            while prefetcher.take(path) is None and time.time() < deadline:
+                time.sleep(0.01)
+            return prefetcher.take(path)
+        
+        prefetcher.set_current("frame_05.tif")
+        frame = cached(prefetcher, "frame_06.tif")
+        assert frame is not None and frame.path == "frame_06.tif"
+        assert prefetcher.take("frame_05.tif") is None  # The current frame is the caller's to load
+        time.sleep(0.2)
+        assert not detected
+        inference_lock.release()
+        deadline = time.time() + 5
+        while len(detected) < 4 and time.time() < deadline:
+            time.sleep(0.01)
+        assert sorted(f.path for f in detected) == ["frame_03.tif", "frame_04.tif", "frame_06.tif", "frame_07.tif"]
+        assert frame.prediction_key == "key" and prefetcher.nbytes == 4 * frame.nbytes
+        
+        # A tight budget keeps only the most recently used frames
+        prefetcher.max_bytes = 2 * frame.nbytes
+        prefetcher.take("frame_03.tif")
+        prefetcher._evict()
+        assert prefetcher.take("frame_03.tif") is not None and prefetcher.take("frame_04.tif") is None
+        prefetcher.close()
+        
+        # A decode still queued behind pre-detects is cancelled, not waited for
+        inference_lock.acquire()
+        prefetcher = FramePrefetcher(frames, decode, detect=lambda frame: (np.zeros((100, 100), np.float32), "key"),
+                                     radius=2, max_bytes=10 ** 9, detect_lock=inference_lock)
+        prefetcher.set_current("frame_05.tif")
+        assert all(cached(prefetcher, path) for path in prefetcher.neighbours("frame_05.tif"))
+        time.sleep(0.1)  # Pre-detects now fill the prefetch workers, blocked on the lock
+        prefetcher.set_current("frame_07.tif")
+        queued = prefetcher._pending["frame_08.tif"]
+        release = threading.Timer(1.0, inference_lock.release)
+        release.start()
+        start = time.time()
+        assert prefetcher.wait("frame_08.tif") is None
+        assert time.time() - start < 0.5 and queued.cancelled and not queued.started
+        release.join()
+        prefetcher.close()
+        
+        print("✅ Frame prefetcher successful!")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Frame prefetcher failed: {e}")
+        return False
+
+def test_job_scheduler():
+    """Test job priorities, cancellation and coalescing of superseded jobs"""
+    print("🧪 Testing job scheduler...")
+    
+    try:
+        import threading
+        import time
+        from job_scheduler import JobScheduler, Priority
+        
+        scheduler = JobScheduler(max_workers=1)
+        gate = threading.Event()
+        order = []
+        blocker = scheduler.submit(lambda token: gate.wait(5), priority=Priority.INTERACTIVE)
+        
+        # Queued behind the blocker: they run by priority, not submission order
+        scheduler.submit(lambda token: order.append("prefetch"), priority=Priority.PREFETCH)
+        scheduler.submit(lambda token: order.append("render"), priority=Priority.RENDER)
+        last = scheduler.submit(lambda token: order.append("preview"), priority=Priority.INTERACTIVE)
+        
+        # A newer job with the same key cancels the queued one before it starts
+        outcomes = []
+        stale = scheduler.submit(lambda token: order.append("stale"), key="threshold",
+                                 on_cancelled=lambda: outcomes.append("cancelled"))
+        fresh = scheduler.submit(lambda token: 0.02, key="threshold", on_done=outcomes.append)
+        gate.set()
+        assert fresh.wait(5) and blocker.wait(5) and last.wait(5)
+        assert order[:3] == ["preview", "render", "prefetch"] and "stale" not in order
+        assert stale.cancelled and outcomes == ["cancelled", 0.02]
+        
+        # A running job is cancelled at its next check, and its successor waits for it
+        started, stages = threading.Event(), []
+        
+        def long_job(token):
+            started.set()
+            for stage in range(200):
+                token.check()
+                stages.append(stage)
+                time.sleep(0.005)
+        
+        scheduler = JobScheduler(max_workers=2)
+        running = scheduler.submit(long_job, key="rebuild")
+        started.wait(5)
+        delivered, results = threading.Event(), []
+        successor = scheduler.submit(lambda token: len(stages), key="rebuild",
+                                     on_done=lambda result: (results.append(result), delivered.set()))
+        assert delivered.wait(5) and running.done and running.cancelled and running.error is None
+        assert 0 < results[0] == len(stages) < 200
+        
+        # Once delivered, a job is forgotten and its result freed
+        deadline = time.time() + 5
+        while scheduler._latest and time.time() < deadline:
+            time.sleep(0.005)
+        assert not scheduler._latest and successor.result is None
+        
+        failing = scheduler.submit(lambda token: 1 / 0, on_error=outcomes.append)
+        failing.wait(5)
+        assert isinstance(failing.error, ZeroDivisionError) and outcomes[-1] is failing.error
+        scheduler.shutdown()
+        
+        print("✅ Job scheduler successful!")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Job scheduler failed: {e}")
+        return False
+
 if __name__ == "__main__":
     print("🧪 Running dust removal component tests...")
     
     tests = [
         test_basic_inpainting,
         test_dilate_mask, 
-        test_blend_images
+        test_blend_images,
+        test_batched_prediction,
+        test_batch_pipeline,
+        test_tiled_prediction,
+        test_streaming_removal,
+        test_region_inpainting,
+        test_masked_blend,
+        test_sixteen_bit_removal,
+        test_load_draft,
+        test_removal_progress,
+        test_inpaint_pool,
+        test_prediction_cache,
+        test_threshold_mask,
+        test_lazy_prediction,
+        test_mask_history,
+        test_brush_engine,
+        test_stroke_sync,
+        test_observer_batching,
+        test_image_pyramid,
+        test_gl_tiles,
+        test_frame_prefetcher,
+        test_job_scheduler
     ]
     
     passed = 0
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Threshold Mask
+
+Incremental re-thresholding of the U-Net prediction for the sensitivity
+slider. Instead of recomputing `prediction > threshold` over the whole
+frame on every slider tick, the pixels whose prediction falls inside the
+slider's range are quantized to uint16 levels and indexed once per
+detection, ordered by level with a level histogram. A threshold change then
+re-tests only the pixels in the levels between the old and the new
+threshold.
+"""
+
+from typing import Optional, Tuple
+
+import numpy as np
+
+from lazy_prediction import LazyPrediction, iter_prediction_bands
+
+SLIDER_RANGE = (0.001, 0.05)  # Matches the threshold slider in the sidebar
+LEVELS = 65536
+
+
+def nearest_indices(n_src: int, n_dst: int) -> np.ndarray:
+    """Source rows/columns PIL's NEAREST resize samples for n_src -> n_dst"""
+    step = n_src / n_dst
+    # PIL walks the source by accumulating the step in double precision
+    positions = np.cumsum(np.r_[step * 0.5, np.full(n_dst - 1, step)])
+    return np.minimum(np.floor(positions).astype(np.int64), n_src - 1)
+
+
+def nearest_sample(prediction, size: Tuple[int, int]) -> np.ndarray:
+    """Sample a (dense or lazy) prediction exactly where a NEAREST resize of its mask to `size` would"""
+    w, h = size
+    H, W = prediction.shape[:2]
+    rows, cols = nearest_indices(H, h), nearest_indices(W, w)
+    if isinstance(prediction, LazyPrediction):
+        return prediction.sample(rows, cols)
+    if (w, h) == (W, H):
+        return prediction
+    return np.ascontiguousarray(prediction[np.ix_(rows, cols)])
+
+
+class ThresholdMask:
+    """Binary uint8 mask of prediction > threshold that re-thresholds incrementally"""
+
+    def __init__(self, prediction, threshold: float,
+                 value_range: Tuple[float, float] = SLIDER_RANGE):
+        self.value_range = (float(value_range[0]), float(value_range[1]))
+        # Kept (not copied) for thresholds outside the indexed range; may be a LazyPrediction
+        self._prediction = prediction
+        self.shape = tuple(prediction.shape[:2])
+
+        self.mask = np.zeros(self.shape, dtype=np.uint8)
+        self.indexed = self._build_index(prediction, max_pixels=self.mask.size // 8)
+        if not self.indexed:
+            print("🎚️ Prediction too dense to index; thresholds will be recomputed in full")
+        self.threshold: Optional[float] = None
+        self._recompute(threshold)
+
+    def _build_index(self, prediction, max_pixels: int) -> bool:
+        """Gather and order the in-range pixels; False if there are more than max_pixels"""
+        lo, hi = self.value_range
+        width = self.shape[1]
+        index_dtype = np.uint32 if self.mask.size < 2 ** 32 else np.int64
+        band_indices, band_values, count = [], [], 0
+        for y0, rows in iter_prediction_bands(prediction):
+            flat = rows.reshape(-1)
+            local = np.flatnonzero((flat > lo) & (flat <= hi))
+            count += len(local)
+            if count > max_pixels:
+                # Most of the frame would flip on every move: a full pass is cheaper
+                self._indices = self._values = np.empty(0)
+                return False
+            band_values.append(flat[local])
+            band_indices.append((local + y0 * width).astype(index_dtype))
+        in_range = np.concatenate(band_indices)
+        values = np.concatenate(band_values)
+
+        # Quantize to uint16 levels: a stable argsort of uint16 is a radix
+        # sort, and the level histogram gives every level's slice of the order
+        levels = self._level(values)
+        order = np.argsort(levels, kind='stable')
+        self._indices = in_range[order]
+        self._values = values[order]
+        histogram = np.bincount(levels, minlength=LEVELS)
+        self._level_start = np.concatenate([[0], np.cumsum(histogram)])
+        return True
+
+    @property
+    def indexed_pixels(self) -> int:
+        """Number of pixels that can flip while the threshold stays in range"""
+        return len(self._values)
+
+    @property
+    def coverage(self) -> float:
+        """Fraction of pixels currently marked as dust"""
+        return self._on_count / float(self.mask.size)
+
+    def set_threshold(self, threshold: float) -> np.ndarray:
+        """Move to a new threshold, updating only pixels that cross it; returns the mask"""
+        threshold = float(threshold)
+        if threshold == self.threshold:
+            return self.mask
+        if not self.indexed or not self._in_range(threshold) or not self._in_range(self.threshold):
+            return self._recompute(threshold)
+
+        # Every pixel between the two thresholds lives in the levels between
+        # them; those (including both boundary levels) are re-tested exactly
+        old_level = int(self._level(np.float32(self.threshold)))
+        new_level = int(self._level(np.float32(threshold)))
+        start = self._level_start[min(old_level, new_level)]
+        end = self._level_start[max(old_level, new_level) + 1]
+        if end - start > self.mask.size // 8:
+            # Scattered writes stop paying off once a large share of the frame flips
+            return self._recompute(threshold)
+
+        flat_mask = self.mask.reshape(-1)
+        indices = self._indices[start:end]
+        before = np.count_nonzero(flat_mask[indices])
+        updated = (self._values[start:end] > threshold).astype(np.uint8) * 255
+        flat_mask[indices] = updated
+        self._on_count += np.count_nonzero(updated) - before
+        self.threshold = threshold
+        return self.mask
+
+    def _level(self, values: np.ndarray) -> np.ndarray:
+        lo, hi = self.value_range
+        scaled = (values - np.float32(lo)) * np.float32(LEVELS / (hi - lo))
+        return np.clip(scaled, 0, LEVELS - 1).astype(np.uint16)
+
+    def _in_range(self, threshold: float) -> bool:
+        lo, hi = self.value_range
+        return lo <= threshold <= hi
+
+    def _recompute(self, threshold: float) -> np.ndarray:
+        """Full pass over the prediction (initial build and out-of-range thresholds)"""
+        for y0, rows in iter_prediction_bands(self._prediction):
+            np.multiply(rows > threshold, 255, out=self.mask[y0:y0 + len(rows)], casting='unsafe')
+        self._on_count = int(np.count_nonzero(self.mask))
+        self.threshold = threshold
+        return self.mask
@@ -12,7 +12,7 @@ from PIL import Image, ImageTk
 import numpy as np
 from typing import Optional, Callable, Tuple
 import threading
-from dust_removal_state import DustRemovalState, ProcessingMode, ToolMode
+from dust_removal_state import DustRemovalState, ProcessingMode, StateSlice, ToolMode
 from simple_modern_theme import SimpleModernColors
 
 
@@ -84,7 +84,8 @@ class SpotlessSidebar(SpotlessFrame):
         self.callbacks = callbacks
         
         self.setup_ui()
-        self.state.add_observer(self.update_ui)
+        # Not MASK: a new mask arrives with PROCESSING, and brush edits change nothing shown here
+        self.state.add_observer(self.update_ui, (StateSlice.IMAGES, StateSlice.PROCESSING))
     
     def setup_ui(self):
         """Setup sidebar UI"""
@@ -347,7 +348,8 @@ class SpotlessToolbar(SpotlessFrame):
         self.callbacks = callbacks
         
         self.setup_ui()
-        self.state.add_observer(self.update_ui)
+        # Brush strokes (MASK) never change what the toolbar shows
+        self.state.add_observer(self.update_ui, (StateSlice.VIEW, StateSlice.IMAGES, StateSlice.PROCESSING))
     
     def setup_ui(self):
         """Setup toolbar UI"""
@@ -494,7 +496,7 @@ class SpotlessToolbar(SpotlessFrame):
         self.state.view_state.overlay_opacity = opacity
         if hasattr(self, 'opacity_label'):
             self.opacity_label.config(text=f"{int(opacity * 100)}%")
-        self.state.notify_observers()
+        self.state.notify_observers(StateSlice.VIEW)
     
     def update_ui(self):
         """Update UI based on current state"""
@@ -553,7 +555,7 @@ class ZoomControls(SpotlessFrame):
         self.state = state
         
         self.setup_ui()
-        self.state.add_observer(self.update_ui)
+        self.state.add_observer(self.update_ui, (StateSlice.VIEW,))
     
     def setup_ui(self):
         """Setup zoom controls"""